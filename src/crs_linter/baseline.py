@@ -0,0 +1,110 @@
+"""
+Baseline of the known problems.
+
+A baseline file holds the fingerprints of the problems found in an earlier
+run, so CI only reports the new ones. A fingerprint is computed from the rule
+name, the rule ID, the normalized description and a hash of the directive
+text, but not from the line numbers: it survives edits that only move the
+rule around in the file.
+"""
+
+import hashlib
+import re
+
+from .utils import write_file_atomic
+
+BASELINE_HEADER = "# crs-linter baseline, one fingerprint per line\n"
+
+# numbers in the descriptions are usually line numbers or counters
+NUMBER_PATTERN = re.compile(r"\d+")
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def _hash(*parts):
+    return hashlib.blake2b("\0".join(parts).encode(), digest_size=8).hexdigest()
+
+
+def normalize_description(desc):
+    """Normalize a problem description: no numbers, single spaces"""
+    desc = NUMBER_PATTERN.sub("#", desc or "")
+    return WHITESPACE_PATTERN.sub(" ", desc).strip().lower()
+
+
+class Baseline:
+    """Set of the fingerprints of the known problems"""
+
+    def __init__(self, fingerprints=()):
+        self.fingerprints = set(fingerprints)
+        # number of problems hidden by filter()
+        self.suppressed = 0
+
+    def __contains__(self, fingerprint):
+        return fingerprint in self.fingerprints
+
+    def __len__(self):
+        return len(self.fingerprints)
+
+    def add(self, fingerprint):
+        self.fingerprints.add(fingerprint)
+
+    def filter(self, problems, fingerprinter, rule=None):
+        """Yield the problems that are not in the baseline"""
+        for problem in problems:
+            if fingerprinter.fingerprint(problem, rule) in self.fingerprints:
+                self.suppressed += 1
+            else:
+                yield problem
+
+    def update(self, problems, fingerprinter, rule=None):
+        """Add the fingerprints of the problems to the baseline"""
+        for problem in problems:
+            self.add(fingerprinter.fingerprint(problem, rule))
+
+    @classmethod
+    def load(cls, filename):
+        """Read a baseline file, raises FileNotFoundError if it doesn't exist"""
+        with open(filename, "r") as fp:
+            return cls(
+                line.strip()
+                for line in fp
+                if line.strip() and not line.startswith("#")
+            )
+
+    def save(self, filename):
+        """Write the baseline file, the fingerprints are sorted to keep diffs small"""
+        write_file_atomic(
+            filename, BASELINE_HEADER + "".join(f"{f}\n" for f in sorted(self.fingerprints))
+        )
+
+
+class Fingerprinter:
+    """Compute the fingerprints of the problems of a file
+
+    The directive of a problem is located with the rule ID index, problems
+    outside of a rule use the text of their line.
+    """
+
+    def __init__(self, filename, file_content, ids):
+        self.filename = filename
+        self.lines = (file_content or "").split("\n")
+        self.ids = ids
+        self._directive_hashes = {}
+
+    def fingerprint(self, problem, rule=None):
+        """Return the fingerprint of a problem, `rule` names problems without rule"""
+        rule = problem.rule or rule or ""
+        entry = self.ids.rule_at(self.filename, problem.line) if problem.line else None
+        if entry is not None:
+            rule_id = entry.rule_id
+            text_hash = self._directive_hash(entry.start_line, entry.end_line)
+        else:
+            rule_id = 0
+            text_hash = self._directive_hash(problem.line, problem.line)
+        return _hash(rule, str(rule_id), normalize_description(problem.desc), text_hash)
+
+    def _directive_hash(self, start_line, end_line):
+        key = (start_line, end_line)
+        if key not in self._directive_hashes:
+            lines = self.lines[max(start_line - 1, 0):max(end_line, 0)]
+            self._directive_hashes[key] = _hash(*(line.strip() for line in lines))
+        return self._directive_hashes[key]
@@ -0,0 +1,344 @@
+"""
+`crs-linter regex-bench`: rank the @rx regexes by their matching cost.
+
+Every @rx regex is timed against a corpus of payloads, the bundled benign and
+attack samples or the files of a directory (one payload per line), after the
+transformations of its directive are applied to them. The regexes are ranked
+by mean and p99 match time, and by compiled size. The run is offline and
+single-threaded; the corpus, the transformations and the order of the runs
+are fixed, so only the timings differ between runs.
+
+The regexes are timed in a separate interpreter, one after the other. A
+regex still matching the payloads after the deadline (`--timeout`), e.g.
+one backtracking catastrophically, is killed with the interpreter and
+reported as timed out; the next regexes are timed in a new interpreter.
+"""
+
+import argparse
+import glob
+import json
+import os.path
+import queue
+import subprocess
+import sys
+import threading
+from dataclasses import asdict, dataclass, field
+from importlib import resources
+from typing import List, Optional
+
+from .errors import ParseError
+from .regex_analysis import regex_cache
+from .session import read_and_parse
+from .transformations import apply_transformations, transformation_chain, unsupported
+
+DEFAULT_TOP = 10
+DEFAULT_REPEAT = 5
+# seconds a regex can take to match all the payloads
+DEFAULT_TIMEOUT = 10.0
+
+
+@dataclass
+class BenchResult:
+    """The cost of a @rx regex on the payload corpus"""
+    filename: str
+    line: int
+    rule_id: int
+    pattern: str
+    transformations: List[str] = field(default_factory=list)
+    # transformations without a Python stand-in, not applied
+    unsupported: List[str] = field(default_factory=list)
+    compiled_size: int = 0
+    # match times in microseconds, the fastest of the repeats for each payload
+    mean_us: float = 0.0
+    p99_us: float = 0.0
+    max_us: float = 0.0
+    # payloads matched
+    matches: int = 0
+    # the compile error, the regex isn't timed
+    error: Optional[str] = None
+    # the deadline the matches passed, the regex isn't ranked
+    timeout: Optional[float] = None
+
+
+def load_payloads(directory=None):
+    """Return the payloads of the `.txt` files of a directory, the bundled ones by default"""
+    if directory is None:
+        files = sorted(
+            (entry for entry in resources.files("crs_linter").joinpath("payloads").iterdir() if entry.name.endswith(".txt")),
+            key=lambda entry: entry.name,
+        )
+        contents = [entry.read_text(encoding="UTF-8") for entry in files]
+    else:
+        contents = []
+        for filename in sorted(glob.glob(os.path.join(directory, "*.txt"))):
+            with open(filename, "r", encoding="latin-1") as fp:
+                contents.append(fp.read())
+    return [line for content in contents for line in content.splitlines() if line]
+
+
+def collect_regexes(filenames):
+    """Return the @rx regexes of the files as BenchResults to fill in"""
+    results = []
+    for filename in filenames:
+        data, _ = read_and_parse(filename)
+        ruleid = 0
+        for d in data:
+            actions = d.get("actions", [])
+            for a in actions:
+                if a["act_name"] == "id":
+                    ruleid = int(a["act_arg"])
+            if d["type"].lower() != "secrule" or d.get("operator") != "@rx":
+                continue
+            chain = transformation_chain(actions)
+            results.append(BenchResult(
+                filename=filename,
+                line=d["lineno"],
+                rule_id=ruleid,
+                pattern=d["operator_argument"],
+                transformations=chain,
+                unsupported=unsupported(chain),
+            ))
+    return results
+
+
+def percentile(values, pct):
+    """Return the nearest-rank percentile of the values"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+_WORKER_SCRIPT = """
+import gc, json, re, sys, time
+for line in sys.stdin:
+    job = json.loads(line)
+    search = re.compile(job["pattern"]).search
+    times = []
+    matches = 0
+    gc.disable()
+    for subject in job["subjects"]:
+        best = None
+        for _ in range(job["repeat"]):
+            start = time.perf_counter_ns()
+            matched = search(subject)
+            elapsed = time.perf_counter_ns() - start
+            best = elapsed if best is None else min(best, elapsed)
+        times.append(best / 1000)
+        matches += matched is not None
+    gc.enable()
+    print(json.dumps({"times": times, "matches": matches}), flush=True)
+"""
+
+
+class MatchWorker:
+    """A separate interpreter timing the regexes, killed when one passes its deadline
+
+    The interpreter is started on first use, and again after it was killed.
+    """
+
+    def __init__(self):
+        self._proc = None
+        self._lines = None
+
+    def time(self, pattern, subjects, repeat, timeout):
+        """Return the (match times in microseconds, matches) of a regex, None if it timed out"""
+        if self._proc is None:
+            self._start()
+        self._proc.stdin.write(json.dumps({"pattern": pattern, "subjects": subjects, "repeat": repeat}) + "\n")
+        self._proc.stdin.flush()
+        try:
+            line = self._lines.get(timeout=timeout)
+        except queue.Empty:
+            self.close()
+            return None
+        if line is None:
+            self.close()
+            raise RuntimeError("the timing process exited")
+        result = json.loads(line)
+        return result["times"], result["matches"]
+
+    def close(self):
+        """Stop the interpreter"""
+        if self._proc is not None:
+            self._proc.kill()
+            self._proc.wait()
+            self._proc.stdin.close()
+            self._proc.stdout.close()
+            self._proc = None
+
+    def _start(self):
+        self._proc = subprocess.Popen(
+            [sys.executable, "-I", "-c", _WORKER_SCRIPT],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+            encoding="UTF-8",
+        )
+        self._lines = queue.Queue()
+        # the lines are read by a thread, so waiting for one can time out
+        threading.Thread(target=self._read, args=(self._proc.stdout, self._lines), daemon=True).start()
+
+    @staticmethod
+    def _read(stream, lines):
+        for line in stream:
+            lines.put(line)
+        lines.put(None)
+
+
+def benchmark(results, payloads, repeat=DEFAULT_REPEAT, timeout=DEFAULT_TIMEOUT):
+    """Time the regexes of the results on the payloads, each within `timeout` seconds"""
+    regexes = regex_cache()
+    # the payloads transformed by each transformation chain
+    transformed = {}
+    worker = MatchWorker()
+    try:
+        for result in results:
+            info = regexes.get(result.pattern)
+            if not info.valid:
+                result.error = info.error
+                continue
+            result.compiled_size = info.compiled_size
+            key = tuple(result.transformations)
+            if key not in transformed:
+                transformed[key] = [apply_transformations(p, result.transformations) for p in payloads]
+            try:
+                timed = worker.time(result.pattern, transformed[key], repeat, timeout)
+            except RuntimeError as e:
+                result.error = str(e)
+                continue
+            if timed is None:
+                result.timeout = timeout
+                continue
+            times, result.matches = timed
+            if times:
+                result.mean_us = round(sum(times) / len(times), 3)
+                result.p99_us = percentile(times, 99)
+                result.max_us = max(times)
+    finally:
+        worker.close()
+    return results
+
+
+def _label(result):
+    return f"{result.rule_id} ({os.path.basename(result.filename)}:{result.line})"
+
+
+def format_report(results, top=DEFAULT_TOP):
+    """Return the lines of the top-N tables"""
+    timed = [r for r in results if r.error is None and r.timeout is None]
+    lines = []
+    for title, key, unit in (
+        ("mean match time", "mean_us", "us"),
+        ("p99 match time", "p99_us", "us"),
+        ("compiled size", "compiled_size", "words"),
+    ):
+        lines.append(f"Top {min(top, len(timed))} regexes by {title}:")
+        # ties keep the file order
+        ranked = sorted(timed, key=lambda r: getattr(r, key), reverse=True)[:top]
+        for i, r in enumerate(ranked, 1):
+            value = getattr(r, key)
+            value = f"{value:.2f}" if isinstance(value, float) else str(value)
+            lines.append(f"{i:>4}. {value:>12} {unit:<5} rule {_label(r)}")
+        lines.append("")
+    for r in results:
+        if r.timeout is not None:
+            lines.append(f"Timed out, rule {_label(r)}: matching the payloads took more than {r.timeout:g}s")
+    for r in results:
+        if r.error is not None:
+            lines.append(f"Not timed, rule {_label(r)}: {r.error}")
+    skipped = sorted({name for r in results for name in r.unsupported})
+    if skipped:
+        lines.append(f"Transformations without a stand-in, not applied: {', '.join(skipped)}")
+    return lines
+
+
+def to_json(results, payloads, repeat):
+    """Return the results as a JSON document for comparing runs"""
+    return json.dumps({
+        "python": f"{sys.version_info.major}.{sys.version_info.minor}",
+        "payloads": len(payloads),
+        "repeat": repeat,
+        "results": [asdict(r) for r in results],
+    }, indent=1, sort_keys=True)
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        prog="crs-linter regex-bench", description="Rank the @rx regexes of the rules by their matching cost"
+    )
+    parser.add_argument(
+        "-r",
+        "--rules",
+        dest="crs_rules",
+        help="CRS rules file to benchmark. Can be used multiple times.",
+        action="append",
+        required=True,
+    )
+    parser.add_argument(
+        "--payloads",
+        dest="payloads",
+        help="Directory of the payload files (*.txt, one payload per line). The bundled samples by default.",
+        required=False,
+    )
+    parser.add_argument(
+        "--top",
+        dest="top",
+        type=int,
+        default=DEFAULT_TOP,
+        help=f"Number of regexes listed in each ranking (default: {DEFAULT_TOP}).",
+    )
+    parser.add_argument(
+        "--repeat",
+        dest="repeat",
+        type=int,
+        default=DEFAULT_REPEAT,
+        help=f"Number of times each payload is matched, the fastest run counts (default: {DEFAULT_REPEAT}).",
+    )
+    parser.add_argument(
+        "--timeout",
+        dest="timeout",
+        type=float,
+        default=DEFAULT_TIMEOUT,
+        help=f"Seconds a regex can take to match all the payloads, it is reported as timed out after (default: {DEFAULT_TIMEOUT:g}).",
+    )
+    parser.add_argument(
+        "--json",
+        dest="json",
+        help="Write the results of all regexes to a JSON file.",
+        required=False,
+    )
+    args = parser.parse_args(argv)
+    if args.top < 1:
+        parser.error("--top must be at least 1")
+    if args.repeat < 1:
+        parser.error("--repeat must be at least 1")
+    if args.timeout <= 0:
+        parser.error("--timeout must be positive")
+    return args
+
+
+def main(argv):
+    args = parse_args(argv)
+    filenames = sorted({f for pattern in args.crs_rules for f in glob.glob(pattern)})
+    if args.payloads is not None and not os.path.isdir(args.payloads):
+        print(f"Can't open directory: {args.payloads}", file=sys.stderr)
+        return 1
+    payloads = load_payloads(args.payloads)
+    if not payloads:
+        print("No payloads found", file=sys.stderr)
+        return 1
+    try:
+        results = collect_regexes(filenames)
+    except ParseError as e:
+        print(str(e), file=sys.stderr)
+        return 1
+    benchmark(results, payloads, args.repeat, args.timeout)
+    print(f"Timed {len(results)} regex(es) of {len(filenames)} file(s) on {len(payloads)} payload(s)\n")
+    for line in format_report(results, args.top):
+        print(line)
+    if args.json is not None:
+        with open(args.json, "w", encoding="UTF-8") as fp:
+            fp.write(to_json(results, payloads, args.repeat) + "\n")
+    return 0
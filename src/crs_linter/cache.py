@@ -0,0 +1,181 @@
+"""
+Cache directory of the linter.
+
+The cache keeps data between runs in a directory given with `--cache-dir`.
+`timings.json` holds the parse and check durations of every file, used to
+schedule the longest files first when the files are checked by several
+threads: a big file started last would leave the other workers idle.
+
+The results of the expensive analyses (e.g. of the regexes) are kept in a
+ResultCache by content hash, appended to `<name>.jsonl` as they are computed.
+"""
+
+import hashlib
+import json
+import os
+import os.path
+import sys
+import threading
+
+from .utils import write_file_atomic
+
+TIMINGS_FILENAME = "timings.json"
+
+# estimated duration of files without timings, if no file has timings yet
+DEFAULT_SECONDS_PER_BYTE = 1e-6
+
+
+def _file_size(filename):
+    try:
+        return os.path.getsize(filename)
+    except OSError:
+        return 0
+
+
+class FileTimings:
+    """Parse and check durations of the files, in seconds"""
+
+    def __init__(self, timings=None):
+        # absolute filename -> {"size", "parse", "check"}
+        self._timings = dict(timings or {})
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._timings)
+
+    @classmethod
+    def load(cls, directory):
+        """Read the timings from the cache directory, a missing or broken file is ignored"""
+        try:
+            with open(os.path.join(directory, TIMINGS_FILENAME), "r", encoding="UTF-8") as fp:
+                timings = json.load(fp)
+        except (OSError, ValueError):
+            return cls()
+        if not isinstance(timings, dict):
+            return cls()
+        return cls(timings)
+
+    def save(self, directory):
+        """Write the timings to the cache directory"""
+        os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            data = json.dumps(self._timings, indent=1, sort_keys=True)
+        write_file_atomic(os.path.join(directory, TIMINGS_FILENAME), data + "\n")
+
+    def record(self, filename, parse=None, check=None):
+        """Record the durations of a file"""
+        key = os.path.abspath(filename)
+        size = _file_size(filename)
+        with self._lock:
+            entry = self._timings.get(key)
+            if entry is None or entry.get("size") != size:
+                # the file changed, the old durations don't apply
+                entry = {"size": size}
+                self._timings[key] = entry
+            if parse is not None:
+                entry["parse"] = parse
+            if check is not None:
+                entry["check"] = check
+
+    def duration(self, filename):
+        """Return the recorded parse and check duration of a file, None if unknown"""
+        entry = self._timings.get(os.path.abspath(filename))
+        if entry is None or "check" not in entry:
+            return None
+        return entry.get("parse", 0.0) + entry["check"]
+
+    def estimate(self, filename):
+        """Return the expected duration of a file, estimated from its size if unknown"""
+        duration = self.duration(filename)
+        if duration is not None:
+            return duration
+        return _file_size(filename) * self._seconds_per_byte()
+
+    def schedule(self, filenames):
+        """Return the files ordered longest first"""
+        estimates = {f: self.estimate(f) for f in filenames}
+        return sorted(filenames, key=lambda f: estimates[f], reverse=True)
+
+    def _seconds_per_byte(self):
+        total_size = total_duration = 0
+        for entry in list(self._timings.values()):
+            if "check" in entry and entry.get("size"):
+                total_size += entry["size"]
+                total_duration += entry.get("parse", 0.0) + entry["check"]
+        if total_size == 0:
+            return DEFAULT_SECONDS_PER_BYTE
+        return total_duration / total_size
+
+
+def ideal_makespan(durations, workers):
+    """Return the lower bound of the time to run tasks of the given durations on the workers"""
+    durations = list(durations)
+    if not durations:
+        return 0.0
+    return max(sum(durations) / max(workers, 1), max(durations))
+
+
+def hash_key(*parts):
+    """Return the cache key of a value, for the running Python version
+
+    The analyses depend on the `re` module, so a different version of Python
+    doesn't reuse the results.
+    """
+    digest = hashlib.sha256(f"{sys.version_info.major}.{sys.version_info.minor}".encode())
+    for part in parts:
+        digest.update(b"\0" + str(part).encode("utf-8", "surrogatepass"))
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """Results of an analysis by key, kept in the cache directory
+
+    Without a directory nothing is kept, the users keep the results they
+    need for the run themselves.
+    """
+
+    def __init__(self, path=None):
+        # `<cache dir>/<name>.jsonl`, None to keep nothing
+        self.path = path
+        self._results = {}
+        self._lock = threading.Lock()
+        if path is not None:
+            self._read()
+
+    def __len__(self):
+        return len(self._results)
+
+    def get(self, key, default=None):
+        return self._results.get(key, default)
+
+    def put(self, key, value):
+        """Store a JSON serializable result"""
+        if self.path is None:
+            return
+        with self._lock:
+            if self._results.get(key) == value:
+                return
+            self._results[key] = value
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a", encoding="UTF-8") as fp:
+                fp.write(json.dumps({"key": key, "value": value}, sort_keys=True) + "\n")
+
+    def _read(self):
+        try:
+            with open(self.path, "r", encoding="UTF-8") as fp:
+                lines = fp.readlines()
+        except OSError:
+            return
+        for line in lines:
+            try:
+                entry = json.loads(line)
+                self._results[entry["key"]] = entry["value"]
+            except (ValueError, KeyError, TypeError):
+                # a line cut by an interrupted run
+                continue
+
+
+def result_cache(name, directory=None):
+    """Return the cache of an analysis in a directory, a cache keeping nothing without one"""
+    path = os.path.join(os.path.abspath(directory), f"{name}.jsonl") if directory is not None else None
+    return ResultCache(path)
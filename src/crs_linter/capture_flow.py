@@ -0,0 +1,152 @@
+"""
+Dataflow of the capture groups (TX.0 - TX.9) of the rule chains.
+
+A link with the `capture` action produces the groups of its operator: an @rx
+regex sets TX.0 (the whole match) and one TX variable per group, the phrase
+operators only set TX.0. The groups are consumed by the TX.N targets and the
+operator expansions of the following links, and by the expansions in the
+actions of the chain (msg, logdata, setvar, setenv, ...), which are evaluated
+once the chain matched.
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+# TX.N capture variables as a target (TX:1) or an expansion (%{TX.0}, %{TX:1})
+TARGET_PATTERN = re.compile(r"^\d$")
+EXPANSION_PATTERN = re.compile(r"%\{TX[.:](\d)\}", re.IGNORECASE)
+
+# Actions whose argument is macro expanded
+EXPANSION_ACTIONS = {
+    'exec', 'expirevar', 'initcol', 'logdata', 'msg', 'setenv', 'setsid', 'setuid', 'setvar', 'tag',
+}
+
+# Kinds of uses
+TARGET = "target"  # SecRule TX:1 ...
+OPERATOR = "operator"  # "@rx %{TX.1}"
+ACTION = "action"  # msg:'%{TX.1}'
+
+# operators capturing the matched text only, as TX.0
+PHRASE_OPERATORS = {"@pm", "@pmf", "@pmfromfile"}
+
+
+@dataclass(frozen=True)
+class CaptureSource:
+    """A chain link with the capture action"""
+    level: int
+    line: int
+    # the highest group the operator sets, None if it isn't known
+    groups: Optional[int]
+
+
+@dataclass(frozen=True)
+class CaptureUse:
+    """A read of a TX.N variable"""
+    group: int
+    kind: str
+    level: int
+    line: int
+
+
+@dataclass
+class ChainCaptures:
+    """The capture groups a rule chain produces and consumes"""
+    ruleid: int
+    links: List[dict] = field(default_factory=list)
+    sources: List[CaptureSource] = field(default_factory=list)
+    # in the order of the links, the targets, operator and actions of a link
+    uses: List[CaptureUse] = field(default_factory=list)
+    # the line of the last action of the chain
+    last_line: int = 0
+
+    def sources_for(self, use):
+        """Return the sources a use can read the groups of"""
+        if use.kind == ACTION:
+            return list(self.sources)
+        return [source for source in self.sources if source.level < use.level]
+
+    def unused_sources(self):
+        """Return the sources whose groups are never read"""
+        return [
+            source
+            for source in self.sources
+            if not any(use.kind == ACTION or use.level > source.level for use in self.uses)
+        ]
+
+    def undefined_uses(self):
+        """Return the uses of a group none of their sources defines"""
+        undefined = []
+        for use in self.uses:
+            sources = self.sources_for(use)
+            if not sources or any(source.groups is None for source in sources):
+                continue
+            if use.group > max(source.groups for source in sources):
+                undefined.append(use)
+        return undefined
+
+
+def chain_links(data):
+    """Yield the SecRule directives of every rule chain, as lists of links"""
+    links = []
+    for d in data:
+        if d["type"].lower() != "secrule":
+            continue
+        links.append(d)
+        if not any(a["act_name"] == "chain" for a in d.get("actions", [])):
+            yield links
+            links = []
+    if links:
+        yield links
+
+
+def link_uses(d, level):
+    """Return the TX.N reads of a link"""
+    uses = []
+    for v in d["variables"]:
+        if v["variable"].lower() == "tx" and TARGET_PATTERN.match(v["variable_part"]):
+            uses.append(CaptureUse(int(v["variable_part"]), TARGET, level, d["lineno"]))
+    for group in EXPANSION_PATTERN.findall(d.get("operator_argument") or ""):
+        uses.append(CaptureUse(int(group), OPERATOR, level, d.get("oplineno", d["lineno"])))
+    for a in d.get("actions", []):
+        if a["act_name"] in EXPANSION_ACTIONS:
+            for field_name in ("act_arg", "act_arg_val"):
+                for group in EXPANSION_PATTERN.findall(a.get(field_name) or ""):
+                    uses.append(CaptureUse(int(group), ACTION, level, a["lineno"]))
+    return uses
+
+
+def captured_var_uses(d):
+    """Return where a link reads TX.N: "target", "operator" and/or "action" """
+    return {use.kind for use in link_uses(d, 0)}
+
+
+def _groups(d, regexes):
+    operator = d.get("operator", "").lower()
+    if d.get("operator_negated"):
+        return None
+    if operator in PHRASE_OPERATORS:
+        return 0
+    if operator == "@rx" and regexes is not None:
+        info = regexes.get(d["operator_argument"])
+        if info.valid and "%{" not in info.pattern:
+            return info.compiled.groups
+    return None
+
+
+def capture_flow(data, regexes=None):
+    """Yield the ChainCaptures of the rule chains of a parsed file
+
+    The groups of the @rx regexes are only known with a regex cache.
+    """
+    for links in chain_links(data):
+        chain = ChainCaptures(ruleid=0, links=links)
+        for level, d in enumerate(links):
+            for a in d.get("actions", []):
+                chain.last_line = a["lineno"]
+                if a["act_name"] == "id":
+                    chain.ruleid = int(a["act_arg"])
+                elif a["act_name"] == "capture":
+                    chain.sources.append(CaptureSource(level, a["lineno"], _groups(d, regexes)))
+            chain.uses.extend(link_uses(d, level))
+        yield chain
@@ -3,33 +3,32 @@
 import glob
 import pathlib
 import sys
-import msc_pyparser
 import argparse
 import os.path
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 
-from crs_linter.linter import Linter
+from crs_linter.baseline import Baseline, Fingerprinter
+from crs_linter.cache import FileTimings, ideal_makespan
+from crs_linter.config import find_config, load_config
+from crs_linter.lint_problem import LintProblem
 from crs_linter.logger import Logger, Output
+from crs_linter.problem_store import ProblemStore
+from crs_linter.reporters import get_reporter
+from crs_linter.session import ConfigError, LintSession, ParseError, load_test_cases, read_lines
 from crs_linter.utils import *
 
 
-def get_lines_from_file(filename):
+def get_lines_from_file(filename, logger):
     """Get lines from a file"""
-    lines = []
     try:
-        with open(filename, "r") as fp:
-            for l in fp.readlines():
-                l = l.strip()
-                if l.startswith("#"):
-                    continue
-                if len(l) > 0:
-                    lines.append(l)
-    except FileNotFoundError:
-        logger.error(f"Can't open file: {filename}")
+        return read_lines(filename)
+    except ConfigError as e:
+        logger.error(str(e))
         sys.exit(1)
 
-    return lines
-
 
 def get_crs_version(directory, version=None, head_ref=None, commit_message=None):
     """Get the CRS version"""
@@ -46,55 +45,111 @@ def get_crs_version(directory, version=None, head_ref=None, commit_message=None)
     return crs_version
 
 
-def read_files(filenames, fail_fast=False):
-    """ Iterate over the files and parse them using the msc_pyparser"""
-    global logger
-
-    parsed = {}
-    file_contents = {}
+def read_files(session, filenames, logger, fail_fast=False, timings=None):
+    """ Iterate over the files, parse them using the msc_pyparser and add them to the session"""
     # filenames must be in order to correctly detect unused variables
     filenames = sorted(filenames)
 
     for f in filenames:
+        ### check file syntax
+        logger.info(f"Config file: {f}")
         try:
-            with open(f, "r", encoding="UTF-8") as file:
-                original_data = file.read()
-                data = original_data
-                # modify the content of the file, if it is the "crs-setup.conf.example"
-                if os.path.basename(f).startswith("crs-setup.conf.example"):
-                    data = remove_comments(data)
-                # Store the original (possibly modified) content
-                file_contents[f] = data
+            start = time.perf_counter()
+            session.add_file(f)
+            if timings is not None:
+                timings.record(f, parse=time.perf_counter() - start)
+            logger.debug("Config file: %s - Parsing OK", f)
         except FileNotFoundError:
             logger.error(f"Can't open file: {f}")
             sys.exit(1)
-
-        ### check file syntax
-        logger.info(f"Config file: {f}")
-        try:
-            mparser = msc_pyparser.MSCParser()
-            mparser.parser.parse(data)
-            logger.debug(f"Config file: {f} - Parsing OK")
-            parsed[f] = mparser.configlines
-        except Exception as e:
-            err = e.args[1]
-            if err["cause"] == "lexer":
-                cause = "Lexer"
-            else:
-                cause = "Parser"
+        except ParseError as e:
             logger.error(
                 f"Can't parse config file: {f}",
-                title=f"{cause} error",
+                title=f"{e.cause} error",
                 file=f,
-                line=err["line"],
-                end_line=err["line"],
+                line=e.line,
+                end_line=e.line,
             )
             if fail_fast:
                 sys.exit(1)
             # Skip this file and continue with the next one
             continue
 
-    return parsed, file_contents
+
+def check_files(session, logger, threads=1, timings=None):
+    """Yield (filename, problems) of the files in load order, checked by `threads` threads
+
+    With timings, the check durations are recorded and the threads start with
+    the files expected to take longest, the others are estimated by size.
+    Closing the generator cancels the files not checked yet.
+    """
+    files = session.files
+    if threads <= 1 and timings is None:
+        for f in files:
+            yield f, session.problems(f)
+        return
+
+    durations = {}
+    ends = {}
+    cancelled = threading.Event()
+
+    def check(f):
+        start = time.perf_counter()
+        # the results of the files checked ahead wait in a compact store
+        problems = ProblemStore()
+        for problem in session.problems(f):
+            if cancelled.is_set():
+                # stop the rules of the file, the results are not needed
+                return problems
+            problems.append(problem)
+        ends[f] = time.perf_counter()
+        durations[f] = ends[f] - start
+        if timings is not None:
+            timings.record(f, check=durations[f])
+        return problems
+
+    if threads <= 1:
+        for f in files:
+            yield f, check(f)
+        return
+
+    order = timings.schedule(files) if timings is not None else files
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        # the pool starts the tasks in submission order
+        futures = {f: executor.submit(check, f) for f in order}
+        try:
+            for f in files:
+                yield f, futures[f].result()
+        finally:
+            cancelled.set()
+            for future in futures.values():
+                future.cancel()
+    if ends:
+        makespan = max(ends.values()) - start
+        ideal = ideal_makespan(durations.values(), threads)
+        logger.info(
+            f"Checked {len(files)} file(s) with {threads} threads in {makespan:.3f}s, "
+            f"ideal {ideal:.3f}s ({ideal / makespan:.0%} efficiency)" if makespan > 0 else
+            f"Checked {len(files)} file(s) with {threads} threads"
+        )
+
+
+def fix_indentation(filename, data, file_content, logger):
+    """Rewrite the file with the formatted output of its parsed content"""
+    if os.path.basename(filename).startswith("crs-setup.conf.example"):
+        # the commented out rules were uncommented before parsing, writing
+        # back the formatted output would enable them
+        logger.warning(f"Can't fix indentation of {filename}: its commented out rules would be enabled")
+        return
+    # imported here, the indentation rule is only loaded when it is selected
+    from crs_linter.rules.indentation import format_content
+
+    formatted = format_content(data)
+    if file_content is not None and file_content.endswith("\n"):
+        formatted += "\n"
+    write_file_atomic(filename, formatted)
+    logger.info(f"Fixed indentation: {filename}")
 
 
 def _arg_in_argv(argv, args):
@@ -105,6 +160,10 @@ def _arg_in_argv(argv, args):
     return True
 
 
+def _rule_names(value):
+    return [name.strip() for name in value.split(",") if name.strip()]
+
+
 def parse_args(argv):
     parser = argparse.ArgumentParser(
         prog="crs-linter", description="CRS Rules Linter tool"
@@ -133,12 +192,78 @@ def parse_args(argv):
     parser.add_argument(
         "--debug", dest="debug", help="Show debug information.", action="store_true"
     )
+    parser.add_argument(
+        "--config",
+        dest="config",
+        help="Path to the configuration file (.crs-linter.toml or pyproject.toml). By default it is searched in the current directory and its parents.",
+        required=False,
+    )
+    parser.add_argument(
+        "--select",
+        dest="select",
+        type=_rule_names,
+        help="Comma separated list of the rules to run, replaces `select` of the configuration file.",
+        required=False,
+    )
+    parser.add_argument(
+        "--extend-select",
+        dest="extend_select",
+        type=_rule_names,
+        help="Comma separated list of rules to run in addition to the selected ones, e.g. the rules disabled by default.",
+        required=False,
+    )
+    parser.add_argument(
+        "--ignore",
+        dest="ignore",
+        type=_rule_names,
+        help="Comma separated list of the rules not to run, added to `ignore` of the configuration file.",
+        required=False,
+    )
+    parser.add_argument(
+        "--threads",
+        dest="threads",
+        type=int,
+        default=1,
+        help="Number of threads checking the files (default: 1). Scales across cores on free-threaded Python builds.",
+        required=False,
+    )
+    parser.add_argument(
+        "--cache-dir",
+        dest="cache_dir",
+        help="Directory keeping data between runs: the file timings used to schedule the longest files first with --threads, and the results of the regex analyses.",
+        required=False,
+    )
+    parser.add_argument(
+        "--max-problems",
+        dest="max_problems",
+        type=int,
+        help="Stop after reporting N problems (1: stop at the first problem). The exit status is the same, the report is shorter.",
+        required=False,
+    )
     parser.add_argument(
         "--fail-fast",
         dest="fail_fast",
         help="Exit immediately on parsing errors instead of continuing.",
         action="store_true",
     )
+    parser.add_argument(
+        "--fix",
+        dest="fix",
+        help="Rewrite the files with indentation errors using the CRS formatting.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--baseline",
+        dest="baseline",
+        help="Path to a baseline file, only the problems missing from it are reported.",
+        required=False,
+    )
+    parser.add_argument(
+        "--write-baseline",
+        dest="write_baseline",
+        help="Write the problems found to the --baseline file instead of reporting them.",
+        action="store_true",
+    )
     parser.add_argument(
         "-r",
         "--rules",
@@ -194,11 +319,24 @@ def parse_args(argv):
         help="Path to file with exclusions. Exclusions are either full rule IDs or rule ID prefixes (e.g., 932), one entry per line. Lines beginning with `#` are considered comments.",
         required=not _arg_in_argv(argv, ["-T", "--test-directory"]),
     )
-    return parser.parse_args(argv)
+    args = parser.parse_args(argv)
+    if args.write_baseline and args.baseline is None:
+        parser.error("--write-baseline requires --baseline")
+    if args.threads < 1:
+        parser.error("--threads must be at least 1")
+    if args.max_problems is not None and args.max_problems < 1:
+        parser.error("--max-problems must be at least 1")
+    return args
 
 
 def main():
-    global logger
+    if sys.argv[1:2] == ["regex-bench"]:
+        from crs_linter.bench import main as bench_main
+        return bench_main(sys.argv[2:])
+    if sys.argv[1:2] == ["load-profile"]:
+        from crs_linter.load_profile import main as load_profile_main
+        return load_profile_main(sys.argv[2:])
+
     retval = 0
     cwd = pathlib.Path.cwd()
     args = parse_args(sys.argv[1:])
@@ -208,21 +346,18 @@ def main():
         files.extend(glob.glob(r))
 
     logger = Logger(output=args.output, debug=args.debug)
-    logger.debug(f"Current working directory: {cwd}")
+    logger.debug("Current working directory: %s", cwd)
 
     head_ref = args.head_ref if "head_ref" in args else None
     commit_message = args.commit_message if "commit_message" in args else None
     crs_version = get_crs_version(
         args.directory, args.version, head_ref, commit_message
     )
-    tags = get_lines_from_file(args.tagslist)
+    tags = get_lines_from_file(args.tagslist, logger)
     # Check all files by default
     filename_tags_exclusions = []
     if args.filename_tags_exclusions is not None:
-        filename_tags_exclusions = get_lines_from_file(args.filename_tags_exclusions)
-    parsed, file_contents = read_files(files, fail_fast=args.fail_fast)
-    txvars = {} # Shared dict for tracking TX variables across all files
-    ids = {}  # Shared dict for tracking rule IDs across all files
+        filename_tags_exclusions = get_lines_from_file(args.filename_tags_exclusions, logger)
 
     # Initialize test-related variables (may be None if not provided)
     test_cases = None
@@ -233,91 +368,154 @@ def main():
         if not os.path.isabs(args.tests):
             # if the path is relative, prepend the current working directory
             args.tests = os.path.join(cwd, args.tests)
-        testlist = glob.glob(os.path.join(f"{args.tests}", "**", "*.y[a]ml"))
-        testlist.sort()
-        if len(testlist) == 0:
-            logger.error(f"Can't open files in given path ({args.tests})!")
+        try:
+            test_cases = load_test_cases(args.tests)
+        except ConfigError as e:
+            logger.error(str(e))
             sys.exit(1)
         # read the exclusion list
-        test_exclusion_list = get_lines_from_file(args.filename_tests_exclusions)
-        test_cases = {}
-        # find the yaml files
-        # collect them in a dictionary and check for test
-        for tc in testlist:
-            tcname = os.path.basename(tc).split(".")[0]
-            test_cases[int(tcname)] = 1
+        test_exclusion_list = get_lines_from_file(args.filename_tests_exclusions, logger)
+
+    try:
+        config = load_config(args.config) if args.config is not None else find_config(cwd)
+        config = config.override(select=args.select, ignore=args.ignore, extend_select=args.extend_select)
+    except ConfigError as e:
+        logger.error(str(e))
+        sys.exit(1)
+    if config.path is not None:
+        logger.debug("Configuration file: %s", config.path)
+
+    # The session keeps the TX variables def-use graph and the rule ID index
+    # shared across all files; the files are added in order, so uses are
+    # resolved against the earlier definitions and the first occurrence of
+    # an ID wins
+    try:
+        session = LintSession(
+            tags=tags,
+            test_cases=test_cases,
+            test_exclusions=test_exclusion_list,
+            crs_version=crs_version,
+            filename_tag_exclusions=filename_tags_exclusions,
+            config=config,
+            cache_dir=args.cache_dir,
+        )
+    except ConfigError as e:
+        logger.error(str(e))
+        sys.exit(1)
+    timings = FileTimings.load(args.cache_dir) if args.cache_dir is not None else None
+    read_files(session, files, logger, fail_fast=args.fail_fast, timings=timings)
 
+    baseline = None
+    if args.write_baseline:
+        baseline = Baseline()
+    elif args.baseline is not None:
+        try:
+            baseline = Baseline.load(args.baseline)
+        except FileNotFoundError:
+            logger.error(f"Can't open file: {args.baseline}")
+            sys.exit(1)
+
+    reporter = get_reporter(args.output, session.rules, logger)
     logger.info("Checking parsed rules...")
-    for f in parsed.keys():
+    # number of problems left to report before stopping, None for no limit
+    remaining = args.max_problems
+    # the regexes of the rules are compiled once, shared by the regex-aware rules
+    session.prefetch_regexes(args.threads)
+    # Run all linting checks, exemptions are automatically applied
+    checks = check_files(session, logger, args.threads, timings)
+    for f, problems in checks:
         logger.start_group(f)
         logger.debug(f)
-        c = Linter(parsed[f], f, txvars, ids, file_content=file_contents.get(f))
 
-        # Run all linting checks using the new generic system
-        # Exemptions are automatically applied in run_checks()
-        problems = list(c.run_checks(
-            tagslist=tags,
-            test_cases=test_cases,
-            exclusion_list=test_exclusion_list,
-            crs_version=crs_version,
-            filename_tag_exclusions=filename_tags_exclusions
-        ))
+        if baseline is not None:
+            fingerprinter = Fingerprinter(f, session.content(f), session.ids)
+            if args.write_baseline:
+                baseline.update(problems, fingerprinter)
+                problems = []
+            else:
+                problems = baseline.filter(problems, fingerprinter)
 
-        # Group problems by rule type for better logging
-        problems_by_rule = {}
+        # Stream the problems to the reporter as the rules yield them
+        problem_count = 0
+        needs_fix = False
+        reporter.start_file(f)
         for problem in problems:
-            rule = problem.rule or "unknown"
-            if rule not in problems_by_rule:
-                problems_by_rule[rule] = []
-            problems_by_rule[rule].append(problem)
-
-        # Log results for each rule using the Rules system
-        for rule, problems_list in problems_by_rule.items():
-            success_msg, error_msg, title = c.rules.get_rule_messages(rule)
-            
-            if len(problems_list) == 0:
-                logger.debug(success_msg)
-            else:
-                logger.error(error_msg, file=f, title=title)
-                for problem in problems_list:
-                    logger.error(
-                        problem.desc,
-                        file=f,
-                        line=problem.line,
-                        end_line=problem.end_line,
-                    )
+            reporter.report(problem, f)
+            problem_count += 1
+            needs_fix = needs_fix or problem.rule == "indentation"
+            if remaining is not None:
+                remaining -= 1
+                if remaining == 0:
+                    break
+        if hasattr(problems, "close"):
+            # stops the rules still running on the file
+            problems.close()
+        reporter.end_file(f)
+
+        if args.fix and needs_fix:
+            fix_indentation(f, session.parsed(f), session.content(f), logger)
 
         # Set return value if any problems found
-        if len(problems) > 0:
-            logger.debug(f"Error(s) found in {f}.")
+        if problem_count > 0:
+            logger.debug("Error(s) found in %s.", f)
             retval = 1
 
         logger.end_group()
-        if len(problems) > 0 and logger.output == Output.GITHUB:
+        if problem_count > 0 and logger.output == Output.GITHUB:
             # Groups hide log entries, so if we find an error we need to tell
             # users where it is.
             logger.error("Error found in previous group")
+        if remaining == 0:
+            logger.info(f"Stopped after {args.max_problems} problem(s) (--max-problems)")
+            break
+    # cancels the files not checked yet
+    checks.close()
     logger.debug("End of checking parsed rules")
 
-    logger.debug("Cumulated report about unused TX variables")
-    has_unused = False
-    for tk in txvars:
-        if not txvars[tk]["used"]:
-            if not has_unused:
-                logger.debug("Unused TX variable(s):")
-            a = txvars[tk]
-            logger.error(
-                f"unused variable: {tk}",
-                title="unused TX variable",
-                line=a["line"],
-                end_line=a["endLine"],
+    if remaining == 0:
+        # the unused variables don't change the exit status
+        logger.debug("Skipped the report about unused TX variables")
+        unused = []
+    else:
+        logger.debug("Cumulated report about unused TX variables")
+        unused = session.unused_tx_variables()
+    if unused:
+        logger.debug("Unused TX variable(s):")
+    for definition in unused:
+        problems = [
+            LintProblem(
+                line=definition.line,
+                end_line=definition.line,
+                desc=f"unused variable: {definition.name}",
             )
-            has_unused = True
+        ]
+        if baseline is not None:
+            fingerprinter = Fingerprinter(definition.filename, session.content(definition.filename), session.ids)
+            if args.write_baseline:
+                baseline.update(problems, fingerprinter, rule="unused_tx_variable")
+                problems = []
+            else:
+                problems = baseline.filter(problems, fingerprinter, rule="unused_tx_variable")
+        for problem in problems:
+            reporter.report(problem, definition.filename, title="unused TX variable")
+    reporter.close()
 
-    if not has_unused:
+    if not unused and remaining != 0:
         logger.debug("No unused TX variable")
 
-    logger.debug(f"retval: {retval}")
+    if timings is not None:
+        try:
+            timings.save(args.cache_dir)
+        except OSError as e:
+            logger.warning(f"Can't write the cache: {e}")
+
+    if args.write_baseline:
+        baseline.save(args.baseline)
+        logger.info(f"Wrote {len(baseline)} fingerprint(s) to {args.baseline}")
+    elif baseline is not None and baseline.suppressed > 0:
+        logger.info(f"{baseline.suppressed} known problem(s) hidden by the baseline")
+
+    logger.debug("retval: %s", retval)
     return retval
 
 
@@ -0,0 +1,161 @@
+"""
+Linter configuration file.
+
+The configuration is read from `.crs-linter.toml`, or from the
+`[tool.crs-linter]` table of `pyproject.toml`, in the current directory or
+its parents:
+
+    # rules to run, all rules if not set
+    select = ["ignore_case", "crs_tag"]
+    # rules to run in addition to `select`, e.g. the rules disabled by default
+    extend-select = ["regex_backtracking"]
+    # rules not to run
+    ignore = ["indentation", "rule_tests"]
+
+    # rules to run (or not) on the files matching a glob
+    [per-file-select]
+    "rules/REQUEST-942-*.conf" = ["indentation"]
+
+    [per-file-ignores]
+    "plugins/*.conf" = ["crs_tag"]
+
+The globs are matched from the right of the file path, like
+`pathlib.PurePath.match()`.
+"""
+
+import tomllib
+from dataclasses import dataclass, field
+from pathlib import Path, PurePath
+from typing import Dict, List, Optional
+
+from .errors import ConfigError
+
+CONFIG_FILENAME = ".crs-linter.toml"
+PYPROJECT_FILENAME = "pyproject.toml"
+
+KNOWN_KEYS = {"select", "extend-select", "ignore", "per-file-select", "per-file-ignores"}
+
+
+@dataclass
+class LintConfig:
+    """Selection of the rules to run"""
+    # None means all rules
+    select: Optional[List[str]] = None
+    extend_select: List[str] = field(default_factory=list)
+    ignore: List[str] = field(default_factory=list)
+    # glob -> rule names
+    per_file_select: Dict[str, List[str]] = field(default_factory=dict)
+    per_file_ignores: Dict[str, List[str]] = field(default_factory=dict)
+    # file the configuration was read from
+    path: Optional[Path] = None
+
+    def rule_names(self):
+        """Return all the rule names used in the configuration"""
+        names = set(self.select or ()) | set(self.extend_select) | set(self.ignore)
+        for names_of_glob in list(self.per_file_select.values()) + list(self.per_file_ignores.values()):
+            names |= set(names_of_glob)
+        return names
+
+    def validate(self, known_names):
+        """Raise ConfigError if the configuration uses unknown rule names"""
+        unknown = self.rule_names() - set(known_names)
+        if unknown:
+            raise ConfigError(f"Unknown rule name(s): {', '.join(sorted(unknown))}")
+
+    def enabled_rules(self, all_names):
+        """Return the names of the rules enabled for at least one file"""
+        enabled = self._selected(all_names)
+        for names in self.per_file_select.values():
+            enabled |= set(names)
+        return enabled
+
+    def rules_for(self, filename, all_names):
+        """Return the names of the rules enabled for a file"""
+        enabled = self._selected(all_names)
+        path = PurePath(filename)
+        for pattern, names in self.per_file_select.items():
+            if path.match(pattern):
+                enabled |= set(names)
+        for pattern, names in self.per_file_ignores.items():
+            if path.match(pattern):
+                enabled -= set(names)
+        return enabled
+
+    def override(self, select=None, ignore=None, extend_select=None):
+        """Return a copy with the selection of the command line applied
+
+        `select` replaces the selected rules, `extend_select` and `ignore`
+        extend the added and ignored ones.
+        """
+        return LintConfig(
+            select=list(select) if select is not None else self.select,
+            extend_select=self.extend_select + list(extend_select or ()),
+            ignore=self.ignore + list(ignore or ()),
+            per_file_select=self.per_file_select,
+            per_file_ignores=self.per_file_ignores,
+            path=self.path,
+        )
+
+    def _selected(self, all_names):
+        selected = set(all_names) if self.select is None else set(self.select)
+        return (selected | set(self.extend_select)) - set(self.ignore)
+
+
+def _rule_list(value, key, path):
+    if not isinstance(value, list) or not all(isinstance(v, str) for v in value):
+        raise ConfigError(f"'{key}' must be a list of rule names in {path}")
+    return value
+
+
+def _glob_table(value, key, path):
+    if not isinstance(value, dict):
+        raise ConfigError(f"'{key}' must be a table of globs in {path}")
+    return {pattern: _rule_list(names, f"{key}.{pattern}", path) for pattern, names in value.items()}
+
+
+def parse_config(table, path=None):
+    """Build a LintConfig from the configuration table"""
+    unknown = set(table) - KNOWN_KEYS
+    if unknown:
+        raise ConfigError(f"Unknown configuration key(s) in {path}: {', '.join(sorted(unknown))}")
+    return LintConfig(
+        select=_rule_list(table["select"], "select", path) if "select" in table else None,
+        extend_select=_rule_list(table.get("extend-select", []), "extend-select", path),
+        ignore=_rule_list(table.get("ignore", []), "ignore", path),
+        per_file_select=_glob_table(table.get("per-file-select", {}), "per-file-select", path),
+        per_file_ignores=_glob_table(table.get("per-file-ignores", {}), "per-file-ignores", path),
+        path=path,
+    )
+
+
+def load_config(path):
+    """Read the configuration from a `.crs-linter.toml` or `pyproject.toml` file"""
+    path = Path(path)
+    try:
+        with open(path, "rb") as fp:
+            document = tomllib.load(fp)
+    except FileNotFoundError:
+        raise ConfigError(f"Can't open file: {path}")
+    except tomllib.TOMLDecodeError as e:
+        raise ConfigError(f"Can't parse {path}: {e}")
+    if path.name == PYPROJECT_FILENAME:
+        document = document.get("tool", {}).get("crs-linter", {})
+    return parse_config(document, path)
+
+
+def find_config(directory="."):
+    """Look for the configuration in the directory and its parents
+
+    Returns an empty configuration (all rules) if there is none.
+    """
+    directory = Path(directory).resolve()
+    for d in [directory, *directory.parents]:
+        if (d / CONFIG_FILENAME).is_file():
+            return load_config(d / CONFIG_FILENAME)
+        pyproject = d / PYPROJECT_FILENAME
+        if pyproject.is_file():
+            config = load_config(pyproject)
+            # a pyproject.toml without the table doesn't stop the search
+            if config != LintConfig(path=config.path):
+                return config
+    return LintConfig()
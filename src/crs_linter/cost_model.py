@@ -0,0 +1,207 @@
+"""
+Relative cost of evaluating the rules.
+
+The costs are abstract units, not times: they rank the rules against each
+other. A rule link costs, for every value it targets, its transformations
+and one operator run (one per transformation too with multiMatch). The
+transformations and operators cost a fixed amount each, an @rx regex also
+costs in proportion to its compiled size.
+
+The costs can be tuned in a TOML file, the values not given keep their
+default:
+
+    collection-size = 5.0
+    regex-size = 0.05
+    default-transformation = 1.0
+    default-operator = 1.0
+
+    # lowercase names
+    [transformations]
+    urldecodeuni = 2.0
+
+    [operators]
+    rx = 5.0
+
+    # values of a variable, or of a whole collection
+    [variables]
+    request_headers = 10.0
+"""
+
+import tomllib
+from dataclasses import dataclass, field, replace
+from typing import Dict
+
+from .errors import ConfigError
+
+# transformations that decode their input, several times as costly as the
+# character replacements
+DECODING_TRANSFORMATIONS = {
+    "base64decode", "base64decodeext", "cssdecode", "escapeseqdecode", "hexdecode", "htmlentitydecode",
+    "jsdecode", "sqlhexdecode", "urldecode", "urldecodeuni", "utf8tounicode",
+}
+
+DEFAULT_TRANSFORMATION_COSTS = {
+    **{name: 2.0 for name in DECODING_TRANSFORMATIONS},
+    "cmdline": 3.0,
+    "md5": 4.0,
+    "sha1": 4.0,
+    "normalisepath": 2.0,
+    "normalizepath": 2.0,
+    "normalisepathwin": 2.0,
+    "normalizepathwin": 2.0,
+    "removecomments": 2.0,
+    "replacecomments": 2.0,
+    "length": 0.1,
+    "trim": 0.5,
+    "trimleft": 0.5,
+    "trimright": 0.5,
+}
+
+DEFAULT_OPERATOR_COSTS = {
+    "rx": 5.0,
+    "detectsqli": 20.0,
+    "detectxss": 20.0,
+    "pm": 2.0,
+    "pmf": 2.0,
+    "pmfromfile": 2.0,
+    "rbl": 50.0,
+    "inspectfile": 50.0,
+    "validatebyterange": 2.0,
+    "validateurlencoding": 2.0,
+    "validateutf8encoding": 2.0,
+    "verifycc": 3.0,
+    "eq": 0.5,
+    "ge": 0.5,
+    "gt": 0.5,
+    "le": 0.5,
+    "lt": 0.5,
+    "unconditionalmatch": 0.1,
+    "nomatch": 0.1,
+}
+
+# the values a whole collection or a large variable counts for, the other
+# collections count for `collection_size`
+DEFAULT_VARIABLE_COSTS = {
+    "request_headers": 10.0,
+    "request_body": 10.0,
+    "response_body": 20.0,
+    "full_request": 20.0,
+}
+
+# variables holding a collection of values
+COLLECTIONS = {
+    "args", "args_get", "args_get_names", "args_names", "args_post", "args_post_names", "env", "files",
+    "files_names", "files_sizes", "files_tmpnames", "geo", "matched_vars", "matched_vars_names",
+    "multipart_part_headers", "request_cookies", "request_cookies_names", "request_headers",
+    "request_headers_names", "response_headers", "response_headers_names", "rule", "tx", "xml",
+}
+
+
+@dataclass(frozen=True)
+class CostModel:
+    """Relative costs of the transformations, operators and targets"""
+    # lowercase name -> cost of one run on one value
+    transformations: Dict[str, float] = field(default_factory=lambda: dict(DEFAULT_TRANSFORMATION_COSTS))
+    operators: Dict[str, float] = field(default_factory=lambda: dict(DEFAULT_OPERATOR_COSTS))
+    variables: Dict[str, float] = field(default_factory=lambda: dict(DEFAULT_VARIABLE_COSTS))
+    default_transformation: float = 1.0
+    default_operator: float = 1.0
+    # cost of an @rx regex per code word of its compiled form
+    regex_size: float = 0.05
+    # values of a collection variable, e.g. ARGS
+    collection_size: float = 5.0
+
+    def transformation_cost(self, names):
+        """Return the cost of a transformation pipeline on one value"""
+        return sum(self.transformations.get(name.lower(), self.default_transformation) for name in names)
+
+    def operator_cost(self, operator, regex=None):
+        """Return the cost of one operator run, `regex` is the RegexInfo of an @rx"""
+        name = operator.lstrip("!@").lower()
+        cost = self.operators.get(name, self.default_operator)
+        if name == "rx" and regex is not None:
+            cost += regex.compiled_size * self.regex_size
+        return cost
+
+    def target_count(self, variables):
+        """Return the estimated number of values the variables of a rule target
+
+        The exclusions (`!REQUEST_COOKIES:/__utm/`) aren't subtracted, they
+        only remove the values they match.
+        """
+        return sum(self.target_cost(v) for v in variables if not v.get("negated"))
+
+    def target_cost(self, variable):
+        """Return the estimated number of values of a variable of a rule"""
+        name = variable["variable"].lower()
+        if variable.get("counter"):
+            return 1.0
+        if is_collection(variable):
+            return self.variables.get(name, self.collection_size)
+        if variable.get("variable_part"):
+            return 1.0
+        return self.variables.get(name, 1.0)
+
+    def link_cost(self, directive, pipeline, regex=None, multi_match=False):
+        """Return the cost of a rule link with its effective transformation pipeline"""
+        runs = len(pipeline) + 1 if multi_match else 1
+        per_value = self.transformation_cost(pipeline) + runs * self.operator_cost(directive.get("operator", "rx"), regex)
+        return self.target_count(directive.get("variables", [])) * per_value
+
+
+DEFAULT_COST_MODEL = CostModel()
+
+# scalar keys of the cost model file -> fields
+SCALAR_KEYS = {
+    "collection-size": "collection_size",
+    "regex-size": "regex_size",
+    "default-transformation": "default_transformation",
+    "default-operator": "default_operator",
+}
+TABLE_KEYS = {"transformations", "operators", "variables"}
+
+
+def is_collection(variable):
+    """Return True if a (not counted) rule variable targets several values of a collection
+
+    A whole collection (`ARGS`), a key regex (`ARGS:/^id/`) or an XPath
+    (`XML:/*`) are, a key (`ARGS:id`) isn't.
+    """
+    name = variable["variable"].lower()
+    part = variable.get("variable_part") or ""
+    if variable.get("counter") or name not in COLLECTIONS:
+        return False
+    return not part or name == "xml" or (len(part) > 1 and part.startswith("/") and part.endswith("/"))
+
+
+def _cost(value, key, path):
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+        raise ConfigError(f"'{key}' must be a non-negative number in {path}")
+    return float(value)
+
+
+def parse_cost_model(table, path=None):
+    """Build a CostModel from a table, on top of the default costs"""
+    unknown = set(table) - set(SCALAR_KEYS) - TABLE_KEYS
+    if unknown:
+        raise ConfigError(f"Unknown cost model key(s) in {path}: {', '.join(sorted(unknown))}")
+    changes = {SCALAR_KEYS[key]: _cost(value, key, path) for key, value in table.items() if key in SCALAR_KEYS}
+    for key in TABLE_KEYS & set(table):
+        if not isinstance(table[key], dict):
+            raise ConfigError(f"'{key}' must be a table of costs in {path}")
+        costs = dict(getattr(DEFAULT_COST_MODEL, key))
+        costs.update({name.lower(): _cost(value, f"{key}.{name}", path) for name, value in table[key].items()})
+        changes[key] = costs
+    return replace(DEFAULT_COST_MODEL, **changes)
+
+
+def load_cost_model(path):
+    """Read a cost model TOML file"""
+    try:
+        with open(path, "rb") as fp:
+            table = tomllib.load(fp)
+    except FileNotFoundError:
+        raise ConfigError(f"Can't open file: {path}")
+    except tomllib.TOMLDecodeError as e:
+        raise ConfigError(f"Can't parse {path}: {e}")
+    return parse_cost_model(table, path)
@@ -0,0 +1,113 @@
+"""
+Inverted index of the directives of a parsed file.
+
+Rules declare the directives they apply to with an Applicability; the index
+maps every directive type, action name, operator and variable name to the
+positions of the directives using it, so the linter hands each rule only the
+matching directives (or chains) instead of the whole file.
+"""
+
+from dataclasses import dataclass
+from typing import FrozenSet
+
+
+@dataclass(frozen=True)
+class Applicability:
+    """The directives a rule applies to
+
+    A directive matches if it matches every given criterion, and it matches a
+    criterion if it uses one of its values. The names are case-insensitive.
+    It is a prefilter: the rule still checks the directives it gets.
+    """
+    # directive types, e.g. "secrule"
+    directives: FrozenSet[str] = frozenset()
+    # action names, e.g. "ctl"
+    actions: FrozenSet[str] = frozenset()
+    # operators, e.g. "@rx"
+    operators: FrozenSet[str] = frozenset()
+    # variable names, e.g. "request_cookies"
+    variables: FrozenSet[str] = frozenset()
+    # hand the whole chains of the matching directives
+    chains: bool = False
+
+    def __post_init__(self):
+        for field in ("directives", "actions", "operators", "variables"):
+            object.__setattr__(self, field, frozenset(v.lower() for v in getattr(self, field)))
+
+    def criteria(self):
+        """Return the (kind, values) pairs of the given criteria"""
+        return [
+            (kind, values)
+            for kind, values in (
+                ("directive", self.directives),
+                ("action", self.actions),
+                ("operator", self.operators),
+                ("variable", self.variables),
+            )
+            if values
+        ]
+
+
+class DirectiveIndex:
+    """Positions of the directives of a file by type, action, operator and variable"""
+
+    def __init__(self, data):
+        self.data = data
+        # (kind, lowercase name) -> positions in file order
+        self._positions = {}
+        # position -> (first, last) position of its chain
+        self._chains = {}
+        self._build()
+
+    def positions(self, kind, name):
+        """Return the positions of the directives using a name"""
+        return self._positions.get((kind, name.lower()), [])
+
+    def select(self, applicability):
+        """Return the directives matching the applicability, in file order"""
+        matching = None
+        for kind, values in applicability.criteria():
+            positions = set()
+            for value in values:
+                positions.update(self._positions.get((kind, value), ()))
+            matching = positions if matching is None else matching & positions
+        if matching is None:
+            return self.data
+        if applicability.chains:
+            expanded = set()
+            for pos in matching:
+                first, last = self._chains.get(pos, (pos, pos))
+                expanded.update(range(first, last + 1))
+            matching = expanded
+        return [self.data[pos] for pos in sorted(matching)]
+
+    def _add(self, kind, name, pos):
+        positions = self._positions.setdefault((kind, name.lower()), [])
+        if not positions or positions[-1] != pos:
+            positions.append(pos)
+
+    def _build(self):
+        chain_start = None
+        for pos, d in enumerate(self.data):
+            self._add("directive", d.get("type", ""), pos)
+            if d.get("operator"):
+                self._add("operator", d["operator"], pos)
+            for v in d.get("variables", ()):
+                self._add("variable", v["variable"], pos)
+            if "actions" not in d:
+                continue
+            chained = False
+            for a in d["actions"]:
+                self._add("action", a["act_name"], pos)
+                if a["act_name"] == "chain":
+                    chained = True
+            if chain_start is None:
+                chain_start = pos
+            if not chained:
+                for p in range(chain_start, pos + 1):
+                    self._chains[p] = (chain_start, pos)
+                chain_start = None
+        if chain_start is not None:
+            # unterminated chain at the end of the file
+            for p in range(chain_start, len(self.data)):
+                self._chains[p] = (chain_start, len(self.data) - 1)
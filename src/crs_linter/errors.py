@@ -0,0 +1,22 @@
+"""
+Errors raised by the linting API.
+"""
+
+
+class LintError(Exception):
+    """Base class of the errors raised by the linting API"""
+
+
+class ConfigError(LintError):
+    """A configuration file or directory can't be read or is invalid"""
+
+
+class ParseError(LintError):
+    """A rules file can't be parsed"""
+
+    def __init__(self, filename, line, cause):
+        super().__init__(f"Can't parse config file: {filename}")
+        self.filename = filename
+        self.line = line
+        # "Lexer" or "Parser"
+        self.cause = cause
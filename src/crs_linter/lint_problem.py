@@ -1,17 +1,44 @@
 class LintProblem:
-    """Represents a linting problem found by crs-linter."""
-    def __init__(self, line, end_line, column=None, desc='<no description>', rule=None):
+    """Represents a linting problem found by crs-linter.
+
+    Problems are immutable, use `replace()` to get a modified copy.
+    """
+    __slots__ = ("line", "end_line", "column", "desc", "rule", "rule_id", "filename")
+
+    #: Kept for compatibility, problems have no severity level
+    level = None
+
+    def __init__(self, line, end_line, column=None, desc='<no description>', rule=None, rule_id=None, filename=None):
+        set_attr = object.__setattr__
         #: Line on which the problem was found (starting at 1)
-        self.line = line
+        set_attr(self, "line", line)
         #: Line on which the problem ends
-        self.end_line = end_line
+        set_attr(self, "end_line", end_line)
         #: Column on which the problem was found (starting at 1)
-        self.column = column
+        set_attr(self, "column", column)
         #: Human-readable description of the problem
-        self.desc = desc
+        set_attr(self, "desc", desc)
         #: Identifier of the rule that detected the problem
-        self.rule = rule
-        self.level = None
+        set_attr(self, "rule", rule)
+        #: ID of the SecRule/SecAction the problem was found in
+        set_attr(self, "rule_id", rule_id)
+        #: File in which the problem was found
+        set_attr(self, "filename", filename)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"LintProblem is immutable, can't set '{name}'")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"LintProblem is immutable, can't delete '{name}'")
+
+    def __reduce__(self):
+        return (self.__class__, tuple(getattr(self, s) for s in self.__slots__))
+
+    def replace(self, **changes):
+        """Return a copy of the problem with some fields changed"""
+        fields = {s: getattr(self, s) for s in self.__slots__}
+        fields.update(changes)
+        return self.__class__(**fields)
 
     @property
     def message(self):
@@ -19,14 +46,28 @@ class LintProblem:
             return f'{self.desc} ({self.rule})'
         return self.desc
 
+    def sort_key(self):
+        """Key of the deterministic ordering: file, line, column, rule, description"""
+        return (
+            self.filename or "",
+            self.line or 0,
+            self.column or 0,
+            self.rule or "",
+            self.desc or "",
+        )
+
     def __eq__(self, other):
         return (self.line == other.line and
                 self.column == other.column and
                 self.rule == other.rule)
 
+    def __hash__(self):
+        return hash((self.line, self.column, self.rule))
+
     def __lt__(self, other):
-        return (self.line < other.line or
-                (self.line == other.line and self.column < other.column))
+        # a problem without column comes first on its line
+        return ((self.line, self.column or 0) <
+                (other.line, other.column or 0))
 
     def __repr__(self):
         return f'{self.line}:{self.column}: {self.message}'
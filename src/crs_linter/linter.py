@@ -3,29 +3,12 @@ import re
 import os.path
 import sys
 from .lint_problem import LintProblem
+from .tx_graph import TxVariableGraph
+from .rule_index import RuleIdIndex
+from .directive_index import DirectiveIndex
 from .rules_metadata import get_rules
 from .exemptions import parse_exemptions, should_exempt_problem, validate_exemption_names
 
-# Import all rules to trigger auto-registration via metaclass
-from .rules import (
-    approved_tags,
-    check_capture,
-    crs_tag,
-    deprecated,
-    duplicated,
-    ignore_case,
-    indentation,
-    lowercase_ignorecase,
-    no_negated_request_cookies,
-    ordered_actions,
-    pass_nolog,
-    pl_consistency,
-    rule_tests,
-    standalone_txn,
-    variables_usage,
-    version
-)
-
 
 class Linter:
     """Main linter class that orchestrates all rule checks."""
@@ -34,15 +17,17 @@ class Linter:
         self.data = data  # holds the parsed data
         self.filename = filename
         self.file_content = file_content  # original file content (before parsing)
-        self.globtxvars = txvars if txvars is not None else {}  # global TX variables hash table (shared across files)
-        self.ids = ids if ids is not None else {}  # list of rule id's and their location in files (shared across files)
+        self.globtxvars = txvars if txvars is not None else TxVariableGraph()  # global TX variables def-use graph (shared across files)
+        self.ids = ids if ids is not None else RuleIdIndex()  # index of rule id's and their location in files (shared across files)
 
         # regex to produce tag from filename:
         self.re_fname = re.compile(r"(REQUEST|RESPONSE)\-\d{3}\-")
         self.filename_tag_exclusions = []
+        # inverted index of the directives, built on first use
+        self._directive_index = None
 
         # Initialize rules system
-        self.rules = rules or get_rules()
+        self.rules = rules if rules is not None else get_rules()
 
         # Parse exemption comments from file content
         self.exemptions = parse_exemptions(file_content) if file_content else {}
@@ -55,6 +40,12 @@ class Linter:
             for warning in warnings:
                 print(f"Warning: {filename}: {warning}", file=sys.stderr)
 
+    def select_directives(self, applicability):
+        """Return the directives of the file matching an Applicability"""
+        if self._directive_index is None:
+            self._directive_index = DirectiveIndex(self.data)
+        return self._directive_index.select(applicability)
+
     def _get_rule_configs(self, tagslist=None, test_cases=None, exclusion_list=None, crs_version=None, filename_tag_exclusions=None):
         """
         Get rule configurations for the linter using the Rules system.
@@ -69,68 +60,65 @@ class Linter:
             filename_tag_exclusions=filename_tag_exclusions
         )
 
-    def run_checks(self, tagslist=None, test_cases=None, exclusion_list=None, crs_version=None, filename_tag_exclusions=None):
+    def run_checks(self, tagslist=None, test_cases=None, exclusion_list=None, crs_version=None, filename_tag_exclusions=None, rule_filter=None, plan=None):
         """
         Run all linting checks and yield LintProblem objects.
         This is the main entry point for the linter.
         Automatically filters out exempted problems based on exemption comments.
+        If `rule_filter` is given, only the rules it returns True for are run.
+        If a RunPlan compiled once for all files is given, it is used instead
+        of the other arguments.
         """
-        # First collect TX variables and check for duplicated IDs
+        # First collect TX variables and rule IDs
         self._collect_tx_variables()
+        self._collect_rule_ids()
+
+        if plan is not None:
+            rule_calls = plan.bind(self, rule_filter)
+        else:
+            rule_calls = self._rule_calls(
+                self._get_rule_configs(tagslist, test_cases, exclusion_list, crs_version, filename_tag_exclusions),
+                rule_filter,
+            )
 
-        # Get rule configurations
-        rule_configs = self._get_rule_configs(tagslist, test_cases, exclusion_list, crs_version, filename_tag_exclusions)
+        # the rule ID of the problems is looked up in the index, if available
+        rule_at = self.ids.rule_at if isinstance(self.ids, RuleIdIndex) else None
 
         # Run all rule checks generically and apply exemptions
+        for rule_instance, args, kwargs in rule_calls:
+            try:
+                for problem in rule_instance.check(*args, **kwargs):
+                    # Filter out exempted problems
+                    if not should_exempt_problem(problem, self.exemptions):
+                        entry = rule_at(self.filename, problem.line) if rule_at and problem.line else None
+                        yield problem.replace(
+                            filename=self.filename,
+                            rule_id=entry.rule_id if entry is not None else problem.rule_id,
+                        )
+            except Exception as e:
+                # Log error but continue with other rules
+                rule_name = getattr(rule_instance, '__class__', type(rule_instance)).__name__
+                print(f"Error running rule {rule_name}: {e}", file=sys.stderr)
+
+    @staticmethod
+    def _rule_calls(rule_configs, rule_filter=None):
         for rule_instance, args, kwargs, condition in rule_configs:
+            if rule_filter is not None and not rule_filter(rule_instance):
+                continue
             if condition is None or condition:  # Run if no condition or condition is True
-                try:
-                    for problem in rule_instance.check(*args, **kwargs):
-                        # Filter out exempted problems
-                        if not should_exempt_problem(problem, self.exemptions):
-                            yield problem
-                except Exception as e:
-                    # Log error but continue with other rules
-                    rule_name = getattr(rule_instance, '__class__', type(rule_instance)).__name__
-                    print(f"Error running rule {rule_name}: {e}", file=sys.stderr)
+                yield rule_instance, args, kwargs
 
     def _collect_tx_variables(self):
         """Collect TX variables in rules"""
-        chained = False
-        for d in self.data:
-            if "actions" in d:
-                if not chained:
-                    ruleid = 0  # ruleid
-                    phase = 2  # works only in Apache, libmodsecurity uses default phase 1
-                else:
-                    chained = False
-                for a in d["actions"]:
-                    if a["act_name"] == "id":
-                        ruleid = int(a["act_arg"])
-                    if a["act_name"] == "phase":
-                        phase = int(a["act_arg"])
-                    if a["act_name"] == "chain":
-                        chained = True
-                    if a["act_name"] == "setvar":
-                        if a["act_arg"][0:2].lower() == "tx":
-                            txv = a["act_arg"][3:].split("=")
-                            txv[0] = txv[0].lower()
-                            # set TX variable if there is no such key
-                            # OR
-                            # key exists but the existing struct's phase is higher
-                            if (
-                                txv[0] not in self.globtxvars
-                                or self.globtxvars[txv[0]]["phase"] > phase
-                            ) and not re.search(r"%\{[^%]+}", txv[0]):
-                                self.globtxvars[txv[0]] = {
-                                    "phase": phase,
-                                    "used": False,
-                                    "file": self.filename,
-                                    "ruleid": ruleid,
-                                    "message": "",
-                                    "line": a["lineno"],
-                                    "endLine": a["lineno"],
-                                }
+        if not isinstance(self.globtxvars, TxVariableGraph):
+            # a plain symbol table was passed, upgrade it to a graph
+            self.globtxvars = TxVariableGraph(self.globtxvars)
+        self.globtxvars.add_file(self.filename, self.data)
+
+    def _collect_rule_ids(self):
+        """Add the rule IDs to the index, plain dicts are filled in by the duplicated rule"""
+        if isinstance(self.ids, RuleIdIndex):
+            self.ids.add_file(self.filename, self.data)
 
     def gen_crs_file_tag(self, fname=None):
         """
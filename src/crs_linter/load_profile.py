@@ -0,0 +1,233 @@
+"""
+`crs-linter load-profile`: estimate the evaluation load of the rules.
+
+Every rule is weighed with a cost model (see `cost_model.py`): the values of
+the variables it targets (a whole collection like ARGS counts for several
+values, a key like ARGS:id for one), the transformations applied to each
+value and the class of its operator. The costs are summed by rule, by file
+and by paranoia level, cumulatively: raising the paranoia level to N also
+runs the rules of the levels below. The rules outside of the paranoia level
+sections run at every level.
+"""
+
+import argparse
+import glob
+import json
+import os.path
+import sys
+from dataclasses import asdict, dataclass, field
+from typing import List
+
+from .cost_model import DEFAULT_COST_MODEL, is_collection, load_cost_model
+from .errors import ConfigError, ParseError
+from .regex_analysis import regex_cache
+from .rules.pl_consistency import PL_ARGUMENT_PATTERN
+from .rules.transformation_pipeline import TransformationPipeline
+from .session import read_and_parse
+
+DEFAULT_TOP = 10
+
+
+@dataclass
+class RuleLoad:
+    """The estimated load of a rule (with its chained rules)"""
+    filename: str
+    line: int
+    rule_id: int
+    phase: str
+    # 0 for the rules run at every paranoia level
+    paranoia_level: int
+    cost: float
+    # the variables scanning a collection, e.g. ARGS or XML:/*
+    collections: List[str] = field(default_factory=list)
+    # the excluded variables, e.g. !REQUEST_COOKIES:/__utm/
+    exclusions: List[str] = field(default_factory=list)
+    # transformations applied, summed over the chained rules
+    transformations: int = 0
+    operators: List[str] = field(default_factory=list)
+
+
+def _variable_name(v):
+    name = ("&" if v.get("counter") else "") + v["variable"]
+    return f'{name}:{v["variable_part"]}' if v.get("variable_part") else name
+
+
+def paranoia_levels(data):
+    """Return the paranoia level of the rules by id
+
+    The `paranoia-level/N` tag of a rule wins over the paranoia level section
+    it is in (`SecRule TX:DETECTION_PARANOIA_LEVEL "@lt N" ... skipAfter`).
+    """
+    levels = {}
+    current = 0
+    ruleid = 0
+    for d in data:
+        for a in d.get("actions", []):
+            if a["act_name"] == "id":
+                ruleid = int(a["act_arg"])
+                levels.setdefault(ruleid, current)
+            elif a["act_name"] == "tag" and a["act_arg"].startswith("paranoia-level/"):
+                level = a["act_arg"].split("/")[1]
+                if level.isdigit():
+                    levels[ruleid] = int(level)
+        if d["type"].lower() == "secrule":
+            for v in d.get("variables", []):
+                if (
+                    v["variable"].lower() == "tx"
+                    and v["variable_part"].lower() == "detection_paranoia_level"
+                    and d["operator"] == "@lt"
+                    and PL_ARGUMENT_PATTERN.match(d["operator_argument"])
+                ):
+                    # the rule skipping the section runs on the level below
+                    current = int(d["operator_argument"])
+    return levels
+
+
+def profile_file(filename, data, model=DEFAULT_COST_MODEL):
+    """Return the RuleLoads of the rules of a parsed file"""
+    levels = paranoia_levels(data)
+    loads = []
+    for chain in TransformationPipeline().chains(data, regex_cache(), model):
+        load = RuleLoad(
+            filename=filename,
+            line=chain["line"],
+            rule_id=chain["ruleid"],
+            phase=chain["phase"],
+            paranoia_level=levels.get(chain["ruleid"], 0),
+            cost=round(chain["cost"], 3),
+        )
+        for link in chain["links"]:
+            for v in link["variables"]:
+                name = _variable_name(v)
+                if v.get("negated"):
+                    load.exclusions.append("!" + name)
+                elif is_collection(v) and name not in load.collections:
+                    load.collections.append(name)
+            load.transformations += len(link["transformations"])
+            load.operators.append(link["operator"])
+        loads.append(load)
+    return loads
+
+
+def level_totals(loads):
+    """Return the (paranoia level, cumulative cost, rules run) of every paranoia level"""
+    levels = sorted({load.paranoia_level for load in loads} - {0}) or [0]
+    totals = []
+    for level in levels:
+        running = [load for load in loads if load.paranoia_level <= level]
+        totals.append((level, round(sum(load.cost for load in running), 3), len(running)))
+    return totals
+
+
+def file_totals(loads):
+    """Return the (filename, cost) of the files, in file order"""
+    totals = {}
+    for load in loads:
+        totals[load.filename] = totals.get(load.filename, 0.0) + load.cost
+    return [(filename, round(cost, 3)) for filename, cost in totals.items()]
+
+
+def _label(load):
+    return f"{load.rule_id} ({os.path.basename(load.filename)}:{load.line})"
+
+
+def _details(load):
+    parts = [f"phase {load.phase}", f"{load.transformations} transformation(s)", " ".join(load.operators)]
+    if load.collections:
+        parts.insert(1, "collections " + ", ".join(load.collections))
+    if load.exclusions:
+        parts.insert(2, "excluding " + ", ".join(load.exclusions))
+    return "; ".join(parts)
+
+
+def format_report(loads, top=DEFAULT_TOP):
+    """Return the lines of the report"""
+    lines = ["Load by paranoia level (the rules of the level and below):"]
+    previous = None
+    for level, cost, count in level_totals(loads):
+        name = f"PL{level}" if level else "all"
+        increase = f" (+{(cost - previous) / previous * 100:.0f}%)" if previous else ""
+        lines.append(f"  {name:<4} {cost:>12.1f}{increase}, {count} rule(s)")
+        previous = cost
+    lines.append("")
+    lines.append("Load by file:")
+    for filename, cost in sorted(file_totals(loads), key=lambda item: item[1], reverse=True):
+        lines.append(f"  {cost:>12.1f}  {filename}")
+    lines.append("")
+    for level in sorted({load.paranoia_level for load in loads}):
+        at_level = [load for load in loads if load.paranoia_level == level]
+        name = f"PL{level}" if level else "all paranoia levels"
+        # ties keep the file order
+        ranked = sorted(at_level, key=lambda load: load.cost, reverse=True)[:top]
+        lines.append(f"Top {len(ranked)} rules at {name}:")
+        for i, load in enumerate(ranked, 1):
+            lines.append(f"{i:>4}. {load.cost:>10.1f}  rule {_label(load)}: {_details(load)}")
+        lines.append("")
+    return lines
+
+
+def to_json(loads):
+    """Return the profile as a JSON document"""
+    return json.dumps({
+        "levels": [{"paranoia_level": level, "cost": cost, "rules": count} for level, cost, count in level_totals(loads)],
+        "files": [{"filename": filename, "cost": cost} for filename, cost in file_totals(loads)],
+        "rules": [asdict(load) for load in loads],
+    }, indent=1, sort_keys=True)
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        prog="crs-linter load-profile", description="Estimate the evaluation load of the rules by paranoia level"
+    )
+    parser.add_argument(
+        "-r",
+        "--rules",
+        dest="crs_rules",
+        help="CRS rules file to profile. Can be used multiple times.",
+        action="append",
+        required=True,
+    )
+    parser.add_argument(
+        "--cost-model",
+        dest="cost_model",
+        help="TOML file with the costs of the transformations, operators and variables.",
+        required=False,
+    )
+    parser.add_argument(
+        "--top",
+        dest="top",
+        type=int,
+        default=DEFAULT_TOP,
+        help=f"Number of rules listed for each paranoia level (default: {DEFAULT_TOP}).",
+    )
+    parser.add_argument(
+        "--json",
+        dest="json",
+        help="Write the profile of all rules to a JSON file.",
+        required=False,
+    )
+    args = parser.parse_args(argv)
+    if args.top < 1:
+        parser.error("--top must be at least 1")
+    return args
+
+
+def main(argv):
+    args = parse_args(argv)
+    filenames = sorted({f for pattern in args.crs_rules for f in glob.glob(pattern)})
+    try:
+        model = load_cost_model(args.cost_model) if args.cost_model is not None else DEFAULT_COST_MODEL
+        loads = []
+        for filename in filenames:
+            data, _ = read_and_parse(filename)
+            loads.extend(profile_file(filename, data, model))
+    except (ConfigError, ParseError) as e:
+        print(str(e), file=sys.stderr)
+        return 1
+    print(f"Estimated load of {len(loads)} rule(s) of {len(filenames)} file(s), in relative cost units\n")
+    for line in format_report(loads, args.top):
+        print(line)
+    if args.json is not None:
+        with open(args.json, "w", encoding="UTF-8") as fp:
+            fp.write(to_json(loads) + "\n")
+    return 0
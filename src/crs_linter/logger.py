@@ -7,6 +7,8 @@ import github_action_utils as gha_utils
 class Output(StrEnum):
     NATIVE = auto()
     GITHUB = auto()
+    JSONL = auto()
+    SARIF = auto()
 
 
 class Logger:
@@ -14,7 +16,9 @@ class Logger:
         self.output = output
         self.debugging = debug
         level = logging.INFO
-        if self.output == Output.NATIVE:
+        # the machine readable outputs write the problems to stdout, the
+        # messages go to stderr through logging
+        if self.output != Output.GITHUB:
             level = logging.DEBUG if self.debugging else logging.INFO
             logging.basicConfig(level=level)
             self.logger = logging.getLogger()
@@ -30,29 +34,28 @@ class Logger:
         if self.output == Output.GITHUB:
             self.logger.end_group()
 
-    def debug(self, *args, **kwargs):
+    def debug(self, msg, *args, **kwargs):
+        """Log a debug message, `msg % args` is only formatted when debugging"""
         if self.debugging:
-            if self.output == Output.NATIVE:
-                self.logger.debug(*args)
+            if self.output != Output.GITHUB:
+                self.logger.debug(msg, *args)
             else:
-                self.logger.debug(*args, **kwargs)
-
-        pass
+                self.logger.debug(msg % args if args else msg, **kwargs)
 
     def error(self, *args, **kwargs):
-        if self.output == Output.NATIVE:
+        if self.output != Output.GITHUB:
             self.logger.error(*args)
         else:
             self.logger.error(*args, **kwargs)
 
     def warning(self, *args, **kwargs):
-        if self.output == Output.NATIVE:
+        if self.output != Output.GITHUB:
             self.logger.warning(*args)
         else:
             self.logger.warning(*args, **kwargs)
 
     def info(self, *args, **kwargs):
-        if self.output == Output.NATIVE:
+        if self.output != Output.GITHUB:
             self.logger.info(*args, **kwargs)
         else:
             self.logger.notice(*args, **kwargs)
@@ -0,0 +1,130 @@
+"""
+Compact storage of the linting problems.
+
+The problems of many files (and workers) are stored column by column in
+arrays, the file names, rule names and descriptions are interned, so a
+problem costs a few machine words instead of an object with its fields.
+"""
+
+import heapq
+from array import array
+from itertools import groupby
+
+from .lint_problem import LintProblem
+
+# stored for the missing column / rule ID
+_NONE = -1
+
+
+class ProblemStore:
+    """Array-backed store of LintProblem records"""
+
+    def __init__(self, problems=()):
+        self._lines = array("q")
+        self._end_lines = array("q")
+        self._columns = array("q")
+        self._rule_ids = array("q")
+        self._files = array("l")
+        self._rules = array("l")
+        self._descs = array("l")
+        # interned strings, index -> string and string -> index
+        self._strings = []
+        self._string_index = {}
+        self._sorted = True
+        self.extend(problems)
+
+    def __len__(self):
+        return len(self._lines)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __getitem__(self, i):
+        column = self._columns[i]
+        rule_id = self._rule_ids[i]
+        return LintProblem(
+            line=self._lines[i],
+            end_line=self._end_lines[i],
+            column=None if column == _NONE else column,
+            desc=self._strings[self._descs[i]],
+            rule=self._strings[self._rules[i]],
+            rule_id=None if rule_id == _NONE else rule_id,
+            filename=self._strings[self._files[i]],
+        )
+
+    def append(self, problem):
+        """Add a problem to the store"""
+        if self._sorted and len(self) > 0 and problem.sort_key() < self._key(len(self) - 1):
+            self._sorted = False
+        self._lines.append(problem.line or 0)
+        self._end_lines.append(problem.end_line or 0)
+        self._columns.append(_NONE if problem.column is None else problem.column)
+        self._rule_ids.append(_NONE if problem.rule_id is None else problem.rule_id)
+        self._files.append(self._intern(problem.filename))
+        self._rules.append(self._intern(problem.rule))
+        self._descs.append(self._intern(problem.desc))
+
+    def extend(self, problems):
+        """Add the problems of an iterable to the store"""
+        for problem in problems:
+            self.append(problem)
+
+    def count(self, filename=None):
+        """Return the number of problems, optionally of one file only"""
+        if filename is None:
+            return len(self)
+        index = self._string_index.get(("s", filename))
+        return 0 if index is None else self._files.count(index)
+
+    def sorted(self):
+        """Yield the problems in deterministic order (file, line, column, rule, description)"""
+        if self._sorted:
+            return iter(self)
+        order = sorted(range(len(self)), key=self._key)
+        return (self[i] for i in order)
+
+    def group_by_file(self):
+        """Yield (filename, problems) pairs, in deterministic order"""
+        for filename, problems in groupby(self.sorted(), key=lambda p: p.filename):
+            yield filename, problems
+
+    def group_by_rule(self):
+        """Yield (filename, rule, problems) triples, in deterministic order
+
+        The problems of a file are ordered by rule first, then by line.
+        """
+        order = sorted(range(len(self)), key=self._rule_key)
+        problems = (self[i] for i in order)
+        for (filename, rule), group in groupby(problems, key=lambda p: (p.filename, p.rule)):
+            yield filename, rule, group
+
+    @staticmethod
+    def merge(*streams):
+        """Merge sorted problem streams (e.g. one per worker) into one sorted stream"""
+        return heapq.merge(*streams, key=LintProblem.sort_key)
+
+    def _intern(self, value):
+        # None and strings are kept apart, an empty rule name is not a missing one
+        key = ("n", None) if value is None else ("s", value)
+        index = self._string_index.get(key)
+        if index is None:
+            index = len(self._strings)
+            self._strings.append(value)
+            self._string_index[key] = index
+        return index
+
+    def _key(self, i):
+        strings = self._strings
+        column = self._columns[i]
+        return (
+            strings[self._files[i]] or "",
+            self._lines[i],
+            0 if column == _NONE else column,
+            strings[self._rules[i]] or "",
+            strings[self._descs[i]] or "",
+        )
+
+    def _rule_key(self, i):
+        key = self._key(i)
+        return key[0], key[3], key[1], key[2], key[4]
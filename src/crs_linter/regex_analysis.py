@@ -0,0 +1,878 @@
+"""
+Static analysis of the `@rx` regular expressions.
+
+The patterns are parsed with the parser of the `re` module (`re._parser`),
+whose syntax is close enough to PCRE for the CRS regexes; patterns it can't
+parse are not analyzed. The parsed tree is a list of `(opcode, argument)`
+items, see `re._constants`.
+
+A RegexCache shared by the rules of a run parses and compiles every regex
+once, the facts derived from it (RegexInfo) are kept in the cache directory.
+
+Characters are modeled as bit masks over the code points 0-255, with one more
+bit standing for all the code points above 255.
+"""
+
+import json
+import re
+import string
+import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, replace
+from functools import cached_property
+from os.path import commonprefix
+from re import _compiler as sre_compile
+from re import _constants as C
+from re import _parser as sre_parse
+from typing import List, Optional, Tuple
+
+from .cache import hash_key, result_cache
+
+HIGH_BIT = 1 << 256
+ALL_CHARS = (1 << 257) - 1
+NEWLINE = 1 << ord("\n")
+
+REPEATS = (C.MAX_REPEAT, C.MIN_REPEAT)
+# constructs that never backtrack into their content once matched
+NON_BACKTRACKING = (C.POSSESSIVE_REPEAT, C.ATOMIC_GROUP)
+
+# findings
+NESTED_QUANTIFIERS = "nested quantifiers"
+OVERLAPPING_ALTERNATION = "overlapping alternation"
+ADJACENT_QUANTIFIERS = "adjacent quantifiers"
+
+# repetitions of the pump in the attack strings
+EXPONENTIAL_PUMPS = 32
+POLYNOMIAL_PUMPS = 5000
+
+# a confirmation run slower than this means the regex backtracks
+SLOW_SECONDS = 0.5
+# the confirmation run is killed after this
+TIMEOUT_SECONDS = 2.0
+
+# backtracking of the findings: exponential or polynomial in the input length
+EXPONENTIAL = {NESTED_QUANTIFIERS, OVERLAPPING_ALTERNATION}
+
+
+def _category_mask(pattern, high):
+    mask = sum(1 << i for i in range(256) if re.match(pattern, chr(i)))
+    return mask | (HIGH_BIT if high else 0)
+
+
+CATEGORY_MASKS = {
+    C.CATEGORY_DIGIT: _category_mask(r"\d", False),
+    C.CATEGORY_NOT_DIGIT: _category_mask(r"\D", True),
+    C.CATEGORY_SPACE: _category_mask(r"\s", False),
+    C.CATEGORY_NOT_SPACE: _category_mask(r"\S", True),
+    # code points above 255 can be word characters or not
+    C.CATEGORY_WORD: _category_mask(r"\w", True),
+    C.CATEGORY_NOT_WORD: _category_mask(r"\W", True),
+}
+
+AT_CODES = {
+    C.AT_BEGINNING: "^",
+    C.AT_BEGINNING_STRING: r"\A",
+    C.AT_END: "$",
+    C.AT_END_STRING: r"\Z",
+    C.AT_BOUNDARY: r"\b",
+    C.AT_NON_BOUNDARY: r"\B",
+}
+
+CATEGORY_CODES = {
+    C.CATEGORY_DIGIT: r"\d",
+    C.CATEGORY_NOT_DIGIT: r"\D",
+    C.CATEGORY_SPACE: r"\s",
+    C.CATEGORY_NOT_SPACE: r"\S",
+    C.CATEGORY_WORD: r"\w",
+    C.CATEGORY_NOT_WORD: r"\W",
+}
+
+# preferred characters of the generated attack strings
+_NICE_CHARS = string.ascii_letters + string.digits + " _-.,;:/\\'\"<>=()[]{}!?*+&|%$#@~^`\t\n"
+
+
+@dataclass(frozen=True)
+class Finding:
+    """A construct of a regex that can backtrack catastrophically."""
+    kind: str
+    # the construct, rendered from the parsed regex
+    subpattern: str
+    # input that should make the regex backtrack: prefix + pump * n + suffix
+    prefix: str = ""
+    pump: str = "a"
+    suffix: str = "!"
+
+    @property
+    def exponential(self):
+        return self.kind in EXPONENTIAL
+
+    def attack_string(self, repeat=None):
+        """Return the input pumping the construct"""
+        if repeat is None:
+            repeat = EXPONENTIAL_PUMPS if self.exponential else POLYNOMIAL_PUMPS
+        return self.prefix + self.pump * repeat + self.suffix
+
+
+def parse_regex(pattern):
+    """Parse a regex, raises re.error if it can't be parsed"""
+    return sre_parse.parse(pattern)
+
+
+def _char_bit(c):
+    return 1 << c if c < 256 else HIGH_BIT
+
+
+def _swapcase_mask(mask):
+    swapped = 0
+    for c in string.ascii_letters:
+        if mask & (1 << ord(c)):
+            swapped |= 1 << ord(c.swapcase())
+    return mask | swapped
+
+
+def _in_mask(items):
+    mask = 0
+    negate = False
+    for op, av in items:
+        if op is C.NEGATE:
+            negate = True
+        elif op is C.LITERAL:
+            mask |= _char_bit(av)
+        elif op is C.RANGE:
+            lo, hi = av
+            mask |= sum(1 << c for c in range(lo, min(hi, 255) + 1))
+            if hi > 255:
+                mask |= HIGH_BIT
+        elif op is C.CATEGORY:
+            mask |= CATEGORY_MASKS.get(av, ALL_CHARS)
+        else:
+            mask = ALL_CHARS
+    return (ALL_CHARS & ~mask) | (HIGH_BIT if mask & HIGH_BIT else 0) if negate else mask
+
+
+class RegexAnalyzer:
+    """Find the constructs of a parsed regex that can backtrack catastrophically"""
+
+    def __init__(self, parsed):
+        self.parsed = parsed
+        self.ignorecase = bool(parsed.state.flags & re.IGNORECASE)
+        self.dotall = bool(parsed.state.flags & re.DOTALL)
+        self._min_widths = {}
+        self._chars = {}
+        self.findings: List[Finding] = []
+
+    def analyze(self) -> List[Finding]:
+        """Return the findings, one per construct"""
+        self.findings = []
+        self._walk(self.parsed, "")
+        # a character the regex doesn't use, to make the match fail after the pump
+        suffix = _example_char(ALL_CHARS & ~HIGH_BIT & ~self.seq_chars(self.parsed)) or "\x00"
+        seen = set()
+        unique = []
+        for f in self.findings:
+            if (f.kind, f.subpattern) not in seen:
+                seen.add((f.kind, f.subpattern))
+                unique.append(replace(f, suffix=suffix))
+        return unique
+
+    # --- properties of the items
+
+    def min_width(self, item):
+        key = id(item)
+        width = self._min_widths.get(key)
+        if width is None:
+            width = self._min_width(item)
+            self._min_widths[key] = width
+        return width
+
+    def _min_width(self, item):
+        op, av = item
+        if op in (C.LITERAL, C.NOT_LITERAL, C.ANY, C.IN):
+            return 1
+        if op in REPEATS or op is C.POSSESSIVE_REPEAT:
+            return av[0] * self.seq_min_width(av[2])
+        if op is C.SUBPATTERN:
+            return self.seq_min_width(av[3])
+        if op is C.ATOMIC_GROUP:
+            return self.seq_min_width(av)
+        if op is C.BRANCH:
+            return min((self.seq_min_width(alt) for alt in av[1]), default=0)
+        if op is C.GROUPREF_EXISTS:
+            return min(self.seq_min_width(av[1]), self.seq_min_width(av[2] or []))
+        # assertions, anchors and back references (may be empty)
+        return 0
+
+    def seq_min_width(self, seq):
+        return sum(self.min_width(item) for item in seq)
+
+    def nullable(self, item):
+        return self.min_width(item) == 0
+
+    def chars(self, item):
+        """Return the mask of the characters an item can consume"""
+        key = id(item)
+        mask = self._chars.get(key)
+        if mask is None:
+            mask = self._item_chars(item)
+            self._chars[key] = mask
+        return mask
+
+    def _item_chars(self, item):
+        op, av = item
+        if op is C.LITERAL:
+            mask = _char_bit(av)
+        elif op is C.NOT_LITERAL:
+            mask = ALL_CHARS & ~_char_bit(av) | HIGH_BIT
+        elif op is C.ANY:
+            return ALL_CHARS if self.dotall else ALL_CHARS & ~NEWLINE
+        elif op is C.IN:
+            mask = _in_mask(av)
+        elif op in REPEATS or op is C.POSSESSIVE_REPEAT:
+            return self.seq_chars(av[2])
+        elif op is C.SUBPATTERN:
+            return self.seq_chars(av[3])
+        elif op is C.ATOMIC_GROUP:
+            return self.seq_chars(av)
+        elif op is C.BRANCH:
+            mask = 0
+            for alt in av[1]:
+                mask |= self.seq_chars(alt)
+            return mask
+        elif op is C.GROUPREF_EXISTS:
+            return self.seq_chars(av[1]) | self.seq_chars(av[2] or [])
+        elif op is C.GROUPREF:
+            return ALL_CHARS
+        else:
+            return 0
+        return _swapcase_mask(mask) if self.ignorecase else mask
+
+    def seq_chars(self, seq):
+        mask = 0
+        for item in seq:
+            mask |= self.chars(item)
+        return mask
+
+    def single_char_masks(self, seq):
+        """Return the masks of a sequence of single characters, None if it is something else"""
+        masks = []
+        for item in seq:
+            op, av = item
+            if op in (C.LITERAL, C.NOT_LITERAL, C.ANY, C.IN):
+                masks.append(self.chars(item))
+            elif op is C.SUBPATTERN:
+                inner = self.single_char_masks(av[3])
+                if inner is None:
+                    return None
+                masks.extend(inner)
+            else:
+                return None
+        return masks
+
+    # --- detection
+
+    def _walk(self, seq, prefix):
+        seq = list(seq)
+        for i, item in enumerate(seq):
+            op, av = item
+            here = prefix + self.example_seq(seq[:i])
+            if op in REPEATS:
+                lo, hi, body = av
+                if hi == C.MAXREPEAT:
+                    self._check_nested(item, body, here)
+                    self._check_alternation(item, body, here)
+                self._walk(body, here)
+            elif op in NON_BACKTRACKING:
+                self._walk(av[2] if op is C.POSSESSIVE_REPEAT else av, here)
+            elif op is C.SUBPATTERN:
+                self._walk(av[3], here)
+            elif op is C.BRANCH:
+                for alt in av[1]:
+                    self._walk(alt, here)
+            elif op in (C.ASSERT, C.ASSERT_NOT):
+                self._walk(av[1], here)
+            elif op is C.GROUPREF_EXISTS:
+                self._walk(av[1], here)
+                if av[2]:
+                    self._walk(av[2], here)
+        self._check_adjacent(seq, prefix)
+
+    def _inner_repeat(self, seq):
+        """Find an unbounded repeat that can match the whole sequence
+
+        Return the repeat and the innermost sequence containing it, or None.
+        """
+        seq = list(seq)
+        for i, item in enumerate(seq):
+            op, av = item
+            found = None
+            if op in REPEATS and av[1] == C.MAXREPEAT:
+                found = item, seq
+            elif op is C.SUBPATTERN:
+                found = self._inner_repeat(av[3])
+            elif op is C.BRANCH:
+                for alt in av[1]:
+                    found = self._inner_repeat(alt)
+                    if found is not None:
+                        break
+            if found is None:
+                continue
+            inner_chars = self.seq_chars(found[0][1][2])
+            others = seq[:i] + seq[i + 1:]
+            if all(self.nullable(o) or not self.chars(o) & ~inner_chars for o in others):
+                return found
+        return None
+
+    def _check_nested(self, item, body, prefix):
+        # e.g. (a+)+ or (\w+\s?)*: an input can be split in exponentially
+        # many ways between the iterations of the inner and outer repeats
+        found = self._inner_repeat(body)
+        if found is not None and self.seq_min_width(found[0][1][2]) > 0:
+            pump = self.example_seq(found[1]) or self.example_seq(found[0][1][2])
+            self.findings.append(Finding(NESTED_QUANTIFIERS, render([item]), prefix, pump))
+
+    def _branches(self, seq):
+        for op, av in seq:
+            if op is C.BRANCH:
+                yield av[1]
+            elif op is C.SUBPATTERN:
+                yield from self._branches(av[3])
+
+    def _check_alternation(self, item, body, prefix):
+        # e.g. (a|a)* or (.|\s)*: the alternatives match the same input, so
+        # each iteration can take either of them
+        for alternatives in self._branches(body):
+            by_length = {}
+            for alt in alternatives:
+                masks = self.single_char_masks(alt)
+                if masks is not None:
+                    by_length.setdefault(len(masks), []).append(masks)
+            for group in by_length.values():
+                for i, a in enumerate(group):
+                    for b in group[i + 1:]:
+                        common = [x & y for x, y in zip(a, b)]
+                        if all(common):
+                            pump = "".join(_example_char(m) for m in common) or self.example_seq(body)
+                            self.findings.append(Finding(OVERLAPPING_ALTERNATION, render([item]), prefix, pump or "a"))
+                            return
+
+    def _check_adjacent(self, seq, prefix):
+        # e.g. \s*\s* or .*\s*: the input can be split in quadratically many
+        # ways between the two repeats
+        seq = list(seq)
+        repeats = [
+            (i, item) for i, item in enumerate(seq)
+            if item[0] in REPEATS and item[1][1] == C.MAXREPEAT
+            and self.single_char_masks(item[1][2]) is not None
+            and len(self.single_char_masks(item[1][2])) == 1
+        ]
+        for (i, a), (j, b) in zip(repeats, repeats[1:]):
+            common = self.chars(a) & self.chars(b)
+            if not common:
+                continue
+            between = seq[i + 1:j]
+            if all(self.nullable(o) or not self.chars(o) & ~common for o in between):
+                self.findings.append(Finding(
+                    ADJACENT_QUANTIFIERS,
+                    render(seq[i:j + 1]),
+                    prefix + self.example_seq(seq[:i]),
+                    _example_char(common),
+                ))
+
+    # --- examples
+
+    def example_seq(self, seq):
+        """Return a short string matching a sequence, as far as it can be guessed"""
+        return "".join(self.example(item) for item in seq)
+
+    def example(self, item):
+        op, av = item
+        if op in (C.LITERAL, C.NOT_LITERAL, C.ANY, C.IN):
+            return _example_char(self.chars(item))
+        if op in REPEATS or op is C.POSSESSIVE_REPEAT:
+            return self.example_seq(av[2]) * av[0]
+        if op is C.SUBPATTERN:
+            return self.example_seq(av[3])
+        if op is C.ATOMIC_GROUP:
+            return self.example_seq(av)
+        if op is C.BRANCH:
+            return self.example_seq(av[1][0]) if av[1] else ""
+        if op is C.GROUPREF_EXISTS:
+            return self.example_seq(av[1])
+        return ""
+
+
+def _example_char(mask):
+    for c in _NICE_CHARS:
+        if mask & (1 << ord(c)):
+            return c
+    for i in range(256):
+        if mask & (1 << i):
+            return chr(i)
+    return "Ā" if mask & HIGH_BIT else ""
+
+
+def analyze_regex(pattern) -> Optional[List[Finding]]:
+    """Return the backtracking findings of a regex, None if it can't be parsed"""
+    try:
+        parsed = parse_regex(pattern)
+    except (re.error, RecursionError, OverflowError):
+        return None
+    return RegexAnalyzer(parsed).analyze()
+
+
+# --- cache of the parsed regexes
+
+
+def _literal_prefixes(seq):
+    """Return the literal texts the alternatives of a sequence start with
+
+    The second value is True if the alternatives are all literal text.
+    """
+    prefix = ""
+    seq = list(seq)
+    for i, (op, av) in enumerate(seq):
+        if op is C.LITERAL:
+            prefix += chr(av)
+            continue
+        if op is C.AT and av in (C.AT_BEGINNING, C.AT_BEGINNING_STRING) and not prefix:
+            continue
+        if op is C.SUBPATTERN and not av[1] and not av[2]:
+            inner, complete = _literal_prefixes(av[3])
+        elif op is C.BRANCH:
+            inner, complete = [], True
+            for alt in av[1]:
+                alt_prefixes, alt_complete = _literal_prefixes(alt)
+                inner.extend(alt_prefixes)
+                complete = complete and alt_complete
+        else:
+            return [prefix], False
+        if complete and len(inner) == 1:
+            prefix += inner[0]
+            continue
+        return [prefix + p for p in inner], complete and i == len(seq) - 1
+    return [prefix], True
+
+
+# the most alternatives literal_alternatives() expands a regex to
+MAX_ALTERNATIVES = 256
+
+
+def literal_alternatives(seq, limit=MAX_ALTERNATIVES):
+    """Return the texts a parsed regex (without anchors) matches, None if it isn't a set of literals
+
+    Groups, alternatives and classes of single characters are expanded, e.g.
+    `ab[cd]|e` gives `["abc", "abd", "e"]`.
+    """
+    texts = [""]
+    for op, av in seq:
+        if op is C.LITERAL:
+            options = [chr(av)]
+        elif op is C.IN and all(item_op is C.LITERAL for item_op, _ in av):
+            options = [chr(c) for _, c in av]
+        elif op is C.SUBPATTERN and not av[1] and not av[2]:
+            options = literal_alternatives(av[3], limit)
+        elif op is C.BRANCH:
+            options = []
+            for alt in av[1]:
+                alt_texts = literal_alternatives(alt, limit)
+                if alt_texts is None:
+                    return None
+                options.extend(alt_texts)
+        else:
+            return None
+        if options is None or len(texts) * len(options) > limit:
+            return None
+        texts = [text + option for text in texts for option in options]
+    return list(dict.fromkeys(texts))
+
+
+# --- case folding
+
+# a scoped (?i:...) group
+IGNORECASE_GROUP = "ignorecase group"
+# a character class with uppercase letters next to other characters
+UPPERCASE_IN_CLASS = "uppercase in class"
+# an uppercase literal or a class of uppercase letters only
+UPPERCASE_LITERAL = "uppercase literal"
+# an uppercase literal in a repeat matching zero times or more
+UPPERCASE_OPTIONAL = "uppercase optional"
+
+UPPERCASE_MASK = sum(1 << ord(c) for c in string.ascii_uppercase)
+
+
+def case_findings(parsed):
+    """Return the (kind, subpattern) of the parts of a regex that are wasted on lowercased input
+
+    The regex must be case-sensitive. The parts are the (?i:...) groups, the
+    uppercase letters of the character classes, and the uppercase literals,
+    which never match: the alternative holding one is a dead branch, it is
+    reported once. In an optional repeat, e.g. `(?:X)?`, only the repeat
+    never matches; it is reported as UPPERCASE_OPTIONAL. Negative
+    lookarounds and negated classes are not checked.
+    """
+    findings = []
+    dead = set()
+
+    def report(part, kind):
+        # part: the (key, subpattern) of the alternative or optional repeat
+        key, subpattern = part
+        if key not in dead:
+            dead.add(key)
+            findings.append((kind, render(subpattern)))
+
+    def walk(seq, part, kind):
+        for op, av in seq:
+            if op is C.LITERAL and _char_bit(av) & UPPERCASE_MASK:
+                report(part, kind)
+            elif op is C.IN:
+                if av and av[0][0] is C.NEGATE:
+                    continue
+                # the categories, e.g. \w or \S, match lowercase letters as well
+                explicit = _in_mask([(item_op, item_av) for item_op, item_av in av if item_op in (C.LITERAL, C.RANGE)])
+                if not explicit & UPPERCASE_MASK:
+                    continue
+                mask = _in_mask(av)
+                if mask & ~UPPERCASE_MASK:
+                    findings.append((UPPERCASE_IN_CLASS, _render_in(av)))
+                else:
+                    report(part, kind)
+            elif op in REPEATS or op is C.POSSESSIVE_REPEAT:
+                if av[0] == 0:
+                    # the repeat can match nothing, the alternative still matches
+                    walk(av[2], (id(av), [(op, av)]), UPPERCASE_OPTIONAL)
+                else:
+                    walk(av[2], part, kind)
+            elif op is C.ATOMIC_GROUP:
+                walk(av, part, kind)
+            elif op is C.SUBPATTERN:
+                group, add_flags, del_flags, body = av
+                if add_flags & re.IGNORECASE:
+                    findings.append((IGNORECASE_GROUP, render([(op, av)])))
+                else:
+                    walk(body, part, kind)
+            elif op is C.BRANCH:
+                for alt in av[1]:
+                    walk(alt, (id(alt), alt), UPPERCASE_LITERAL)
+            elif op is C.ASSERT:
+                walk(av[1], part, kind)
+            elif op is C.GROUPREF_EXISTS:
+                walk(av[1], (id(av[1]), av[1]), UPPERCASE_LITERAL)
+                if av[2]:
+                    walk(av[2], (id(av[2]), av[2]), UPPERCASE_LITERAL)
+
+    walk(parsed, (id(parsed), parsed), UPPERCASE_LITERAL)
+    return findings
+
+
+def _anchored(seq, codes, last=False):
+    items = list(seq)
+    if not items:
+        return False
+    op, av = items[-1] if last else items[0]
+    if op is C.AT:
+        return av in codes
+    if op is C.SUBPATTERN:
+        return _anchored(av[3], codes, last)
+    if op is C.BRANCH:
+        return all(_anchored(alt, codes, last) for alt in av[1])
+    return False
+
+
+def _compiled_size(parsed):
+    try:
+        return len(sre_compile._code(parsed, parsed.state.flags))
+    except Exception:
+        # the compiler internals of another Python version
+        return 0
+
+
+@dataclass(frozen=True)
+class RegexInfo:
+    """A regex with the facts derived from it
+
+    The parsed tree and the compiled regex are created on first use when the
+    facts come from the cache directory.
+    """
+    pattern: str
+    # the error of re.compile(), None if the regex compiles
+    error: Optional[str] = None
+    # the global flags, e.g. re.IGNORECASE for a leading (?i)
+    flags: int = 0
+    # starts with ^ or \A, ends with $ or \Z (in every alternative)
+    anchored_start: bool = False
+    anchored_end: bool = False
+    # the literal text every top level alternative starts with
+    literal_prefixes: Tuple[str, ...] = ()
+    min_length: int = 0
+    # None if unbounded
+    max_length: Optional[int] = None
+    # the number of code words of the compiled regex
+    compiled_size: int = 0
+
+    @classmethod
+    def from_pattern(cls, pattern):
+        """Parse and compile a regex, and derive its facts"""
+        try:
+            compiled = re.compile(pattern)
+            parsed = parse_regex(pattern)
+        except (re.error, RecursionError, OverflowError) as e:
+            return cls(pattern, error=str(e) or type(e).__name__)
+        lo, hi = parsed.getwidth()
+        info = cls(
+            pattern,
+            flags=int(parsed.state.flags & ~re.UNICODE),
+            anchored_start=_anchored(parsed, (C.AT_BEGINNING, C.AT_BEGINNING_STRING)),
+            anchored_end=_anchored(parsed, (C.AT_END, C.AT_END_STRING), last=True),
+            literal_prefixes=tuple(_literal_prefixes(parsed)[0]),
+            min_length=lo,
+            max_length=hi if hi < C.MAXREPEAT else None,
+            compiled_size=_compiled_size(parsed),
+        )
+        info.__dict__["parsed"] = parsed
+        info.__dict__["compiled"] = compiled
+        return info
+
+    @property
+    def valid(self):
+        return self.error is None
+
+    @property
+    def ignorecase(self):
+        return bool(self.flags & re.IGNORECASE)
+
+    @property
+    def literal_prefix(self):
+        """The literal text the regex starts with"""
+        return commonprefix(list(self.literal_prefixes)) if self.literal_prefixes else ""
+
+    @property
+    def literal(self):
+        """True if the regex matches its literal text only, e.g. `foo` (in any case with ignorecase)"""
+        return self.valid and len(self.literal_prefixes) == 1 and self.min_length == self.max_length == len(self.literal_prefixes[0])
+
+    @cached_property
+    def parsed(self):
+        """The parsed tree, None if the regex doesn't compile"""
+        return parse_regex(self.pattern) if self.valid else None
+
+    @cached_property
+    def compiled(self):
+        """The compiled regex, None if it doesn't compile"""
+        return re.compile(self.pattern) if self.valid else None
+
+    def to_json(self):
+        data = asdict(self)
+        data["literal_prefixes"] = list(self.literal_prefixes)
+        return data
+
+    @classmethod
+    def from_json(cls, data):
+        data = dict(data)
+        data["literal_prefixes"] = tuple(data.get("literal_prefixes", ()))
+        return cls(**data)
+
+
+class RegexCache:
+    """Regexes, each parsed and compiled once
+
+    The rules get the cache of the run with the `regexes` argument: it is
+    owned by the run plan and dropped with it (and its session). The facts
+    are kept in `<cache dir>/regex_info.jsonl` by regex hash (and
+    Python version); the regexes are used exactly as written in the rules.
+    """
+
+    def __init__(self, cache_dir=None):
+        self._infos = {}
+        self._lock = threading.Lock()
+        self._results = result_cache("regex_info", cache_dir)
+
+    def __len__(self):
+        return len(self._infos)
+
+    def get(self, pattern) -> RegexInfo:
+        """Return the info of a regex, parsing and compiling it on first use"""
+        info = self._infos.get(pattern)
+        if info is not None:
+            return info
+        key = hash_key(pattern)
+        cached = self._results.get(key)
+        info = None
+        if cached is not None:
+            try:
+                info = RegexInfo.from_json(cached)
+            except TypeError:
+                info = None
+        if info is None or info.pattern != pattern:
+            info = RegexInfo.from_pattern(pattern)
+            self._results.put(key, info.to_json())
+        with self._lock:
+            return self._infos.setdefault(pattern, info)
+
+    def prefetch(self, patterns, workers=1):
+        """Parse and compile the regexes not seen yet, on several threads"""
+        missing = list(dict.fromkeys(p for p in patterns if p not in self._infos))
+        if workers <= 1 or len(missing) <= 1:
+            for pattern in missing:
+                self.get(pattern)
+            return
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for pattern in missing:
+                executor.submit(self.get, pattern)
+
+
+def regex_cache(cache_dir=None) -> RegexCache:
+    """Return a new RegexCache, for the callers without the one of a run plan"""
+    return RegexCache(cache_dir)
+
+
+_TIMING_SCRIPT = """
+import json, re, sys, time
+job = json.load(sys.stdin)
+regex = re.compile(job["pattern"])
+print("ready", flush=True)
+start = time.perf_counter()
+regex.search(job["subject"])
+print(time.perf_counter() - start)
+"""
+
+
+def time_match(pattern, subject, timeout=TIMEOUT_SECONDS):
+    """Return the time to search a subject with a regex, None if it timed out
+
+    The search runs in a separate interpreter, so a regex that never returns
+    can be killed. The timeout starts once the interpreter is ready to
+    search, its startup doesn't count.
+    """
+    job = json.dumps({"pattern": pattern, "subject": subject})
+    with subprocess.Popen(
+        [sys.executable, "-I", "-c", _TIMING_SCRIPT],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+    ) as proc:
+        proc.stdin.write(job)
+        proc.stdin.close()
+        if proc.stdout.readline().strip() != "ready":
+            # the regex doesn't compile in the interpreter
+            proc.wait()
+            return 0.0
+        try:
+            proc.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            return None
+        try:
+            return float(proc.stdout.read())
+        except ValueError:
+            return 0.0
+
+
+def confirm_finding(pattern, finding, timeout=TIMEOUT_SECONDS, slow=SLOW_SECONDS):
+    """Return True if the attack string of the finding makes the regex slow"""
+    elapsed = time_match(pattern, finding.attack_string(), timeout)
+    return elapsed is None or elapsed >= slow
+
+
+# --- rendering of the parsed regexes
+
+
+def _render_char(c, in_class=False):
+    ch = chr(c)
+    if ch in string.ascii_letters or ch in string.digits or ch == "_":
+        return ch
+    if ch in "\\^$.|?*+()[]{}" or (in_class and ch in "-]"):
+        return "\\" + ch
+    if ch == "/" or ch in " !\"#%&',:;<=>@`~":
+        return ch
+    if c < 256:
+        return f"\\x{c:02x}"
+    return f"\\u{c:04x}" if c <= 0xFFFF else f"\\U{c:08x}"
+
+
+def _render_in(items):
+    negate = items and items[0][0] is C.NEGATE
+    if negate:
+        items = items[1:]
+    if not negate and len(items) == 1 and items[0][0] is C.CATEGORY:
+        return CATEGORY_CODES.get(items[0][1], "?")
+    parts = []
+    for op, av in items:
+        if op is C.LITERAL:
+            parts.append(_render_char(av, True))
+        elif op is C.RANGE:
+            parts.append(f"{_render_char(av[0], True)}-{_render_char(av[1], True)}")
+        elif op is C.CATEGORY:
+            parts.append(CATEGORY_CODES.get(av, "?"))
+    return "[" + ("^" if negate else "") + "".join(parts) + "]"
+
+
+def _render_quantifier(lo, hi):
+    if (lo, hi) == (0, C.MAXREPEAT):
+        return "*"
+    if (lo, hi) == (1, C.MAXREPEAT):
+        return "+"
+    if (lo, hi) == (0, 1):
+        return "?"
+    if lo == hi:
+        return f"{{{lo}}}"
+    if hi == C.MAXREPEAT:
+        return f"{{{lo},}}"
+    return f"{{{lo},{hi}}}"
+
+
+def _render_atom(seq):
+    """Render a sequence as a single atom, grouping it if needed"""
+    if len(seq) == 1 and seq[0][0] in (C.LITERAL, C.NOT_LITERAL, C.ANY, C.IN, C.SUBPATTERN, C.ATOMIC_GROUP):
+        return render(seq)
+    return f"(?:{render(seq)})"
+
+
+def render(seq):
+    """Render a parsed regex (or a part of it) as a pattern"""
+    out = []
+    for op, av in seq:
+        if op is C.LITERAL:
+            out.append(_render_char(av))
+        elif op is C.NOT_LITERAL:
+            out.append(f"[^{_render_char(av, True)}]")
+        elif op is C.ANY:
+            out.append(".")
+        elif op is C.IN:
+            out.append(_render_in(av))
+        elif op in REPEATS or op is C.POSSESSIVE_REPEAT:
+            lo, hi, body = av
+            suffix = "?" if op is C.MIN_REPEAT else "+" if op is C.POSSESSIVE_REPEAT else ""
+            out.append(_render_atom(body) + _render_quantifier(lo, hi) + suffix)
+        elif op is C.SUBPATTERN:
+            group, add_flags, del_flags, body = av
+            if group is None and not add_flags and not del_flags:
+                out.append(f"(?:{render(body)})")
+            elif group is None:
+                flags = _render_flags(add_flags) + ("-" + _render_flags(del_flags) if del_flags else "")
+                out.append(f"(?{flags}:{render(body)})")
+            else:
+                out.append(f"({render(body)})")
+        elif op is C.ATOMIC_GROUP:
+            out.append(f"(?>{render(av)})")
+        elif op is C.BRANCH:
+            branch = "|".join(render(alt) for alt in av[1])
+            out.append(branch if len(seq) == 1 else f"(?:{branch})")
+        elif op is C.AT:
+            out.append(AT_CODES.get(av, ""))
+        elif op in (C.ASSERT, C.ASSERT_NOT):
+            direction, body = av
+            kind = ("=" if op is C.ASSERT else "!") if direction == 1 else ("<=" if op is C.ASSERT else "<!")
+            out.append(f"(?{kind}{render(body)})")
+        elif op is C.GROUPREF:
+            out.append(f"\\{av}")
+        elif op is C.GROUPREF_EXISTS:
+            group, yes, no = av
+            out.append(f"(?({group}){render(yes)}" + (f"|{render(no)}" if no else "") + ")")
+    return "".join(out)
+
+
+def _render_flags(flags):
+    return "".join(c for c, f in (("i", re.I), ("m", re.M), ("s", re.S), ("x", re.X), ("u", re.U), ("a", re.A), ("L", re.L)) if flags & f)
@@ -0,0 +1,226 @@
+"""
+Reporters of the linting problems.
+
+A reporter consumes the problems of a run as a stream: the CLI calls
+`start_file()`, then `report()` for every problem of the file as soon as a
+rule yields it, and `end_file()`. Problems are never collected for the whole
+run, so the output can be piped into other tools while the linter works.
+"""
+
+import json
+import sys
+
+from .logger import Output
+
+SARIF_SCHEMA = "https://json.schemastore.org/sarif-2.1.0.json"
+SARIF_VERSION = "2.1.0"
+
+
+def _escape_data(value):
+    """Escape the message of a GitHub workflow command"""
+    return str(value).replace("%", "%25").replace("\r", "%0D").replace("\n", "%0A")
+
+
+def _escape_property(value):
+    """Escape a property of a GitHub workflow command"""
+    return _escape_data(value).replace(":", "%3A").replace(",", "%2C")
+
+
+class Reporter:
+    """Base class of the reporters"""
+
+    def __init__(self, rules, stream=None):
+        self.rules = rules
+        self.stream = stream if stream is not None else sys.stdout
+        self._messages = {}
+
+    def messages(self, rule):
+        """Return the (success, error, title) messages of a rule"""
+        if rule not in self._messages:
+            self._messages[rule] = self.rules.get_rule_messages(rule)
+        return self._messages[rule]
+
+    def start_file(self, filename):
+        """Called before the problems of a file are reported"""
+
+    def report(self, problem, filename=None, title=None):
+        """Report a problem. Problems without rule are reported with `title`"""
+        raise NotImplementedError
+
+    def end_file(self, filename):
+        """Called after the last problem of a file was reported"""
+
+    def close(self):
+        """Flush the pending output"""
+
+
+class NativeReporter(Reporter):
+    """Report the problems through the logger, grouped by rule"""
+
+    def __init__(self, rules, logger, stream=None):
+        super().__init__(rules, stream)
+        self.logger = logger
+        self._rule = None
+
+    def start_file(self, filename):
+        self._rule = None
+
+    def report(self, problem, filename=None, title=None):
+        # the rules yield their problems one after the other, so a new
+        # rule name starts a new group
+        if problem.rule is not None and problem.rule != self._rule:
+            self._rule = problem.rule
+            _, error_msg, rule_title = self.messages(problem.rule)
+            self.logger.error(error_msg, file=filename, title=rule_title)
+        kwargs = {"title": title} if title is not None else {}
+        self.logger.error(
+            problem.desc,
+            file=filename,
+            line=problem.line,
+            end_line=problem.end_line,
+            **kwargs,
+        )
+
+
+class GithubReporter(NativeReporter):
+    """Report the problems as GitHub annotations, written in batches"""
+
+    def __init__(self, rules, logger, stream=None, batch_size=1000):
+        super().__init__(rules, logger, stream)
+        self.batch_size = batch_size
+        self._batch = []
+
+    def report(self, problem, filename=None, title=None):
+        if problem.rule is not None and problem.rule != self._rule:
+            self._rule = problem.rule
+            _, error_msg, rule_title = self.messages(problem.rule)
+            self._annotate(error_msg, title=rule_title, file=filename)
+        self._annotate(
+            problem.desc,
+            title=title,
+            file=filename,
+            line=problem.line,
+            endLine=problem.end_line,
+        )
+
+    def end_file(self, filename):
+        self.close()
+
+    def close(self):
+        if self._batch:
+            self.stream.write("".join(self._batch))
+            self.stream.flush()
+            self._batch = []
+
+    def _annotate(self, message, **options):
+        options = ",".join(
+            f"{key}={_escape_property(value)}"
+            for key, value in options.items()
+            if value is not None
+        )
+        self._batch.append(f"::error {options}::{_escape_data(message)}\n")
+        if len(self._batch) >= self.batch_size:
+            self.close()
+
+
+class JsonLinesReporter(Reporter):
+    """Report every problem as a JSON object on its own line"""
+
+    def __init__(self, rules, stream=None, batch_size=1000):
+        super().__init__(rules, stream)
+        self.batch_size = batch_size
+        self._batch = []
+
+    def report(self, problem, filename=None, title=None):
+        if title is None and problem.rule is not None:
+            title = self.messages(problem.rule)[2]
+        self._batch.append(json.dumps({
+            "file": filename,
+            "line": problem.line,
+            "end_line": problem.end_line,
+            "column": problem.column,
+            "rule": problem.rule,
+            "title": title,
+            "message": problem.desc,
+        }) + "\n")
+        if len(self._batch) >= self.batch_size:
+            self.close()
+
+    def end_file(self, filename):
+        self.close()
+
+    def close(self):
+        if self._batch:
+            self.stream.write("".join(self._batch))
+            self.stream.flush()
+            self._batch = []
+
+
+class SarifReporter(Reporter):
+    """Report the problems as a SARIF log
+
+    The results are written as they come, the tool description with the
+    rules that reported problems is written at the end of the run.
+    """
+
+    def __init__(self, rules, stream=None):
+        super().__init__(rules, stream)
+        self._started = False
+        self._count = 0
+        self._rule_ids = {}
+
+    def report(self, problem, filename=None, title=None):
+        self._start()
+        rule = problem.rule or (title or "unknown").lower().replace(" ", "_")
+        if rule not in self._rule_ids:
+            self._rule_ids[rule] = title if problem.rule is None else self.messages(rule)[2]
+        region = {"startLine": max(problem.line or 1, 1)}
+        if problem.end_line:
+            region["endLine"] = max(problem.end_line, region["startLine"])
+        if problem.column:
+            region["startColumn"] = problem.column
+        result = {
+            "ruleId": rule,
+            "level": "error",
+            "message": {"text": problem.desc},
+            "locations": [{
+                "physicalLocation": {
+                    "artifactLocation": {"uri": filename},
+                    "region": region,
+                },
+            }],
+        }
+        self.stream.write(("," if self._count else "") + json.dumps(result))
+        self._count += 1
+
+    def close(self):
+        self._start()
+        driver = {
+            "name": "crs-linter",
+            "informationUri": "https://github.com/coreruleset/crs-linter",
+            "rules": [
+                {"id": rule, "shortDescription": {"text": title}}
+                for rule, title in self._rule_ids.items()
+            ],
+        }
+        self.stream.write('], "tool": ' + json.dumps({"driver": driver}) + "}]}\n")
+        self.stream.flush()
+
+    def _start(self):
+        if not self._started:
+            self.stream.write(
+                f'{{"$schema": "{SARIF_SCHEMA}", "version": "{SARIF_VERSION}", '
+                '"runs": [{"results": ['
+            )
+            self._started = True
+
+
+def get_reporter(output, rules, logger, stream=None):
+    """Return the reporter of an output format"""
+    if output == Output.GITHUB:
+        return GithubReporter(rules, logger, stream)
+    if output == Output.JSONL:
+        return JsonLinesReporter(rules, stream)
+    if output == Output.SARIF:
+        return SarifReporter(rules, stream)
+    return NativeReporter(rules, logger, stream)
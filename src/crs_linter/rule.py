@@ -2,31 +2,22 @@
 Base Rule class for all linting rules.
 """
 
-from abc import ABC, ABCMeta, abstractmethod
+from abc import ABC, abstractmethod
+from types import MappingProxyType
 from typing import Any, Generator, Tuple, Optional, Callable
 from .lint_problem import LintProblem
 
 
-class RuleMeta(ABCMeta):
-    """Metaclass that auto-registers Rule classes."""
-    
-    def __new__(cls, name, bases, attrs):
-        # Create the class
-        rule_class = super().__new__(cls, name, bases, attrs)
-        
-        # Skip the base Rule class itself
-        if name != 'Rule':
-            # Auto-register the rule class when it's defined
-            import crs_linter.rules_metadata
-            rule_instance = rule_class()
-            crs_linter.rules_metadata._rules_instance.register_rule(rule_instance)
-        
-        return rule_class
+class Rule(ABC):
+    """Base class for all linting rules.
 
+    Rule instances are shared by all files and threads of a run: `check()`
+    must not keep state on `self`. Rules are frozen when they are added to a
+    Rules collection.
+    """
+
+    _frozen = False
 
-class Rule(ABC, metaclass=RuleMeta):
-    """Base class for all linting rules."""
-    
     def __init__(self):
         self.name = type(self).__module__.rsplit('.', 1)[-1]
         self.success_message = f"{self.name} check ok."
@@ -35,7 +26,21 @@ class Rule(ABC, metaclass=RuleMeta):
         self.args = ()
         self.kwargs = {}
         self.condition_func = None
+        # the directives passed as `data`, all directives if None
+        self.applies_to = None
     
+    def freeze(self):
+        """Make the rule immutable"""
+        if not self._frozen:
+            self.kwargs = MappingProxyType(dict(self.kwargs))
+            object.__setattr__(self, "_frozen", True)
+        return self
+
+    def __setattr__(self, name, value):
+        if self._frozen:
+            raise AttributeError(f"{type(self).__name__} is frozen, can't set '{name}'")
+        super().__setattr__(name, value)
+
     def get_messages(self) -> Tuple[str, str, str]:
         """Get success, error, and title messages for this rule."""
         return (self.success_message, self.error_message, self.error_title)
@@ -48,6 +53,10 @@ class Rule(ABC, metaclass=RuleMeta):
         """Get the expected keyword arguments for this rule."""
         return self.kwargs
     
+    def get_applicability(self):
+        """Get the Applicability of the directives this rule checks, None for all."""
+        return self.applies_to
+
     def get_condition(self) -> Optional[Callable]:
         """Get the condition function for this rule."""
         return self.condition_func
@@ -0,0 +1,182 @@
+"""
+Index of the rule IDs of a ruleset.
+
+The index is built once per run from the parsed files and maps every rule ID
+to the location of its (chained) rule. The IDs are kept in a sorted array, so
+range queries like "all IDs in 942000-942999" and lookups of the rule at a
+given line are logarithmic, even for a combined ruleset of 100k+ rules.
+"""
+
+import threading
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class RuleEntry:
+    """Location of a rule (with its chained rules) in a file."""
+    rule_id: int
+    filename: Optional[str]
+    # line of the `id` action
+    lineno: int
+    # first and last line of the rule, including the chained rules
+    start_line: int
+    end_line: int
+    chain_length: int
+    phase: int
+
+    def as_dict(self):
+        return {
+            "fname": self.filename,
+            "lineno": self.lineno,
+            "start_line": self.start_line,
+            "end_line": self.end_line,
+            "chain_length": self.chain_length,
+            "phase": self.phase,
+        }
+
+
+class RuleIdIndex(dict):
+    """Index of the rule IDs across all files.
+
+    The mapping interface maps every rule ID to the location of its first
+    occurrence, using the ``{"fname", "lineno", ...}`` dicts that were shared
+    between the rules as ``ids``. Later occurrences of an ID are kept as
+    duplicates of the file they appear in.
+
+    Files must be added in the order ModSecurity loads them. The index can
+    be queried from several threads; changes are serialized by a lock.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._lock = threading.Lock()
+        # filename -> (parsed data, entries)
+        self._files = {}
+        self._duplicates: Dict[Optional[str], List[RuleEntry]] = {}
+        self._sorted_ids: Optional[List[int]] = None
+        # filename -> (sorted start lines, entries in the same order)
+        self._lines: Dict[Optional[str], Tuple[List[int], List[RuleEntry]]] = {}
+
+    def add_file(self, filename, data):
+        """Add (or replace) the rules of a parsed file"""
+        entry = self._files.get(filename)
+        if entry is not None and entry[0] is data:
+            return
+        entries = list(iter_rule_entries(filename, data))
+        with self._lock:
+            entry = self._files.get(filename)
+            if entry is not None and entry[0] is data:
+                return
+            self._files[filename] = (data, entries)
+            if entry is None:
+                self._register(filename, entries)
+            else:
+                self._rebuild()
+
+    def reorder(self, filenames):
+        """Change the load order of the files, without rescanning them"""
+        with self._lock:
+            filenames = [f for f in filenames if f in self._files]
+            if filenames != list(self._files):
+                self._files = {f: self._files[f] for f in filenames}
+                self._rebuild()
+
+    def remove_file(self, filename):
+        """Remove the rules of a file from the index"""
+        with self._lock:
+            if self._files.pop(filename, None) is not None:
+                self._rebuild()
+
+    def duplicates(self, filename=None) -> List[RuleEntry]:
+        """Return the rules reusing an already registered ID, optionally for one file only"""
+        if filename is not None:
+            return list(self._duplicates.get(filename, ()))
+        return [e for entries in self._duplicates.values() for e in entries]
+
+    def ids_in_range(self, first, last) -> List[int]:
+        """Return the sorted IDs between first and last (inclusive)"""
+        ids = self._ids()
+        return ids[bisect_left(ids, first):bisect_right(ids, last)]
+
+    def rule_at(self, filename, line) -> Optional[RuleEntry]:
+        """Return the rule spanning the given line of a file, if any"""
+        lines = self._lines.get(filename)
+        if lines is None:
+            return None
+        starts, entries = lines
+        pos = bisect_right(starts, line) - 1
+        if pos >= 0 and entries[pos].end_line >= line:
+            return entries[pos]
+        return None
+
+    def entries(self, filename) -> List[RuleEntry]:
+        """Return the rules of a file, in file order"""
+        entry = self._files.get(filename)
+        return list(entry[1]) if entry is not None else []
+
+    def _ids(self):
+        ids = self._sorted_ids
+        if ids is None:
+            with self._lock:
+                if self._sorted_ids is None:
+                    self._sorted_ids = sorted(self)
+                ids = self._sorted_ids
+        return ids
+
+    def _register(self, filename, entries):
+        for e in entries:
+            if e.rule_id in self:
+                self._duplicates.setdefault(filename, []).append(e)
+            else:
+                self[e.rule_id] = e.as_dict()
+        ordered = sorted(entries, key=lambda e: e.start_line)
+        self._lines[filename] = ([e.start_line for e in ordered], ordered)
+        self._sorted_ids = None
+
+    def _rebuild(self):
+        self.clear()
+        self._duplicates = {}
+        self._lines = {}
+        for filename, (_, entries) in self._files.items():
+            self._register(filename, entries)
+
+
+def iter_rule_entries(filename, data):
+    """Yield the location of every rule with an ID, chained rules included"""
+    rule_id = 0
+    lineno = start_line = end_line = 0
+    chain_length = 0
+    phase = 2
+    chained = False
+
+    for d in data:
+        if "actions" not in d:
+            continue
+        if not chained:
+            rule_id = 0
+            lineno = 0
+            start_line = d["lineno"]
+            chain_length = 0
+            phase = 2  # works only in Apache, libmodsecurity uses default phase 1
+        chained = False
+        chain_length += 1
+        end_line = max([d["lineno"]] + [a["lineno"] for a in d["actions"]])
+
+        for a in d["actions"]:
+            if a["act_name"] == "id" and rule_id == 0:
+                rule_id = int(a["act_arg"])
+                lineno = a["lineno"]
+            elif a["act_name"] == "phase":
+                phase = int(a["act_arg"])
+            elif a["act_name"] == "chain":
+                chained = True
+
+        # Skip rules without an ID
+        if not chained and rule_id != 0:
+            yield RuleEntry(rule_id, filename, lineno, start_line, end_line, chain_length, phase)
+
+    if chained and rule_id != 0:
+        # unterminated chain at the end of the file
+        yield RuleEntry(rule_id, filename, lineno, start_line, end_line, chain_length, phase)
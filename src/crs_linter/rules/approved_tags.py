@@ -1,4 +1,5 @@
 from crs_linter.lint_problem import LintProblem
+from crs_linter.directive_index import Applicability
 from crs_linter.rule import Rule
 
 
@@ -29,6 +30,7 @@ class ApprovedTags(Rule):
         self.error_message = "There are one or more new tag(s)."
         self.error_title = "new unlisted tag"
         self.args = ("data", "tags")
+        self.applies_to = Applicability(actions={"tag"})
 
     def check(self, data, tags):
         """
@@ -0,0 +1,146 @@
+import re
+
+from crs_linter.cost_model import DEFAULT_COST_MODEL
+from crs_linter.directive_index import Applicability
+from crs_linter.lint_problem import LintProblem
+from crs_linter.regex_analysis import regex_cache
+from crs_linter.rule import Rule
+from crs_linter.capture_flow import captured_var_uses, chain_links
+from crs_linter.rules.transformation_pipeline import TransformationPipeline
+
+# a link is reported if it costs at most this fraction of the first link
+COST_RATIO = 0.5
+
+# variables holding the result of the previous links
+MATCHED_VARIABLES = {"matched_var", "matched_var_name", "matched_vars", "matched_vars_names"}
+
+MATCHED_EXPANSION_PATTERN = re.compile(r"%\{matched_var", re.IGNORECASE)
+TX_EXPANSION_PATTERN = re.compile(r"%\{tx[.:]([^}]+)}", re.IGNORECASE)
+
+
+# the captures of a link with the capture action
+CAPTURE_NAMES = {str(group) for group in range(10)}
+
+
+def _tx_writes(d):
+    """Return the TX variables a link sets, with its captures"""
+    names = set()
+    for a in d.get("actions", []):
+        if a["act_name"] == "setvar" and a["act_arg"].lstrip("!")[0:3].lower() == "tx.":
+            names.add(a["act_arg"].lstrip("!")[3:].split("=")[0].lower())
+        elif a["act_name"] == "capture":
+            names |= CAPTURE_NAMES
+    return names
+
+
+def _tx_reads(d):
+    """Return the TX variables a link reads, in its targets, operator and actions"""
+    names = {v["variable_part"].lower() for v in d["variables"] if v["variable"].lower() == "tx"}
+    names.update(name.lower() for name in TX_EXPANSION_PATTERN.findall(d.get("operator_argument") or ""))
+    for a in d.get("actions", []):
+        for field in ("act_arg", "act_arg_val"):
+            names.update(name.lower() for name in TX_EXPANSION_PATTERN.findall(a.get(field) or ""))
+    return names
+
+
+def reads_matched(d):
+    """Return True if a link reads the matched variables of the link before it"""
+    if any(v["variable"].lower() in MATCHED_VARIABLES for v in d["variables"]):
+        return True
+    return bool(MATCHED_EXPANSION_PATTERN.search(d.get("operator_argument") or ""))
+
+
+def depends_on_previous_links(d, previous):
+    """Return True if a link depends on the links before it
+
+    A link depends on them if it reads the captures (TX.N) or the matched
+    variables, if it reads a TX variable they set, if it sets a TX variable
+    they read or set.
+    """
+    if captured_var_uses(d) or reads_matched(d):
+        return True
+    reads, writes = _tx_reads(d), _tx_writes(d)
+    return any(
+        reads & _tx_writes(link) or writes & (_tx_reads(link) | _tx_writes(link))
+        for link in previous
+    )
+
+
+class ChainOrder(Rule):
+    """Check for chains whose first link could be a cheaper one.
+
+    ModSecurity evaluates the links of a chain in order and stops at the
+    first one that doesn't match. An expensive first link, e.g. an @rx over
+    ARGS, runs on every request even when a cheap later link, e.g. an @eq on
+    a TX flag, would stop the chain. The cost of every link is estimated
+    from its targets, transformations and operator (see `cost_model.py`),
+    and a link costing at most half of the first link is reported if it
+    could be moved first.
+
+    A link can't be moved first if it reads the captures (TX.N) or the
+    MATCHED_VAR(S) variables, if it reads the TX variables set by the links
+    before it or sets the ones they read or set (in its targets, operator or
+    actions, e.g. setvar:tx.x=%{tx.y}), if it has the capture action, if the
+    next link reads its MATCHED_VAR(S), or if it's the last link and the
+    actions of the chain expand MATCHED_VAR (the logged value would change).
+
+    Example of a failing rule (expensive first link):
+        SecRule ARGS "@rx (?:union|select).*from" \\
+            "id:1,\\
+            phase:2,\\
+            deny,\\
+            t:none,\\
+            t:urlDecodeUni,\\
+            t:lowercase,\\
+            chain"
+            SecRule TX:enabled "@eq 1" \\  # Fails: cheaper, could run first
+                "t:none"
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.success_message = "No chain with a cheaper link to run first found."
+        self.error_message = "Found chain(s) with a cheaper link to run first"
+        self.error_title = "chain order"
+        self.args = ("data", "regexes")
+        self.applies_to = Applicability(directives={"secrule", "secdefaultaction"}, chains=True)
+
+    def check(self, data, regexes=None):
+        """check the order of the links of the chains by their cost"""
+        regexes = regexes if regexes is not None else regex_cache()
+        # link line -> estimated cost, with the transformations inherited from SecDefaultAction
+        costs = {
+            link["line"]: link["cost"]
+            for chain in TransformationPipeline().chains(data, regexes, DEFAULT_COST_MODEL)
+            for link in chain["links"]
+        }
+        for links in chain_links(data):
+            if len(links) < 2:
+                continue
+            ruleid = next((int(a["act_arg"]) for a in links[0].get("actions", []) if a["act_name"] == "id"), 0)
+            first_cost = costs.get(links[0]["lineno"], 0.0)
+            logs_matched = any(
+                MATCHED_EXPANSION_PATTERN.search(a.get(field) or "")
+                for d in links
+                for a in d.get("actions", [])
+                for field in ("act_arg", "act_arg_val")
+            )
+            candidates = []
+            for position, d in enumerate(links[1:], 1):
+                last = position == len(links) - 1
+                movable = not depends_on_previous_links(d, links[:position]) and not any(
+                    a["act_name"] == "capture" for a in d.get("actions", [])
+                ) and not (logs_matched and last) and not (not last and reads_matched(links[position + 1]))
+                cost = costs.get(d["lineno"], 0.0)
+                if movable and cost <= first_cost * COST_RATIO:
+                    candidates.append((cost, position, d))
+            if not candidates:
+                continue
+            cost, position, d = min(candidates, key=lambda candidate: candidate[:2])
+            yield LintProblem(
+                line=d["lineno"],
+                end_line=d["lineno"],
+                desc=f"chain link {position + 1} (estimated cost: {cost:.1f}) is cheaper than the first link "
+                     f"(estimated cost: {first_cost:.1f}) and doesn't depend on it, it could run first; rule id: {ruleid}",
+                rule=self.name,
+            )
@@ -1,5 +1,13 @@
-import re
+from crs_linter.capture_flow import (
+    ACTION,
+    EXPANSION_ACTIONS,
+    EXPANSION_PATTERN,
+    OPERATOR,
+    TARGET_PATTERN,
+    capture_flow,
+)
 from crs_linter.lint_problem import LintProblem
+from crs_linter.regex_analysis import regex_cache
 from crs_linter.rule import Rule
 
 
@@ -45,29 +53,38 @@ class CheckCapture(Rule):
 
     This check addresses the issue found in CRS PR #4265 where %{TX.N} was
     used in action arguments without verifying that capture was defined.
+
+    The opposite is reported too: a capture action whose groups are never
+    read by a following link or the actions of the chain makes the engine
+    copy the match groups on every match for nothing. The references to a
+    group the capturing regex doesn't define (e.g. TX.2 with a single
+    group) are reported as well.
+
+    Example of a failing rule (unused capture):
+        SecRule ARGS "@rx (attack)" \\
+            "id:5,\\
+            phase:2,\\
+            deny,\\
+            capture,\\  # Fails: TX.N is never read
+            msg:'Attack detected'"
     """
 
     def __init__(self):
         super().__init__()
         self.name = "capture"  # Override the default name
-        self.success_message = "No rule uses TX.N without capture action."
-        self.error_message = "There are one or more rules using TX.N without capture action."
-        self.error_title = "capture is missing"
-        self.args = ("data",)
+        self.success_message = "No rule uses TX.N without capture action, or capture without TX.N."
+        self.error_message = "There are one or more rules with a missing, unused or mismatched capture."
+        self.error_title = "capture is missing or unused"
+        self.args = ("data", "regexes")
 
         # Regex patterns for detecting TX.N references
-        self.target_pattern = re.compile(r"^\d$")  # For target variables: TX:1
-        self.expansion_pattern = re.compile(
-            r"%\{TX[.:](\d)\}",  # Matches %{TX.0} or %{TX:1}
-            re.IGNORECASE
-        )
+        self.target_pattern = TARGET_PATTERN  # For target variables: TX:1
+        self.expansion_pattern = EXPANSION_PATTERN  # Matches %{TX.0} or %{TX:1}
 
         # Actions that commonly use variable expansion
-        self.actions_to_check = {
-            'msg', 'logdata', 'setvar', 'tag'
-        }
+        self.actions_to_check = EXPANSION_ACTIONS
 
-    def check(self, data):
+    def check(self, data, regexes=None):
         """
         Check that TX.N variables are only used when capture action is defined.
 
@@ -75,107 +92,55 @@ class CheckCapture(Rule):
         - Rule targets (existing functionality)
         - Action arguments (msg, logdata, setvar, tag)
         - Operator arguments
+
+        and for capture actions whose groups are never read, or read beyond
+        the groups of the regex.
         """
-        chained = False
-        ruleid = 0
-        chainlevel = 0
-        capture_level = 0
-        has_capture = False
-        use_captured_var = False
-        use_captured_var_in_expansion = False  # Track if TX.N is used in expansion
-        captured_var_chain_level = 0
-
-        for d in data:
-            # only the SecRule object is relevant
-            if d["type"].lower() != "secrule":
+        regexes = regexes if regexes is not None else regex_cache()
+        for chain in capture_flow(data, regexes):
+            if chain.ruleid == 0:
                 continue
-
-            # Check 1: TX.N as target variable (existing check)
-            for v in d["variables"]:
-                if (v["variable"].lower() == "tx" and
-                    self.target_pattern.match(v["variable_part"])):
-                    # only the first occurrence required
-                    if not use_captured_var:
-                        use_captured_var = True
-                        captured_var_chain_level = chainlevel
-
-            # Check 2: TX.N in operator arguments
-            if "operator_argument" in d and d["operator_argument"]:
-                op_arg = d["operator_argument"]
-                if self.expansion_pattern.search(op_arg):
-                    if not use_captured_var:
-                        use_captured_var = True
-                        captured_var_chain_level = chainlevel
-                    # Always track that TX.N is used in an expansion, even if it
-                    # was already seen as a target elsewhere in the rule chain.
-                    use_captured_var_in_expansion = True
-
-            # Check 3: TX.N in action arguments
-            if "actions" in d:
-                if not chained:
-                    ruleid = 0
-                    chainlevel = 0
-                else:
-                    chained = False
-
-                for a in d["actions"]:
-                    if a["act_name"] == "id":
-                        ruleid = int(a["act_arg"])
-                    if a["act_name"] == "chain":
-                        chained = True
-                        chainlevel += 1
-                    if a["act_name"] == "capture":
-                        if not has_capture:
-                            capture_level = chainlevel
-                            has_capture = True
-                        # Don't update capture_level if already set; keep the earliest one
-
-                    # Check if action argument (or value) contains TX.N reference
-                    if a["act_name"] in self.actions_to_check:
-                        for field in ("act_arg", "act_arg_val"):
-                            value = a.get(field)
-                            if value and self.expansion_pattern.search(value):
-                                if not use_captured_var:
-                                    use_captured_var = True
-                                    captured_var_chain_level = chainlevel
-                                # Always track that TX.N is used in an expansion, even if it
-                                # was already seen as a target elsewhere in the rule chain.
-                                use_captured_var_in_expansion = True
-                                break
-
-                # End of rule/chain - validate
-                if ruleid > 0 and not chained:
-                    if use_captured_var:
-                        # Rules for requiring capture:
-                        # 1. TX.N as target in chained rule (not first) - require capture (original check)
-                        # 2. TX.N in expansion (%{TX.N}) anywhere - require capture (new check for issue #69)
-                        should_error = False
-
-                        if captured_var_chain_level > 0:
-                            # TX.N used in a chained rule (not the first)
-                            if not has_capture or captured_var_chain_level < capture_level:
-                                should_error = True
-                        elif use_captured_var_in_expansion:
-                            # TX.N used in expansion (%{TX.N}); require that capture is
-                            # defined at or before the chain level where TX.N is used.
-                            if not has_capture or capture_level > captured_var_chain_level:
-                                should_error = True
-
-                        if should_error:
-                            yield LintProblem(
-                                line=a["lineno"],
-                                end_line=a["lineno"],
-                                desc=f"rule uses TX.N without capture; rule id: {ruleid}",
-                                rule="capture",
-                            )
-
-                    # clear variables
-                    chained = False
-                    chainlevel = 0
-                    has_capture = False
-                    capture_level = 0
-                    captured_var_chain_level = 0
-                    use_captured_var = False
-                    use_captured_var_in_expansion = False
-                    ruleid = 0
-
+            if self._missing_capture(chain):
+                yield LintProblem(
+                    line=chain.last_line,
+                    end_line=chain.last_line,
+                    desc=f"rule uses TX.N without capture; rule id: {chain.ruleid}",
+                    rule="capture",
+                )
+                continue
+            for source in chain.unused_sources():
+                yield LintProblem(
+                    line=source.line,
+                    end_line=source.line,
+                    desc=f"rule uses capture but never reads TX.N; rule id: {chain.ruleid}",
+                    rule="capture",
+                )
+            reported = set()
+            for use in chain.undefined_uses():
+                if (use.group, use.line) in reported:
+                    continue
+                reported.add((use.group, use.line))
+                groups = max(source.groups for source in chain.sources_for(use))
+                sets = f"TX.0 to TX.{groups}" if groups else "TX.0"
+                yield LintProblem(
+                    line=use.line,
+                    end_line=use.line,
+                    desc=f"rule reads TX.{use.group} but the captured operator only sets {sets}; rule id: {chain.ruleid}",
+                    rule="capture",
+                )
+
+    @staticmethod
+    def _missing_capture(chain):
+        if not chain.uses:
+            return False
+        # the first TX.N use and the first capture of the chain decide
+        first_use = chain.uses[0]
+        capture_level = chain.sources[0].level if chain.sources else None
+        if first_use.level > 0:
+            # TX.N used in a chained rule (not the first)
+            return capture_level is None or first_use.level < capture_level
+        if any(use.kind in (OPERATOR, ACTION) for use in chain.uses):
+            # TX.N used in expansion (%{TX.N}); require that capture is
+            # defined at or before the chain level where TX.N is used.
+            return capture_level is None or capture_level > first_use.level
+        return False
@@ -1,4 +1,5 @@
 from crs_linter.lint_problem import LintProblem
+from crs_linter.directive_index import Applicability
 from crs_linter.rule import Rule
 
 
@@ -30,6 +31,7 @@ class Deprecated(Rule):
         self.error_message = "Found deprecated pattern(s)"
         self.error_title = "deprecated pattern"
         self.args = ("data",)
+        self.applies_to = Applicability(actions={"ctl"})
 
     def check(self, data):
         """check for deprecated patterns in rules"""
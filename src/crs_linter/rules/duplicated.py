@@ -1,5 +1,5 @@
 from crs_linter.lint_problem import LintProblem
-from crs_linter.utils import get_id
+from crs_linter.rule_index import RuleIdIndex, iter_rule_entries
 from crs_linter.rule import Rule
 
 
@@ -34,30 +34,24 @@ class DuplicatedIds(Rule):
 
     def check(self, data, ids, filename):
         """Checks the duplicated rule ID"""
-        for d in data:
-            if "actions" in d:
-                rule_id = get_id(d["actions"])
-                # Skip rules without an ID (get_id returns 0 when no ID is found)
-                if rule_id == 0:
-                    continue
-                    
-                if rule_id in ids:
-                    # Found a duplicate!
-                    yield LintProblem(
-                        line=0,  # Line number not available in this context
-                        end_line=0,
-                        desc=f"id {rule_id} is duplicated, previous place: {ids[rule_id]['fname']}:{ids[rule_id]['lineno']}",
-                        rule="duplicated",
-                    )
+        if isinstance(ids, RuleIdIndex):
+            # no-op if the file was registered before linting
+            ids.add_file(filename, data)
+            duplicates = ids.duplicates(filename)
+        else:
+            # plain mapping, register the IDs of the file as we go
+            duplicates = []
+            for entry in iter_rule_entries(filename, data):
+                if entry.rule_id in ids:
+                    duplicates.append(entry)
                 else:
-                    # First occurrence - add to ids dict for future duplicate detection
-                    # Get the line number from the actions
-                    lineno = 0
-                    for action in d["actions"]:
-                        if action["act_name"] == "id":
-                            lineno = action.get("lineno", 0)
-                            break
-                    ids[rule_id] = {
-                        "fname": filename,
-                        "lineno": lineno
-                    }
+                    ids[entry.rule_id] = entry.as_dict()
+
+        for entry in duplicates:
+            previous = ids[entry.rule_id]
+            yield LintProblem(
+                line=entry.lineno,
+                end_line=entry.lineno,
+                desc=f"id {entry.rule_id} is duplicated, previous place: {previous['fname']}:{previous['lineno']}",
+                rule="duplicated",
+            )
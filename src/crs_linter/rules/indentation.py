@@ -1,17 +1,119 @@
-import difflib
-import re
+from bisect import bisect_left
 import msc_pyparser
 from crs_linter.lint_problem import LintProblem
 from crs_linter.rule import Rule
 
+# Number of unchanged lines allowed between two changed regions before they
+# are reported as separate problems (same as the unified diff context of 3).
+HUNK_MERGE_DISTANCE = 6
+
+
+def format_content(content):
+    """Return the CRS formatted text for the parsed ``content``.
+
+    The output does not have a trailing newline, just like ``MSCWriter``.
+    """
+    writer = msc_pyparser.MSCWriter(content)
+    writer.generate()
+    return "\n".join(writer.output)
+
+
+def changed_regions(original, formatted):
+    """Return the regions where two lists of lines differ.
+
+    This is a patience diff: after trimming the common prefix and suffix,
+    lines occurring exactly once on both sides are used as anchors (their
+    longest increasing subsequence), and only the gaps between the anchors
+    are examined further. Lines are compared through their (cached) string
+    hashes, so the whole diff is O(n log n), unlike difflib which can go
+    quadratic on heavily misformatted files.
+
+    Returns a list of ``(a_lo, a_hi, b_lo, b_hi)`` tuples (0-based, half-open)
+    in file order.
+    """
+    regions = []
+    stack = [(0, len(original), 0, len(formatted))]
+    while stack:
+        a_lo, a_hi, b_lo, b_hi = stack.pop()
+        # trim the common prefix and suffix
+        while a_lo < a_hi and b_lo < b_hi and original[a_lo] == formatted[b_lo]:
+            a_lo += 1
+            b_lo += 1
+        while a_lo < a_hi and b_lo < b_hi and original[a_hi - 1] == formatted[b_hi - 1]:
+            a_hi -= 1
+            b_hi -= 1
+        if a_lo == a_hi and b_lo == b_hi:
+            continue
+
+        anchors = _unique_anchors(original, a_lo, a_hi, formatted, b_lo, b_hi)
+        if not anchors:
+            regions.append((a_lo, a_hi, b_lo, b_hi))
+            continue
+
+        # the gaps between the anchors, pushed in reverse to keep file order
+        gaps = []
+        prev_a, prev_b = a_lo, b_lo
+        for i, j in anchors:
+            gaps.append((prev_a, i, prev_b, j))
+            prev_a, prev_b = i + 1, j + 1
+        gaps.append((prev_a, a_hi, prev_b, b_hi))
+        stack.extend(reversed(gaps))
+
+    regions.sort()
+    return regions
+
+
+def _unique_anchors(a, a_lo, a_hi, b, b_lo, b_hi):
+    """Return the longest increasing run of lines that are unique on both sides."""
+    # line -> position, or -1 when the line is not unique
+    in_a = {}
+    for i in range(a_lo, a_hi):
+        in_a[a[i]] = -1 if a[i] in in_a else i
+    in_b = {}
+    for j in range(b_lo, b_hi):
+        if b[j] in in_a:
+            in_b[b[j]] = -1 if b[j] in in_b else j
+
+    pairs = sorted(
+        (in_a[line], j) for line, j in in_b.items() if j >= 0 and in_a[line] >= 0
+    )
+    if not pairs:
+        return []
+
+    # longest increasing subsequence on the positions in ``b`` (patience sort)
+    tails = []  # index into pairs of the smallest tail for each length
+    tail_values = []
+    back = [None] * len(pairs)
+    for k, (_, j) in enumerate(pairs):
+        pos = bisect_left(tail_values, j)
+        back[k] = tails[pos - 1] if pos > 0 else None
+        if pos == len(tails):
+            tails.append(k)
+            tail_values.append(j)
+        else:
+            tails[pos] = k
+            tail_values[pos] = j
+
+    result = []
+    k = tails[-1]
+    while k is not None:
+        result.append(pairs[k])
+        k = back[k]
+    result.reverse()
+    return result
+
+
 
 class Indentation(Rule):
     """Check for indentation errors in rules.
 
     This rule verifies that rule files follow CRS formatting guidelines for
     indentation and whitespace. The linter uses msc_pyparser to regenerate
-    the formatted version of each file and compares it with the original
-    using difflib to detect any formatting discrepancies.
+    the formatted version of each file and compares it with the original.
+    Files that are already formatted are accepted after a single comparison;
+    otherwise only the mismatching blocks are diffed to report the problems.
+
+    Use the --fix flag to rewrite the misformatted files in place.
 
     Example of failing rules (incorrect indentation):
          SecRule ARGS "@rx foo" \\  # Extra leading space
@@ -54,87 +156,61 @@ class Indentation(Rule):
             )
             return
 
-        original_content = file_content
-
-        # Generate the formatted output from the parsed content
-        writer = msc_pyparser.MSCWriter(content)
-        writer.generate()
-        formatted_output = "\n".join(writer.output)
-
         # Normalize trailing newlines: MSCWriter doesn't add a trailing newline,
         # but most editors do. We strip trailing newlines from both to compare content.
-        original_normalized = original_content.rstrip('\n')
-        formatted_normalized = formatted_output.rstrip('\n')
+        original_normalized = file_content.rstrip('\n')
+        formatted_normalized = format_content(content).rstrip('\n')
+
+        # Fast path: already formatted files need a single comparison only
+        if original_normalized == formatted_normalized:
+            return
 
-        # Compare line by line
         original_lines = original_normalized.splitlines(keepends=True)
         formatted_lines = formatted_normalized.splitlines(keepends=True)
+        regions = changed_regions(original_lines, formatted_lines)
+
+        # Merge the regions that are close to each other into one problem
+        hunks = []
+        for region in regions:
+            if hunks and region[0] - hunks[-1][1] <= HUNK_MERGE_DISTANCE:
+                a_lo, _, b_lo, _ = hunks[-1]
+                hunks[-1] = (a_lo, region[1], b_lo, region[3])
+            else:
+                hunks.append(region)
 
-        # Check if they're identical
-        if original_lines == formatted_lines:
-            # No indentation errors
-            return
+        for a_lo, a_hi, b_lo, b_hi in hunks:
+            start_line = a_lo + 1
+            end_line = max(start_line, a_hi)
 
-        # Generate diff to show differences
-        diff_lines = list(difflib.unified_diff(original_lines, formatted_lines, lineterm=''))
-
-        # Process the diff to extract meaningful error messages
-        i = 0
-        while i < len(diff_lines):
-            line = diff_lines[i]
-            # Look for diff hunk headers like "@@ -1,2 +1,2 @@"
-            r = re.match(r"^@@ -(\d+),(\d+) \+(\d+),(\d+) @@$", line)
-            if r:
-                start_line = int(r.group(1))
-                count = int(r.group(2))
-
-                # Collect the diff lines for this hunk to show context
-                removed_lines = []
-                added_lines = []
-                j = i + 1
-                while j < len(diff_lines) and not diff_lines[j].startswith('@@'):
-                    diff_line = diff_lines[j]
-                    if diff_line.startswith('-'):
-                        # Line in original file that should be removed
-                        content = diff_line[1:].strip()
-                        if content:  # Only show non-empty content
-                            removed_lines.append(content[:60])  # Limit line length
-                    elif diff_line.startswith('+'):
-                        # Line that should be added (expected format)
-                        content = diff_line[1:].strip()
-                        if content:  # Only show non-empty content
-                            added_lines.append(content[:60])  # Limit line length
-                    j += 1
-
-                # Create a meaningful error message
-                # Check if the removed and added lines are identical (indicating whitespace-only changes)
-                if removed_lines == added_lines and removed_lines:
-                    # This is a whitespace/trailing newline issue
-                    desc = f"Indentation/whitespace error (lines {start_line}-{start_line + count - 1}): check spacing and formatting"
-                else:
-                    desc_parts = []
-                    if removed_lines:
-                        desc_parts.append(f"Remove: {', '.join(removed_lines[:2])}")
-                        if len(removed_lines) > 2:
-                            desc_parts[-1] += f" (+{len(removed_lines) - 2} more)"
-                    if added_lines:
-                        desc_parts.append(f"Expected: {', '.join(added_lines[:2])}")
-                        if len(added_lines) > 2:
-                            desc_parts[-1] += f" (+{len(added_lines) - 2} more)"
-
-                    if desc_parts:
-                        desc = f"Indentation/formatting error - {' | '.join(desc_parts)}"
-                    else:
-                        # Likely whitespace-only differences
-                        desc = f"Indentation/whitespace error (lines {start_line}-{start_line + count - 1}): check spacing and formatting"
-
-                yield LintProblem(
-                    line=start_line,
-                    end_line=start_line + count - 1,
-                    desc=desc,
-                    rule="indentation",
-                )
-                i = j
+            # Collect the lines of this hunk to show context
+            removed_lines = [l.strip()[:60] for l in original_lines[a_lo:a_hi] if l.strip()]
+            added_lines = [l.strip()[:60] for l in formatted_lines[b_lo:b_hi] if l.strip()]
+
+            # Create a meaningful error message
+            # Check if the removed and added lines are identical (indicating whitespace-only changes)
+            if removed_lines == added_lines and removed_lines:
+                # This is a whitespace/trailing newline issue
+                desc = f"Indentation/whitespace error (lines {start_line}-{end_line}): check spacing and formatting"
             else:
-                i += 1
-        
\ No newline at end of file
+                desc_parts = []
+                if removed_lines:
+                    desc_parts.append(f"Remove: {', '.join(removed_lines[:2])}")
+                    if len(removed_lines) > 2:
+                        desc_parts[-1] += f" (+{len(removed_lines) - 2} more)"
+                if added_lines:
+                    desc_parts.append(f"Expected: {', '.join(added_lines[:2])}")
+                    if len(added_lines) > 2:
+                        desc_parts[-1] += f" (+{len(added_lines) - 2} more)"
+
+                if desc_parts:
+                    desc = f"Indentation/formatting error - {' | '.join(desc_parts)}"
+                else:
+                    # Likely whitespace-only differences
+                    desc = f"Indentation/whitespace error (lines {start_line}-{end_line}): check spacing and formatting"
+
+            yield LintProblem(
+                line=start_line,
+                end_line=end_line,
+                desc=desc,
+                rule="indentation",
+            )
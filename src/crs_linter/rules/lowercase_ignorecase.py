@@ -1,5 +1,45 @@
+import os.path
+
+from crs_linter.cost_model import DECODING_TRANSFORMATIONS
 from crs_linter.lint_problem import LintProblem
+from crs_linter.regex_analysis import (
+    IGNORECASE_GROUP,
+    UPPERCASE_IN_CLASS,
+    UPPERCASE_LITERAL,
+    UPPERCASE_OPTIONAL,
+    case_findings,
+    regex_cache,
+)
+from crs_linter.directive_index import Applicability
 from crs_linter.rule import Rule
+from crs_linter.transformations import effective_transformations, rule_links
+
+# the phrase operators, case-insensitive
+PM_OPERATORS = {"@pm", "@pmf", "@pmfromfile"}
+
+# the transformations setting the case of the input; the decoding ones can
+# bring uppercase letters back, e.g. %41 -> A
+CASE_TRANSFORMATIONS = {"lowercase", "uppercase"} | DECODING_TRANSFORMATIONS
+
+
+def case_variants(words):
+    """Return the groups of words that only differ in case, in list order"""
+    groups = {}
+    for word in words:
+        groups.setdefault(word.lower(), [])
+        if word not in groups[word.lower()]:
+            groups[word.lower()].append(word)
+    return [group for group in groups.values() if len(group) > 1]
+
+
+def read_phrases(path):
+    """Return the phrases of a @pmFromFile file, None if it can't be read"""
+    try:
+        with open(path, "r", encoding="UTF-8", errors="replace") as fp:
+            lines = fp.read().splitlines()
+    except OSError:
+        return None
+    return [line.strip() for line in lines if line.strip() and not line.strip().startswith("#")]
 
 
 class LowercaseIgnorecase(Rule):
@@ -9,6 +49,22 @@ class LowercaseIgnorecase(Rule):
     the (?i) case-insensitive regex flag together. This combination is
     redundant and should be avoided - use one or the other.
 
+    The regex of a rule transformed with t:lowercase is also checked for:
+    - (?i:...) groups, redundant like (?i)
+    - uppercase letters in character classes, e.g. [aA] or [A-Za-z], which
+      never match the lowercased input
+    - uppercase literals, which never match: the alternative holding one is
+      a dead branch, the optional repeat holding one, e.g. (?:X)?, is skipped
+
+    A decoding transformation after t:lowercase, e.g. t:urlDecode, can bring
+    uppercase letters back, the regex isn't checked then. A rule without
+    t:none also runs the transformations of the SecDefaultAction of its
+    phase, including t:lowercase.
+
+    @pm, @pmf and @pmFromFile are case-insensitive, so the words of their
+    lists that only differ in case are reported as well. The @pmFromFile
+    files are read relative to the rule file.
+
     Example of a failing rule (combining t:lowercase and (?i)):
         SecRule ARGS "@rx (?i)foo" \\
             "id:1,\\
@@ -17,8 +73,16 @@ class LowercaseIgnorecase(Rule):
             t:lowercase,\\  # Fails: redundant with (?i) flag
             nolog"
 
+    Example of a failing rule (dead branch after t:lowercase):
+        SecRule REQUEST_METHOD "@rx ^(?:get|POST)$" \\  # Fails: POST never matches
+            "id:2,\\
+            phase:1,\\
+            pass,\\
+            t:lowercase,\\
+            nolog"
+
     The rule should use either:
-    - t:lowercase with a case-sensitive regex: "@rx foo"
+    - t:lowercase with a case-sensitive, lowercase regex: "@rx foo"
     - (?i) flag without t:lowercase transformation
     """
 
@@ -27,26 +91,90 @@ class LowercaseIgnorecase(Rule):
         self.success_message = "No combined transformation and ignorecase patterns found."
         self.error_message = "Found combined transformation and ignorecase pattern(s)"
         self.error_title = "combined transformation and ignorecase"
-        self.args = ("data",)
+        self.args = ("data", "filename", "regexes")
+        self.applies_to = Applicability(directives={"secrule", "secdefaultaction"}, chains=True)
 
-    def check(self, data):
+    def check(self, data, filename=None, regexes=None):
         """check for combined transformation and ignorecase patterns"""
+        regexes = regexes if regexes is not None else regex_cache()
         ruleid = 0
-        for d in data:
-            if d["type"].lower() == "secrule":
-                if d["operator"] == "@rx":
-                    regex = d["operator_argument"]
-                    if regex.startswith("(?i)"):
-                        if "actions" in d:
-                            for a in d["actions"]:
-                                if a["act_name"] == "id":
-                                    ruleid = int(a["act_arg"])
-                                if a["act_name"] == "t":
-                                    # check the transform is valid
-                                    if a["act_arg"].lower() == "lowercase":
-                                        yield LintProblem(
-                                            line=a["lineno"],
-                                            end_line=a["lineno"],
-                                            desc=f'rule uses (?i) in combination with t:lowercase: \'{a["act_arg"]}\'; rule id: {ruleid}',
-                                            rule="lowercase_ignorecase",
-                                        )
+        for d, _, default in rule_links(data):
+            for a in d["actions"]:
+                if a["act_name"] == "id":
+                    ruleid = int(a["act_arg"])
+            operator = d.get("operator", "").lower()
+            if operator == "@rx":
+                yield from self._check_regex(d, regexes.get(d["operator_argument"]), default, ruleid)
+            elif operator in PM_OPERATORS:
+                yield from self._check_phrases(d, filename, ruleid)
+
+    def _check_regex(self, d, info, default, ruleid):
+        actions = d["actions"]
+        pipeline = effective_transformations(actions, default[0])
+        # the regexes Python can't compile are checked as text
+        if info.ignorecase if info.valid else info.pattern.startswith("(?i)"):
+            for a in actions:
+                if a["act_name"] == "t":
+                    # check the transform is valid
+                    if a["act_arg"].lower() == "lowercase":
+                        yield LintProblem(
+                            line=a["lineno"],
+                            end_line=a["lineno"],
+                            desc=f'rule uses (?i) in combination with t:lowercase: \'{a["act_arg"]}\'; rule id: {ruleid}',
+                            rule="lowercase_ignorecase",
+                        )
+            if ("lowercase", None) in pipeline:
+                yield LintProblem(
+                    line=d["lineno"],
+                    end_line=d["lineno"],
+                    desc=f"rule uses (?i) in combination with t:lowercase inherited from SecDefaultAction (line {default[1]}); rule id: {ruleid}",
+                    rule="lowercase_ignorecase",
+                )
+            return
+        if not info.valid:
+            return
+        chain = [name for name, _ in pipeline]
+        # the last transformation changing the case of the input
+        last = next((t for t in reversed(chain) if t in CASE_TRANSFORMATIONS), None)
+        if last != "lowercase":
+            return
+        for kind, subpattern in case_findings(info.parsed):
+            if kind == IGNORECASE_GROUP:
+                desc = f"rule uses (?i:...) in combination with t:lowercase: '{subpattern}'"
+            elif kind == UPPERCASE_IN_CLASS:
+                desc = f"character class has uppercase letters, which never match after t:lowercase: '{subpattern}'"
+            elif kind == UPPERCASE_LITERAL:
+                desc = f"uppercase literal never matches after t:lowercase, dead branch: '{subpattern}'"
+            elif kind == UPPERCASE_OPTIONAL:
+                desc = f"uppercase literal never matches after t:lowercase, optional part always skipped: '{subpattern}'"
+            yield LintProblem(
+                line=d["oplineno"],
+                end_line=d["oplineno"],
+                desc=f"{desc}; rule id: {ruleid}",
+                rule="lowercase_ignorecase",
+            )
+
+    def _check_phrases(self, d, filename, ruleid):
+        operator = d["operator"]
+        if operator.lower() == "@pm":
+            lists = [(None, d["operator_argument"].split())]
+        else:
+            lists = []
+            directory = os.path.dirname(filename) if filename else ""
+            for name in d["operator_argument"].split():
+                if "://" in name:
+                    # a remote list
+                    continue
+                phrases = read_phrases(os.path.join(directory, name))
+                if phrases is not None:
+                    lists.append((name, phrases))
+        for name, words in lists:
+            for group in case_variants(words):
+                source = f" in {name}" if name is not None else ""
+                variants = ", ".join(f"'{w}'" for w in group)
+                yield LintProblem(
+                    line=d["oplineno"],
+                    end_line=d["oplineno"],
+                    desc=f"{operator} is case-insensitive, words only differing in case{source}: {variants}; rule id: {ruleid}",
+                    rule="lowercase_ignorecase",
+                )
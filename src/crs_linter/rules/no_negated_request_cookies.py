@@ -1,4 +1,5 @@
 from crs_linter.lint_problem import LintProblem
+from crs_linter.directive_index import Applicability
 from crs_linter.rule import Rule
 
 
@@ -36,6 +37,7 @@ class NoNegatedRequestCookies(Rule):
         self.error_message = "Found rule(s) using negated REQUEST_COOKIES targets"
         self.error_title = "negated REQUEST_COOKIES target"
         self.args = ("data",)
+        self.applies_to = Applicability(directives={"secrule"}, variables={"request_cookies"})
 
     def check(self, data):
         """Check for negated REQUEST_COOKIES targets in SecRule directives."""
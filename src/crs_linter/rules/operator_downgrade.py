@@ -0,0 +1,138 @@
+from re import _constants as C
+
+from crs_linter.directive_index import Applicability
+from crs_linter.lint_problem import LintProblem
+from crs_linter.regex_analysis import literal_alternatives, regex_cache
+from crs_linter.rule import Rule
+from crs_linter.rules.ignore_case import OPERATORS, OPERATORSL
+from crs_linter.transformations import effective_transformations, rule_links
+
+# the operator for a single literal by its anchors (start, end)
+LITERAL_OPERATORS = {
+    (True, True): "streq",
+    (True, False): "beginsWith",
+    (False, True): "endsWith",
+    (False, False): "contains",
+}
+
+
+def operator_name(name):
+    """Return the operator with the CRS casing, e.g. `@beginsWith`"""
+    return "@" + OPERATORS[OPERATORSL.index(name.lower())]
+
+
+def _plain(text):
+    # text that can be written as an operator argument as is
+    return all(" " <= c <= "~" and c not in '"\\' for c in text) and "%{" not in text
+
+
+def _has_case(text):
+    return text.lower() != text.upper()
+
+
+class OperatorDowngrade(Rule):
+    """Check for @rx regexes that a cheaper operator can replace.
+
+    This rule detects @rx arguments that only match literal text: an
+    anchored literal is an @streq, @beginsWith or @endsWith, an unanchored
+    literal is an @contains, and an unanchored alternation of literals is an
+    @pm word list (Aho-Corasick). These operators are much cheaper than a
+    regex.
+
+    The case is taken into account: @pm is case-insensitive, so an
+    alternation is only reported when the regex is case-insensitive, the
+    input is transformed with t:lowercase, or the words have no letters.
+    The t:lowercase a rule without t:none inherits from SecDefaultAction
+    counts as well. A (?i) literal without t:lowercase is reported with
+    t:lowercase added.
+
+    Example of a failing rule (anchored literal):
+        SecRule REQUEST_METHOD "@rx ^POST$" \\
+            "id:1,\\
+            phase:1,\\
+            pass,\\
+            t:none,\\
+            nolog"  # Fails: use "@streq POST"
+
+    Example of a failing rule (alternation of literals):
+        SecRule ARGS "@rx (?:union|select|insert)" \\
+            "id:2,\\
+            phase:2,\\
+            deny,\\
+            t:none,\\
+            t:lowercase"  # Fails: use "@pm union select insert"
+
+    Rules with the capture action are not checked, the groups of the regex
+    set the TX variables. `$` also matches before a trailing newline, which
+    the suggested operators don't.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.success_message = "No @rx operator replaceable by a cheaper operator found."
+        self.error_message = "Found @rx operator(s) replaceable by a cheaper operator"
+        self.error_title = "operator downgrade"
+        self.args = ("data", "regexes")
+        self.applies_to = Applicability(directives={"secrule", "secdefaultaction"}, chains=True)
+
+    def check(self, data, regexes=None):
+        """check for @rx operators matching literal text"""
+        regexes = regexes if regexes is not None else regex_cache()
+        ruleid = 0
+        for d, _, default in rule_links(data):
+            actions = d["actions"]
+            for a in actions:
+                if a["act_name"] == "id":
+                    ruleid = int(a["act_arg"])
+            if d.get("operator") != "@rx":
+                continue
+            if any(a["act_name"] == "capture" for a in actions):
+                continue
+            info = regexes.get(d["operator_argument"])
+            if not info.valid:
+                continue
+            chain = [name for name, _ in effective_transformations(actions, default[0])]
+            lowered = next((t for t in reversed(chain) if t in ("lowercase", "uppercase")), None) == "lowercase"
+            suggestion = self.suggest(info, lowered)
+            if suggestion is None:
+                continue
+            operator, argument, needs_lowercase = suggestion
+            negation = "!" if d.get("operator_negated") else ""
+            hint = " with t:lowercase" if needs_lowercase else ""
+            yield LintProblem(
+                line=d["oplineno"],
+                end_line=d["oplineno"],
+                desc=f'@rx matches literal text, use "{negation}{operator} {argument}"{hint}; rule id: {ruleid}',
+                rule=self.name,
+            )
+
+    @staticmethod
+    def suggest(info, lowered=False):
+        """Return the (operator, argument, needs t:lowercase) replacing a regex, None if there is none"""
+        items = list(info.parsed)
+        start = bool(items) and items[0][0] is C.AT and items[0][1] in (C.AT_BEGINNING, C.AT_BEGINNING_STRING)
+        if start:
+            items = items[1:]
+        end = bool(items) and items[-1][0] is C.AT and items[-1][1] in (C.AT_END, C.AT_END_STRING)
+        if end:
+            items = items[:-1]
+        texts = literal_alternatives(items)
+        if not texts or "" in texts or not all(_plain(t) for t in texts):
+            return None
+        if lowered:
+            if not info.ignorecase and any(t != t.lower() for t in texts):
+                # never matches the lowercased input
+                return None
+            texts = list(dict.fromkeys(t.lower() for t in texts))
+        elif info.ignorecase:
+            texts = list(dict.fromkeys(t.lower() for t in texts))
+
+        if len(texts) == 1:
+            needs_lowercase = info.ignorecase and not lowered and _has_case(texts[0])
+            return operator_name(LITERAL_OPERATORS[(start, end)]), texts[0], needs_lowercase
+        if start or end or any(" " in t for t in texts):
+            return None
+        if not (lowered or info.ignorecase) and any(_has_case(t) for t in texts):
+            # @pm would match the other cases too
+            return None
+        return operator_name("pm"), " ".join(texts), False
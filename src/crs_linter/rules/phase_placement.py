@@ -0,0 +1,163 @@
+import re
+
+from crs_linter.directive_index import Applicability
+from crs_linter.lint_problem import LintProblem
+from crs_linter.rule import Rule
+from crs_linter.tx_graph import NUMERIC_NAME_PATTERN, REGEX_NAME_PATTERN, SETVAR
+
+PHASE_ALIASES = {"request": 2, "response": 4, "logging": 5}
+
+# the phases a rule is checked in; a logging rule can't act on the transaction
+CHECKED_PHASES = {2, 3, 4}
+
+# variable -> earliest phase its value is available in
+VARIABLE_PHASES = {
+    # request line and headers
+    **{name: 1 for name in (
+        "args_get", "args_get_names", "auth_type", "duration", "env", "full_request_length", "geo", "global",
+        "highest_severity", "ip", "matched_var", "matched_var_name", "matched_vars", "matched_vars_names",
+        "path_info", "query_string", "remote_addr", "remote_host", "remote_port", "remote_user",
+        "request_basename", "request_cookies", "request_cookies_names", "request_filename", "request_headers",
+        "request_headers_names", "request_line", "request_method", "request_protocol", "request_uri",
+        "request_uri_raw", "resource", "rule", "server_addr", "server_name", "server_port", "session",
+        "sessionid", "time", "time_day", "time_epoch", "time_hour", "time_min", "time_mon", "time_sec",
+        "time_wday", "time_year", "unique_id", "urlencoded_error", "user", "userid", "webappid",
+        "webserver_error_log",
+    )},
+    # request body
+    **{name: 2 for name in (
+        "args", "args_combined_size", "args_names", "args_post", "args_post_names", "files", "files_combined_size",
+        "files_names", "files_sizes", "files_tmp_content", "files_tmpnames", "full_request",
+        "inbound_data_error", "multipart_boundary_quoted", "multipart_boundary_whitespace",
+        "multipart_crlf_lf_lines", "multipart_data_after", "multipart_data_before", "multipart_file_limit_exceeded",
+        "multipart_filename", "multipart_header_folding", "multipart_invalid_header_folding",
+        "multipart_invalid_part", "multipart_invalid_quoting", "multipart_lf_line", "multipart_missing_semicolon",
+        "multipart_name", "multipart_part_headers", "multipart_strict_error", "multipart_unmatched_boundary",
+        "reqbody_error", "reqbody_error_msg", "reqbody_processor", "reqbody_processor_error",
+        "reqbody_processor_error_msg", "request_body", "request_body_length", "xml",
+    )},
+    # response headers
+    **{name: 3 for name in (
+        "response_content_length", "response_content_type", "response_headers", "response_headers_names",
+        "response_protocol", "response_status", "status_line",
+    )},
+    # response body
+    **{name: 4 for name in ("outbound_data_error", "response_body")},
+}
+
+# variable expansions, e.g. %{tx.foo} or %{REQUEST_HEADERS.host}
+EXPANSION_PATTERN = re.compile(r"%\{([a-z_]+)(?:\.([^}]*))?}", re.IGNORECASE)
+
+# actions whose effect depends on the phase of the rule: the control flow,
+# and the ctl changes of the rules and the body processing that follow
+FLOW_ACTIONS = {"skip", "skipafter", "ctl"}
+
+# a response rule is never moved before this phase, it would act on the request
+RESPONSE_PHASE = 3
+
+
+class PhasePlacement(Rule):
+    """Check for rules that could run in an earlier phase.
+
+    Every variable is available from a phase on: the request line and the
+    request headers in phase 1, the request body in phase 2, the response
+    headers in phase 3 and the response body in phase 4. A rule in phase 2
+    that only reads request line and header variables could run in phase 1,
+    and a rule in phase 4 without response body targets wastes the response
+    buffering: it could run in phase 3. A response rule, e.g. an outbound
+    scoring rule, is never suggested to run in a request phase.
+
+    A TX variable is available once the rules setting it before the rule
+    have run: the latest phase of its definitions in the phases up to the
+    phase of the rule counts (from the TX symbol table). The variables of
+    the whole chain and the expansions of the operator arguments are taken
+    into account. Rules with skip, skipAfter or ctl are not checked, their
+    placement is part of the control flow.
+
+    Example of a failing rule (only phase 1 variables in phase 2):
+        SecRule REQUEST_HEADERS:User-Agent "@pm sqlmap" \\
+            "id:1,\\
+            phase:2,\\  # Fails: could run in phase 1
+            deny,\\
+            t:none"
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.success_message = "No rule that could run in an earlier phase found."
+        self.error_message = "Found rule(s) that could run in an earlier phase"
+        self.error_title = "phase placement"
+        self.args = ("data", "globtxvars")
+        self.applies_to = Applicability(directives={"secrule"}, chains=True)
+
+    def check(self, data, globtxvars=None):
+        """check the phase of the rules against the phases their variables are available in"""
+        chain = None
+        for d in data:
+            if d["type"].lower() != "secrule" or "actions" not in d:
+                continue
+            if chain is None:
+                chain = {"ruleid": 0, "phase": 2, "line": d["lineno"], "flow": False, "names": []}
+            chained = False
+            for a in d["actions"]:
+                name = a["act_name"].lower()
+                if name == "id":
+                    chain["ruleid"] = int(a["act_arg"])
+                elif name == "phase":
+                    value = a["act_arg"].strip().lower()
+                    chain["phase"] = int(value) if value.isdigit() else PHASE_ALIASES.get(value, 0)
+                    chain["line"] = a["lineno"]
+                elif name == "chain":
+                    chained = True
+                elif name in FLOW_ACTIONS:
+                    chain["flow"] = True
+            for v in d.get("variables", []):
+                if not v.get("negated"):
+                    chain["names"].append((v["variable"].lower(), v.get("variable_part") or ""))
+            for name, part in EXPANSION_PATTERN.findall(d.get("operator_argument", "")):
+                chain["names"].append((name.lower(), part))
+            if chained:
+                continue
+            problem = self._check_chain(chain, globtxvars)
+            if problem is not None:
+                yield problem
+            chain = None
+
+    def _check_chain(self, chain, globtxvars):
+        phase = chain["phase"]
+        if phase not in CHECKED_PHASES or chain["flow"] or not chain["names"]:
+            return None
+        earliest = 1
+        for name, part in chain["names"]:
+            if name == "tx":
+                available = self.tx_phase(part, phase, chain["ruleid"], globtxvars)
+            else:
+                # unknown variables stay where they are
+                available = VARIABLE_PHASES.get(name, phase)
+            earliest = max(earliest, available)
+        if phase >= RESPONSE_PHASE:
+            earliest = max(earliest, RESPONSE_PHASE)
+        if earliest >= phase:
+            return None
+        return LintProblem(
+            line=chain["line"],
+            end_line=chain["line"],
+            desc=f"rule in phase {phase} only reads variables available in phase {earliest}, it could run in phase {earliest}; rule id: {chain['ruleid']}",
+            rule=self.name,
+        )
+
+    @staticmethod
+    def tx_phase(part, phase, ruleid, globtxvars):
+        """Return the phase a TX variable is available in for a rule, `phase` if it isn't known"""
+        name = part.lower()
+        if NUMERIC_NAME_PATTERN.match(name):
+            # a capture of the chain
+            return 1
+        if not name or REGEX_NAME_PATTERN.match(name) or globtxvars is None or not hasattr(globtxvars, "defs_of"):
+            return phase
+        phases = [
+            definition.phase
+            for definition in globtxvars.defs_of(name)
+            if definition.kind == SETVAR and definition.rule_id != ruleid and definition.phase <= phase
+        ]
+        return max(phases) if phases else phase
@@ -2,6 +2,12 @@ import re
 from crs_linter.lint_problem import LintProblem
 from crs_linter.rule import Rule
 
+# Paranoia level control rule, e.g. SecRule TX:DETECTION_PARANOIA_LEVEL "@lt 1"
+PL_ARGUMENT_PATTERN = re.compile(r"^\d$")
+SCORE_EXPANSION_PATTERN = re.compile(r"%\{tx.[a-z]+_anomaly_score}", re.I)
+SCORE_VALUE_CLEANUP_PATTERN = re.compile(r"[+%{}]")
+SCORE_PL_PATTERN = re.compile(r"anomaly_score_pl\d$")
+
 
 class PlConsistency(Rule):
     """Check the paranoia-level consistency.
@@ -54,9 +60,9 @@ class PlConsistency(Rule):
         self.success_message = "Paranoia-level tags are correct."
         self.error_message = "Found incorrect paranoia-level/N tag(s)"
         self.error_title = "wrong or missing paranoia-level/N tag"
-        self.args = ("data", "globtxvars")
+        self.args = ("data",)
 
-    def check(self, data, globtxvars):
+    def check(self, data):
         """this method checks the PL consistency
 
         the function iterates through the rules, and catches the set PL, eg:
@@ -86,7 +92,7 @@ class PlConsistency(Rule):
                         v["variable"].lower() == "tx"
                         and v["variable_part"].lower() == "detection_paranoia_level"
                         and d["operator"] == "@lt"
-                        and re.match(r"^\d$", d["operator_argument"])
+                        and PL_ARGUMENT_PATTERN.match(d["operator_argument"])
                     ):
                         curr_pl = int(d["operator_argument"])
 
@@ -146,11 +152,9 @@ class PlConsistency(Rule):
                     )
 
                 for t in _txvars:
-                    subst_val = re.search(
-                        r"%\{tx.[a-z]+_anomaly_score}", _txvars[t], re.I
-                    )
-                    val = re.sub(r"[+%{}]", "", _txvars[t]).lower()
-                    scorepl = re.search(r"anomaly_score_pl\d$", t)
+                    subst_val = SCORE_EXPANSION_PATTERN.search(_txvars[t])
+                    val = SCORE_VALUE_CLEANUP_PATTERN.sub("", _txvars[t]).lower()
+                    scorepl = SCORE_PL_PATTERN.search(t)
                     if scorepl:
                         if curr_pl > 0 and int(t[-1]) != curr_pl:
                             yield LintProblem(
@@ -174,7 +178,6 @@ class PlConsistency(Rule):
                                     desc=f"invalid value for anomaly_score_pl{t[-1]}: {val} with severity {severity}, rule id: {ruleid}",
                                     rule="pl_consistency",
                                 )
-                        globtxvars[t]["used"] = True
 
                 # reset local variables if we are done with a rule <==> no more 'chain' action
                 if not chained:
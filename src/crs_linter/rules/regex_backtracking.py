@@ -0,0 +1,97 @@
+from dataclasses import asdict
+
+from crs_linter.cache import hash_key, result_cache
+from crs_linter.directive_index import Applicability
+from crs_linter.lint_problem import LintProblem
+from crs_linter.regex_analysis import Finding, RegexAnalyzer, confirm_finding, regex_cache
+from crs_linter.rule import Rule
+
+
+class RegexBacktracking(Rule):
+    """Check for @rx regexes that can backtrack catastrophically (ReDoS).
+
+    This rule parses the regex of every @rx operator and looks for the
+    constructs that make a backtracking engine take exponential or
+    polynomial time on crafted input:
+
+    - nested quantifiers, e.g. `(a+)+` or `(\\w+\\s?)*`
+    - overlapping alternatives under a quantifier, e.g. `(.|\\s)*`
+    - adjacent quantifiers matching the same characters, e.g. `\\s*\\s*`
+
+    Every finding is confirmed by timing the regex on a generated attack
+    string in a separate process, killed after a timeout; only the confirmed
+    findings are reported. The findings of the static analysis are cached by
+    regex hash, in the `--cache-dir` directory if given; the timed matches
+    depend on the load of the machine and are not cached.
+
+    Example of a failing rule (nested quantifiers):
+        SecRule ARGS "@rx ^(\\d+)*$" \\
+            "id:1,\\
+            phase:2,\\
+            deny,\\
+            t:none"
+
+    The rule is disabled by default, enable it with
+    `--extend-select regex_backtracking`. The regexes are parsed by the
+    Python `re` module: alternatives of single characters, e.g. `(\\w|\\d)`,
+    are merged into a character class by the parser and are not checked.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.success_message = "No regex with catastrophic backtracking found."
+        self.error_message = "Found regex(es) with catastrophic backtracking"
+        self.error_title = "regex backtracking"
+        self.args = ("data", "cache_dir", "regexes")
+        self.applies_to = Applicability(directives={"secrule"}, operators={"@rx"}, chains=True)
+        # (regex, finding) -> confirmed by the timed match, in this run
+        self._confirmed = {}
+        # cache directory -> the cache of the static findings
+        self._caches = {}
+
+    def check(self, data, cache_dir=None, regexes=None):
+        """check the @rx regexes for catastrophic backtracking"""
+        if cache_dir not in self._caches:
+            self._caches[cache_dir] = result_cache(self.name, cache_dir)
+        cache = self._caches[cache_dir]
+        regexes = regexes if regexes is not None else regex_cache(cache_dir)
+        ruleid = 0
+        for d in data:
+            for a in d.get("actions", []):
+                if a["act_name"] == "id":
+                    ruleid = int(a["act_arg"])
+            if d["type"].lower() != "secrule" or d.get("operator") != "@rx":
+                continue
+            for finding in self._findings(regexes.get(d["operator_argument"]), cache):
+                if not finding["confirmed"]:
+                    # the construct didn't slow the regex down, e.g. a bounded repeat
+                    continue
+                yield LintProblem(
+                    line=d["lineno"],
+                    end_line=d["lineno"],
+                    desc=f'regex can backtrack catastrophically, {finding["kind"]}: \'{finding["subpattern"]}\' (confirmed by a timed match); rule id: {ruleid}',
+                    rule=self.name,
+                )
+
+    def _findings(self, info, cache):
+        """Return the findings of a regex, confirmed in this run
+
+        Only the static analysis is kept in the cache: the timed match
+        depends on the load of the machine, it is run again by every run.
+        """
+        key = hash_key("findings", info.pattern)
+        stored = cache.get(key)
+        if stored is None:
+            # the regexes Python can't compile are not checked
+            analyzed = RegexAnalyzer(info.parsed).analyze() if info.valid else []
+            stored = [asdict(f) for f in analyzed]
+            cache.put(key, stored)
+        findings = []
+        for fields in stored:
+            finding = Finding(**fields)
+            confirmed = self._confirmed.get((info.pattern, finding))
+            if confirmed is None:
+                confirmed = confirm_finding(info.pattern, finding)
+                self._confirmed[(info.pattern, finding)] = confirmed
+            findings.append({"kind": finding.kind, "subpattern": finding.subpattern, "confirmed": confirmed})
+        return findings
@@ -1,4 +1,4 @@
-import re
+from crs_linter.capture_flow import TARGET, TARGET_PATTERN, capture_flow
 from crs_linter.lint_problem import LintProblem
 from crs_linter.rule import Rule
 
@@ -31,6 +31,7 @@ class StandaloneTxn(Rule):
     Note: This check complements the CheckCapture rule, which ensures that
     TX.N usage requires a capture action. This rule specifically addresses
     the issue of TX.N in standalone rules where values are unpredictable.
+    Both rules share the capture dataflow of the chains (`capture_flow.py`).
     """
 
     def __init__(self):
@@ -42,7 +43,7 @@ class StandaloneTxn(Rule):
         self.args = ("data",)
 
         # Pattern to match numeric TX variables: TX:0, TX:1, etc.
-        self.txn_pattern = re.compile(r"^\d$")
+        self.txn_pattern = TARGET_PATTERN
 
     def check(self, data):
         """
@@ -51,51 +52,15 @@ class StandaloneTxn(Rule):
         A rule is considered standalone if it's not preceded by a rule with
         the 'chain' action. TX.N targets are only allowed in chained rules.
         """
-        is_chained = False  # Tracks if current rule is part of a chain
         current_rule_id = 0
-
-        for d in data:
-            # Only check SecRule directives
-            if d["type"].lower() != "secrule":
-                continue
-
-            # Check if this rule uses TX.N as a target
-            uses_txn_target = False
-            for v in d["variables"]:
-                if (v["variable"].lower() == "tx" and
-                    self.txn_pattern.match(v["variable_part"])):
-                    uses_txn_target = True
-                    break
-
-            # If this is a standalone rule using TX.N, flag it
-            if uses_txn_target and not is_chained:
-                # Get rule ID for better error message
-                rule_id = current_rule_id
-                if "actions" in d:
-                    for a in d["actions"]:
-                        if a["act_name"] == "id":
-                            rule_id = int(a["act_arg"])
-                            break
-
+        for chain in capture_flow(data):
+            # a rule without id is reported with the id of the rule before it
+            current_rule_id = chain.ruleid or current_rule_id
+            first_link = chain.links[0]
+            if any(use.kind == TARGET and use.level == 0 for use in chain.uses):
                 yield LintProblem(
-                    line=d.get("lineno", 0),
-                    end_line=d.get("lineno", 0),
-                    desc=f"standalone rule uses TX.N as target; rule id: {rule_id}",
+                    line=first_link.get("lineno", 0),
+                    end_line=first_link.get("lineno", 0),
+                    desc=f"standalone rule uses TX.N as target; rule id: {current_rule_id}",
                     rule="standalonetxn",
                 )
-
-            # Update chained state for next rule
-            # Check if this rule has a 'chain' action
-            if "actions" in d:
-                has_chain_action = False
-                for a in d["actions"]:
-                    if a["act_name"] == "id":
-                        current_rule_id = int(a["act_arg"])
-                    if a["act_name"] == "chain":
-                        has_chain_action = True
-                        break
-
-                # After processing this rule:
-                # - If it has 'chain', the NEXT rule will be chained
-                # - If it doesn't have 'chain', the chain ends
-                is_chained = has_chain_action
@@ -0,0 +1,208 @@
+from crs_linter.cost_model import DEFAULT_COST_MODEL
+from crs_linter.directive_index import Applicability
+from crs_linter.lint_problem import LintProblem
+from crs_linter.regex_analysis import regex_cache
+from crs_linter.rule import Rule
+from crs_linter.rules.ignore_case import TRANSFORMS, TRANSFORMSL
+from crs_linter.transformations import canonical, effective_transformations, rule_links
+
+# transformations that only replace or remove characters, they don't decode
+# anything a later transformation could act on again
+NON_DECODING = {
+    "cmdline", "compresswhitespace", "lowercase", "normalizepath", "normalizepathwin", "removecomments",
+    "removecommentschar", "removenulls", "removewhitespace", "replacecomments", "replacenulls", "trim",
+    "trimleft", "trimright", "uppercase",
+}
+
+# transformations with no effect on their own output -> the transformations
+# that can undo it in between
+IDEMPOTENT = {
+    "lowercase": {"uppercase"},
+    "uppercase": {"lowercase", "cmdline"},
+    "compresswhitespace": {"replacenulls", "replacecomments", "cmdline"},
+    "removewhitespace": {"replacenulls", "replacecomments", "cmdline"},
+    "trim": {"replacenulls", "replacecomments"},
+    "trimleft": {"replacenulls", "replacecomments"},
+    "trimright": {"replacenulls", "replacecomments"},
+    "removenulls": set(),
+    "replacenulls": set(),
+    "normalizepath": set(),
+    "normalizepathwin": set(),
+}
+
+# transformations creating whitespace, e.g. t:replaceNulls
+WHITESPACE_MAKERS = {"replacenulls", "replacecomments", "cmdline"}
+
+# (earlier, later) -> (the redundant one, why, the transformations that make
+# both needed when they run in between)
+SUBSUMED = {
+    ("compresswhitespace", "removewhitespace"): (
+        0, "t:removeWhitespace removes all the whitespace", {"removecomments", "cmdline"}
+    ),
+    ("removewhitespace", "compresswhitespace"): (
+        1, "t:removeWhitespace already removed the whitespace", WHITESPACE_MAKERS
+    ),
+    ("trimleft", "trim"): (0, "t:trim trims both ends", set()),
+    ("trimright", "trim"): (0, "t:trim trims both ends", set()),
+    ("trim", "trimleft"): (1, "t:trim already trimmed both ends", WHITESPACE_MAKERS),
+    ("trim", "trimright"): (1, "t:trim already trimmed both ends", WHITESPACE_MAKERS),
+    ("removenulls", "replacenulls"): (1, "t:removeNulls already removed the NUL bytes", set()),
+    ("replacenulls", "removenulls"): (1, "t:replaceNulls already replaced the NUL bytes", set()),
+    ("lowercase", "uppercase"): (0, "t:uppercase changes the case again", set()),
+    ("uppercase", "lowercase"): (0, "t:lowercase changes the case again", set()),
+    ("lowercase", "cmdline"): (0, "t:cmdLine lowercases the value", set()),
+    ("compresswhitespace", "cmdline"): (0, "t:cmdLine compresses the whitespace", {"removecomments"}),
+    ("cmdline", "lowercase"): (1, "t:cmdLine already lowercased the value", {"uppercase"}),
+    ("cmdline", "compresswhitespace"): (
+        1, "t:cmdLine already compressed the whitespace", {"replacenulls", "replacecomments"}
+    ),
+    ("normalizepath", "normalizepathwin"): (0, "t:normalizePathWin also normalizes the path", set()),
+    ("normalizepathwin", "normalizepath"): (
+        1, "t:normalizePathWin already normalized the path",
+        {"cmdline", "removecomments", "removecommentschar", "removenulls", "removewhitespace"},
+    ),
+    ("urldecode", "urldecodeuni"): (
+        0, "t:urlDecodeUni decodes everything t:urlDecode does, the pair decodes twice", set()
+    ),
+    ("urldecodeuni", "urldecode"): (
+        1, "t:urlDecodeUni already decoded the value, the pair decodes twice", set()
+    ),
+}
+
+# transformations of a multiMatch rule from which the operator runs are reported
+MULTIMATCH_LIMIT = 3
+
+
+def display(name):
+    """Return a transformation as written in CRS, e.g. `t:urlDecodeUni`"""
+    return "t:" + (TRANSFORMS[TRANSFORMSL.index(name)] if name in TRANSFORMSL else name)
+
+
+class TransformationPipeline(Rule):
+    """Check for redundant, conflicting and costly transformation pipelines.
+
+    This rule models the effective transformations of every rule link,
+    including the ones inherited from SecDefaultAction when the link has no
+    t:none, and reports:
+
+    - a t:none after other transformations, which discards them
+    - a link without t:none inheriting the transformations of SecDefaultAction
+    - a repeated transformation without effect, e.g. t:lowercase twice
+    - a transformation made redundant by another, e.g. t:urlDecode next to
+      t:urlDecodeUni or t:compressWhitespace next to t:removeWhitespace
+    - multiMatch with many transformations, the operator runs after each one
+
+    Each finding comes with the estimated relative cost of the rule (see
+    `cost_model.py`).
+
+    Example of a failing rule (repeated and subsumed transformations):
+        SecRule ARGS "@rx foo" \\
+            "id:1,\\
+            phase:2,\\
+            deny,\\
+            t:none,\\
+            t:urlDecode,\\
+            t:urlDecodeUni,\\  # Fails: t:urlDecode is subsumed
+            t:lowercase,\\
+            t:lowercase"  # Fails: repeated transformation
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.success_message = "No redundant transformation pipeline found."
+        self.error_message = "Found redundant or costly transformation pipeline(s)"
+        self.error_title = "transformation pipeline"
+        self.args = ("data", "regexes")
+        self.applies_to = Applicability(directives={"secrule", "secdefaultaction"}, chains=True)
+
+    def check(self, data, regexes=None):
+        """check the transformation pipelines of the rules"""
+        regexes = regexes if regexes is not None else regex_cache()
+        for chain in self.chains(data, regexes):
+            for line, desc in chain["findings"]:
+                yield LintProblem(
+                    line=line,
+                    end_line=line,
+                    desc=f'{desc}; estimated cost: {chain["cost"]:.1f}; rule id: {chain["ruleid"]}',
+                    rule=self.name,
+                )
+
+    def chains(self, data, regexes=None, model=DEFAULT_COST_MODEL):
+        """Yield the rule id, line, phase, estimated cost, findings and links of every rule chain"""
+        regexes = regexes if regexes is not None else regex_cache()
+        chain = None
+        for d, phase, default in rule_links(data):
+            if chain is None:
+                chain = {"ruleid": 0, "line": d["lineno"], "phase": phase, "cost": 0.0, "findings": [], "links": []}
+            chain["phase"] = phase
+            actions = d["actions"]
+            for a in actions:
+                if a["act_name"] == "id":
+                    chain["ruleid"] = int(a["act_arg"])
+            pipeline = self._pipeline(d, default, chain["findings"])
+            names = [name for name, _ in pipeline]
+            multi_match = next((a for a in actions if a["act_name"].lower() == "multimatch"), None)
+            if multi_match is not None and len(names) >= MULTIMATCH_LIMIT:
+                chain["findings"].append((
+                    multi_match["lineno"],
+                    f"multiMatch runs the operator {len(names) + 1} times per value, after each of the {len(names)} transformations",
+                ))
+            chain["findings"].extend(self._redundancies(pipeline, d["lineno"]))
+            regex = regexes.get(d["operator_argument"]) if d.get("operator") == "@rx" else None
+            cost = model.link_cost(d, names, regex if regex is not None and regex.valid else None, multi_match is not None)
+            chain["cost"] += cost
+            chain["links"].append({
+                "line": d["lineno"],
+                "operator": d.get("operator", ""),
+                "variables": d.get("variables", []),
+                "transformations": names,
+                "multi_match": multi_match is not None,
+                "cost": cost,
+            })
+            if not any(a["act_name"] == "chain" for a in actions):
+                yield chain
+                chain = None
+        if chain is not None:
+            yield chain
+
+    @staticmethod
+    def _pipeline(d, default, findings):
+        """Return the effective (transformation, line) pipeline of a link, None lines are inherited"""
+        own = [(canonical(a["act_arg"]), a["lineno"]) for a in d["actions"] if a["act_name"] == "t"]
+        last_none = max((i for i, (name, _) in enumerate(own) if name == "none"), default=None)
+        if last_none is None:
+            inherited, default_line = default
+            if inherited:
+                findings.append((
+                    d["lineno"],
+                    f'no t:none, the rule inherits {", ".join(display(t) for t in inherited)} from SecDefaultAction (line {default_line})',
+                ))
+        else:
+            discarded = [name for name, _ in own[:last_none] if name != "none"]
+            if discarded:
+                findings.append((
+                    own[last_none][1],
+                    f't:none discards the transformations before it: {", ".join(display(t) for t in discarded)}',
+                ))
+        return effective_transformations(d["actions"], default[0])
+
+    @staticmethod
+    def _redundancies(pipeline, directive_line):
+        """Return the (line, description) of the redundant transformations"""
+        redundant = {}
+        for j, (later, _) in enumerate(pipeline):
+            for i in range(j - 1, -1, -1):
+                earlier = pipeline[i][0]
+                between = {name for name, _ in pipeline[i + 1:j]}
+                if earlier == later and later in IDEMPOTENT and not between & IDEMPOTENT[later]:
+                    redundant.setdefault(j, f"{display(later)} is repeated, the second run has no effect")
+                elif (earlier, later) in SUBSUMED and not between & SUBSUMED[(earlier, later)][2]:
+                    which, why, _ = SUBSUMED[(earlier, later)]
+                    index = i if which == 0 else j
+                    redundant.setdefault(index, f"{display(pipeline[index][0])} is redundant: {why}")
+                if earlier not in NON_DECODING:
+                    break
+        return [
+            (pipeline[index][1] or directive_line, desc)
+            for index, desc in sorted(redundant.items())
+        ]
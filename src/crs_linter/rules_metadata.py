@@ -1,122 +1,362 @@
 """
 Rules and rule metadata configuration management.
+
+The rules are listed declaratively in BUILTIN_RULES, and third-party rules
+are discovered through the `crs_linter.rules` entry point group. A rule
+module is imported, and its rule instantiated, only when the rule is used,
+so a run of a few selected rules doesn't import the others.
 """
 
-from typing import List
+import importlib
+import threading
+from dataclasses import dataclass
+from importlib.metadata import entry_points
+from typing import List, Optional
+
+from .errors import LintError
 from .rule import Rule
 
+# entry point group of the third-party rules: `name = "package.module:RuleClass"`
+ENTRY_POINT_GROUP = "crs_linter.rules"
+
+
+@dataclass(frozen=True)
+class RuleSpec:
+    """Declaration of a rule, without importing its module."""
+    name: str
+    module: str
+    class_name: str
+    # rules disabled by default only run when they are selected
+    enabled_by_default: bool = True
+
+    def load(self) -> Rule:
+        """Import the module of the rule and instantiate it"""
+        rule_class = getattr(importlib.import_module(self.module), self.class_name)
+        rule = rule_class()
+        if not isinstance(rule, Rule):
+            raise LintError(f"{self.module}:{self.class_name} is not a Rule")
+        if rule.name != self.name:
+            raise LintError(f"{self.module}:{self.class_name} is registered as '{self.name}' but named '{rule.name}'")
+        return rule.freeze()
+
+
+# in the order the rules are run
+BUILTIN_RULES = (
+    RuleSpec("approved_tags", "crs_linter.rules.approved_tags", "ApprovedTags"),
+    RuleSpec("capture", "crs_linter.rules.check_capture", "CheckCapture"),
+    RuleSpec("chain_order", "crs_linter.rules.chain_order", "ChainOrder", enabled_by_default=False),
+    RuleSpec("crs_tag", "crs_linter.rules.crs_tag", "CrsTag"),
+    RuleSpec("deprecated", "crs_linter.rules.deprecated", "Deprecated"),
+    RuleSpec("duplicated", "crs_linter.rules.duplicated", "DuplicatedIds"),
+    RuleSpec("ignore_case", "crs_linter.rules.ignore_case", "IgnoreCase"),
+    RuleSpec("indentation", "crs_linter.rules.indentation", "Indentation"),
+    RuleSpec("lowercase_ignorecase", "crs_linter.rules.lowercase_ignorecase", "LowercaseIgnorecase"),
+    RuleSpec("no_negated_request_cookies", "crs_linter.rules.no_negated_request_cookies", "NoNegatedRequestCookies"),
+    RuleSpec("operator_downgrade", "crs_linter.rules.operator_downgrade", "OperatorDowngrade", enabled_by_default=False),
+    RuleSpec("ordered_actions", "crs_linter.rules.ordered_actions", "OrderedActions"),
+    RuleSpec("pass_nolog", "crs_linter.rules.pass_nolog", "PassNolog"),
+    RuleSpec("phase_placement", "crs_linter.rules.phase_placement", "PhasePlacement", enabled_by_default=False),
+    RuleSpec("pl_consistency", "crs_linter.rules.pl_consistency", "PlConsistency"),
+    RuleSpec("regex_backtracking", "crs_linter.rules.regex_backtracking", "RegexBacktracking", enabled_by_default=False),
+    RuleSpec("rule_tests", "crs_linter.rules.rule_tests", "RuleTests"),
+    RuleSpec("standalonetxn", "crs_linter.rules.standalone_txn", "StandaloneTxn"),
+    RuleSpec("transformation_pipeline", "crs_linter.rules.transformation_pipeline", "TransformationPipeline", enabled_by_default=False),
+    RuleSpec("variables_usage", "crs_linter.rules.variables_usage", "VariablesUsage"),
+    RuleSpec("version", "crs_linter.rules.version", "Version"),
+)
+
+_rule_specs = None
+# guards the lazy initialization of the module globals
+_registry_lock = threading.Lock()
+
+
+def get_rule_specs() -> List[RuleSpec]:
+    """Return the declarations of the built-in and third-party rules
+
+    The third-party rules are run after the built-in ones, a third-party rule
+    can't replace a built-in rule with the same name.
+    """
+    global _rule_specs
+    with _registry_lock:
+        if _rule_specs is None:
+            _rule_specs = _discover_rule_specs()
+        return list(_rule_specs)
+
+
+def _discover_rule_specs():
+    specs = list(BUILTIN_RULES)
+    names = {spec.name for spec in specs}
+    for ep in sorted(entry_points(group=ENTRY_POINT_GROUP), key=lambda ep: ep.name):
+        module, _, class_name = ep.value.partition(":")
+        if ep.name in names or not class_name:
+            continue
+        specs.append(RuleSpec(ep.name, module.strip(), class_name.strip()))
+        names.add(ep.name)
+    return specs
+
+
+def default_rule_names() -> set:
+    """Return the names of the rules run when no rules are selected"""
+    return {spec.name for spec in get_rule_specs() if spec.enabled_by_default}
+
 
 class Rules:
-    """Manages a collection of linting rules as a singleton."""
+    """Manages a collection of linting rules.
+
+    The rules are given as RuleSpec declarations, loaded on first use, or
+    registered as instances. Every session has its own collection, which can
+    be used from several threads.
+    """
 
-    _instance = None
-    _initialized = False
+    def __init__(self, specs=(), known_names=()):
+        self._lock = threading.Lock()
+        # RuleSpec until loaded, then the Rule instance, in run order
+        self._entries = list(specs)
+        # names of the rules that exist, selected or not
+        self._known_names = {entry.name for entry in self._entries} | set(known_names)
 
-    def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super(Rules, cls).__new__(cls)
-        return cls._instance
+    @classmethod
+    def from_registry(cls, select=None):
+        """Create the rules of the registry, only the selected ones if `select` is given"""
+        specs = get_rule_specs()
+        if select is None:
+            selected = [spec for spec in specs if spec.enabled_by_default]
+        else:
+            selected = [spec for spec in specs if spec.name in select]
+        return cls(selected, known_names=[spec.name for spec in specs])
 
-    def __init__(self):
-        if not self._initialized:
-            self._rules: List[Rule] = []
-            self._initialized = True
+    @property
+    def _rules(self) -> List[Rule]:
+        return self.get_registered_rules()
 
     def register_rule(self, rule: Rule):
         """Registers a rule instance."""
         if not isinstance(rule, Rule):
             raise TypeError("rule must be an instance of Rule")
-        self._rules.append(rule)
+        with self._lock:
+            self._entries.append(rule.freeze())
+            self._known_names.add(rule.name)
+
+    def get_rule(self, name: str) -> Optional[Rule]:
+        """Returns the rule with the given name, if it is selected."""
+        for i, entry in enumerate(self._entries):
+            if entry.name == name:
+                return self._load(i)
+        return None
 
     def get_rule_messages(self, name: str):
         """Retrieves success, error messages, and title for a rule."""
-        for rule in self._rules:
-            if rule.name == name:
-                return rule.get_messages()
+        rule = self.get_rule(name)
+        if rule is not None:
+            return rule.get_messages()
         return f"{name} check ok.", f"{name} check found error(s)", name.replace('_', ' ').title()
 
     def get_rule_names(self) -> set:
-        """Returns the set of all registered rule names."""
-        return {rule.name for rule in self._rules}
+        """Returns the set of the names of all known rules, selected or not."""
+        return set(self._known_names)
+
+    def get_selected_names(self) -> set:
+        """Returns the set of the names of the selected rules, without loading them."""
+        return {entry.name for entry in self._entries}
 
     def get_registered_rules(self) -> list:
-        """Returns the list of all registered rule instances."""
-        return list(self._rules)
+        """Returns the list of the selected rule instances."""
+        return [self._load(i) for i in range(len(self._entries))]
+
+    def _load(self, i) -> Rule:
+        entry = self._entries[i]
+        if isinstance(entry, RuleSpec):
+            with self._lock:
+                entry = self._entries[i]
+                if isinstance(entry, RuleSpec):
+                    entry = entry.load()
+                    self._entries[i] = entry
+        return entry
+
+    def compile(self, tagslist=None, test_cases=None, exclusion_list=None, crs_version=None, filename_tag_exclusions=None, cache_dir=None):
+        """Compile the run plan of the selected rules for the values shared by all files"""
+        return RunPlan(
+            self.get_registered_rules(),
+            tagslist=tagslist,
+            test_cases=test_cases,
+            exclusion_list=exclusion_list,
+            crs_version=crs_version,
+            filename_tag_exclusions=filename_tag_exclusions,
+            cache_dir=cache_dir,
+        )
 
     def get_rule_configs(self, linter_instance, tagslist=None, test_cases=None, exclusion_list=None, crs_version=None, filename_tag_exclusions=None):
         """
         Generates rule configurations for the linter based on registered rules and current context.
         """
-        configs = []
-        for rule in self._rules:
-            # Get rule's expected arguments
-            args = list(rule.get_args())
-            kwargs = dict(rule.get_kwargs())
-
-            # Map common parameters
-            if "data" in args:
-                args[args.index("data")] = linter_instance.data
-            if "globtxvars" in args:
-                args[args.index("globtxvars")] = linter_instance.globtxvars
-            if "ids" in args:
-                args[args.index("ids")] = linter_instance.ids
-            if "tags" in args:
-                args[args.index("tags")] = tagslist
-            if "test_cases" in args:
-                args[args.index("test_cases")] = test_cases
-            if "exclusion_list" in args:
-                args[args.index("exclusion_list")] = exclusion_list
-            if "version" in args:
-                args[args.index("version")] = crs_version
-            if "filename" in args:
-                args[args.index("filename")] = linter_instance.filename
-            if "content" in args:
-                args[args.index("content")] = linter_instance.data
-            if "file_content" in args:
-                args[args.index("file_content")] = linter_instance.file_content
-            if "filename_tag_exclusions" in args:
-                args[args.index("filename_tag_exclusions")] = filename_tag_exclusions
-
-            # Evaluate condition if a function is provided
-            condition = None
-            condition_func = rule.get_condition()
-            if condition_func:
-                # Pass relevant context to the condition function
-                condition = condition_func(
-                    linter_instance=linter_instance,
-                    tagslist=tagslist,
-                    test_cases=test_cases,
-                    exclusion_list=exclusion_list,
-                    crs_version=crs_version,
-                    filename_tag_exclusions=filename_tag_exclusions
-                )
+        plan = self.compile(tagslist, test_cases, exclusion_list, crs_version, filename_tag_exclusions)
+        return plan.configs(linter_instance)
+
+
+# rule arguments taken from the linter of the file -> linter attribute
+FILE_ARGS = {
+    "data": "data",
+    "globtxvars": "globtxvars",
+    "ids": "ids",
+    "filename": "filename",
+    "content": "data",
+    "file_content": "file_content",
+}
+
+# rule arguments shared by all files of a run -> RunPlan argument
+RUN_ARGS = {
+    "tags": "tagslist",
+    "test_cases": "test_cases",
+    "exclusion_list": "exclusion_list",
+    "version": "crs_version",
+    "filename_tag_exclusions": "filename_tag_exclusions",
+    "cache_dir": "cache_dir",
+}
+
+# rule arguments created by the run plan on first use -> RunPlan attribute
+PLAN_ARGS = {
+    "regexes": "regexes",
+}
+
+
+# file slot of the directives selected by the applicability of the rule
+DATA_SLOT = object()
+
+
+class PlannedRule:
+    """A rule of a run plan, with its arguments bound as far as possible"""
+
+    __slots__ = ("rule", "template", "file_slots", "kwargs", "condition", "applicability")
+
+    def __init__(self, rule, template, file_slots, kwargs, condition, applicability=None):
+        self.rule = rule
+        # arguments with the run values filled in
+        self.template = template
+        # (position, linter attribute) of the file values
+        self.file_slots = file_slots
+        self.kwargs = kwargs
+        # None, a bool, or the condition function of the rule
+        self.condition = condition
+        # the directives passed as `data`, None for all
+        self.applicability = applicability
+
+    def bind(self, linter_instance):
+        """Return the arguments of the rule for a file"""
+        args = list(self.template)
+        for pos, attr in self.file_slots:
+            if attr is DATA_SLOT:
+                args[pos] = linter_instance.select_directives(self.applicability)
             else:
-                # Default conditions based on parameter presence
-                if rule.name == "version":
-                    condition = crs_version is not None
-                elif rule.name == "approved_tags":
-                    condition = tagslist is not None
-                elif rule.name == "rule_tests":
-                    condition = test_cases is not None
-
-            configs.append((rule, args, kwargs, condition))
+                args[pos] = getattr(linter_instance, attr)
+        return args
+
+
+class RunPlan:
+    """The rules of a run with their arguments and conditions, compiled once
+
+    Only the file values (parsed data, file name, ...) are filled in per
+    file; the run values are bound and the default conditions are resolved
+    when the plan is compiled, the rules that won't run are left out.
+    """
+
+    def __init__(self, rules, tagslist=None, test_cases=None, exclusion_list=None, crs_version=None, filename_tag_exclusions=None, cache_dir=None):
+        self.context = {
+            "tagslist": tagslist,
+            "test_cases": test_cases,
+            "exclusion_list": exclusion_list,
+            "crs_version": crs_version,
+            "filename_tag_exclusions": filename_tag_exclusions,
+            "cache_dir": cache_dir,
+        }
+        self._regexes = None
+        self._lock = threading.Lock()
+        self.steps = [self._plan_rule(rule) for rule in rules]
+        self._active = [step for step in self.steps if step.condition is not False]
+
+    def rules(self):
+        """Return the rules that can run, in run order"""
+        return [step.rule for step in self._active]
+
+    def uses(self, arg):
+        """Return True if a rule that can run takes the argument"""
+        return any(arg in step.rule.get_args() for step in self._active)
+
+    @property
+    def regexes(self):
+        """The RegexCache shared by the rules of the run, created on first use"""
+        with self._lock:
+            if self._regexes is None:
+                from .regex_analysis import RegexCache
+                self._regexes = RegexCache(self.context["cache_dir"])
+            return self._regexes
+
+    def bind(self, linter_instance, rule_filter=None):
+        """Yield (rule, args, kwargs) of the rules to run on the file of the linter"""
+        for step in self._active:
+            if rule_filter is not None and not rule_filter(step.rule):
+                continue
+            condition = step.condition
+            if callable(condition) and not condition(linter_instance=linter_instance, **self.context):
+                continue
+            yield step.rule, step.bind(linter_instance), step.kwargs
+
+    def configs(self, linter_instance):
+        """Return the (rule, args, kwargs, condition) configurations of all rules"""
+        configs = []
+        for step in self.steps:
+            condition = step.condition
+            if callable(condition):
+                condition = condition(linter_instance=linter_instance, **self.context)
+            configs.append((step.rule, step.bind(linter_instance), dict(step.kwargs), condition))
         return configs
 
+    def _plan_rule(self, rule):
+        template = list(rule.get_args())
+        applicability = rule.get_applicability()
+        file_slots = []
+        for pos, name in enumerate(template):
+            if name == "data" and applicability is not None:
+                file_slots.append((pos, DATA_SLOT))
+            elif name in FILE_ARGS:
+                file_slots.append((pos, FILE_ARGS[name]))
+            elif name in RUN_ARGS:
+                template[pos] = self.context[RUN_ARGS[name]]
+            elif name in PLAN_ARGS:
+                template[pos] = getattr(self, PLAN_ARGS[name])
+
+        condition = rule.get_condition()
+        if condition is None:
+            # Default conditions based on parameter presence
+            if rule.name == "version":
+                condition = self.context["crs_version"] is not None
+            elif rule.name == "approved_tags":
+                condition = self.context["tagslist"] is not None
+            elif rule.name == "rule_tests":
+                condition = self.context["test_cases"] is not None
+
+        return PlannedRule(rule, tuple(template), tuple(file_slots), dict(rule.get_kwargs()), condition, applicability)
+
 
-# Global singleton instance
-_rules_instance = Rules()
+# Default rules, created on first use
+_rules_instance = None
 
 
 def get_rules():
-    """Get the singleton Rules instance."""
+    """Get the default Rules instance, with the rules enabled by default."""
+    global _rules_instance
+    if _rules_instance is None:
+        rules = Rules.from_registry()
+        with _registry_lock:
+            if _rules_instance is None:
+                _rules_instance = rules
     return _rules_instance
 
 
 def get_rule_names() -> set:
-    """Get the set of all registered rule names."""
-    return _rules_instance.get_rule_names()
+    """Get the set of all known rule names."""
+    return get_rules().get_rule_names()
 
 
 def get_registered_rules() -> list:
-    """Get the list of all registered rule instances."""
-    return _rules_instance.get_registered_rules()
\ No newline at end of file
+    """Get the list of the default rule instances."""
+    return get_rules().get_registered_rules()
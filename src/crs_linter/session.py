@@ -0,0 +1,346 @@
+"""
+Embeddable linting API.
+
+A LintSession loads the configuration (approved tags, exclusions, version,
+tests) once and lints files or in-memory buffers added to it. Files can be
+updated or removed later: only the changed file is parsed again, the results
+of the per-file rules are cached, and the rules that depend on the whole
+ruleset (TX variables, rule IDs) are checked again.
+
+The session never exits the process and doesn't log: errors are raised as
+exceptions, problems are returned as iterators.
+"""
+
+import asyncio
+import glob
+import os.path
+import threading
+from bisect import insort
+
+import msc_pyparser
+
+from .config import LintConfig
+from .errors import ConfigError, LintError, ParseError
+from .linter import Linter
+from .problem_store import ProblemStore
+from .rule_index import RuleIdIndex
+from .rules_metadata import Rules, default_rule_names
+from .tx_graph import TxVariableGraph
+from .utils import remove_comments
+
+# rule arguments that make a rule depend on the other files of the ruleset
+CROSS_FILE_ARGS = ("globtxvars", "ids")
+
+# default number of files read, parsed or checked at the same time
+DEFAULT_CONCURRENCY = 4
+
+
+def read_lines(filename):
+    """Read the non-empty, non-comment lines of a file"""
+    lines = []
+    try:
+        with open(filename, "r") as fp:
+            for l in fp.readlines():
+                l = l.strip()
+                if l.startswith("#"):
+                    continue
+                if len(l) > 0:
+                    lines.append(l)
+    except FileNotFoundError:
+        raise ConfigError(f"Can't open file: {filename}")
+
+    return lines
+
+
+def load_test_cases(directory):
+    """Collect the IDs of the rules with tests from the test directory"""
+    testlist = glob.glob(os.path.join(f"{directory}", "**", "*.y[a]ml"))
+    testlist.sort()
+    if len(testlist) == 0:
+        raise ConfigError(f"Can't open files in given path ({directory})!")
+    test_cases = {}
+    for tc in testlist:
+        tcname = os.path.basename(tc).split(".")[0]
+        test_cases[int(tcname)] = 1
+    return test_cases
+
+
+def parse_content(filename, content):
+    """Parse the content of a rules file, returns the parsed data and the content that was parsed"""
+    # modify the content of the file, if it is the "crs-setup.conf.example"
+    if os.path.basename(filename).startswith("crs-setup.conf.example"):
+        content = remove_comments(content)
+    try:
+        mparser = msc_pyparser.MSCParser()
+        mparser.parser.parse(content)
+    except Exception as e:
+        err = e.args[1] if len(e.args) > 1 and isinstance(e.args[1], dict) else {}
+        cause = "Lexer" if err.get("cause") == "lexer" else "Parser"
+        raise ParseError(filename, err.get("line", 0), cause) from e
+    return mparser.configlines, content
+
+
+def read_and_parse(filename):
+    """Read and parse a rules file, returns the parsed data and the content that was parsed"""
+    with open(filename, "r", encoding="UTF-8") as fp:
+        content = fp.read()
+    return parse_content(filename, content)
+
+
+def is_cross_file_rule(rule):
+    """Return True if the results of a rule depend on the other files"""
+    return any(arg in CROSS_FILE_ARGS for arg in rule.get_args())
+
+
+class LintSession:
+    """Lint a set of rules files with a configuration loaded once
+
+    The files are checked in sorted order of their names, the order used by
+    the CLI, so TX variables defined in earlier files are visible in the
+    later ones.
+
+    Once the files are added, the problems of different files can be
+    checked from several threads at the same time.
+    """
+
+    def __init__(self, tags=None, test_cases=None, test_exclusions=None, crs_version=None,
+                 filename_tag_exclusions=None, rules=None, config=None, cache_dir=None):
+        self.tags = tags
+        self.test_cases = test_cases
+        self.test_exclusions = test_exclusions
+        self.crs_version = crs_version
+        self.filename_tag_exclusions = filename_tag_exclusions or []
+        self.config = config or LintConfig()
+        # directory of the analysis results kept between runs
+        self.cache_dir = cache_dir
+        if rules is None:
+            # only the rules enabled for some file are loaded
+            self._default_names = default_rule_names()
+            rules = Rules.from_registry(select=self.config.enabled_rules(self._default_names))
+        else:
+            self._default_names = rules.get_selected_names()
+        self.config.validate(rules.get_rule_names())
+        self.rules = rules
+        self.txvars = TxVariableGraph()
+        self.ids = RuleIdIndex()
+        self._filenames = []
+        # filename -> (parsed data, content)
+        self._files = {}
+        self._linters = {}
+        # filename -> {rule name: problems} of the per-file rules
+        self._results = {}
+        self._plan = None
+        # guards the lazily created linters and run plan
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_files(cls, tags_list=None, tests=None, tests_exclusions=None, crs_version=None,
+                   filename_tags_exclusions=None, rules=None, config=None, cache_dir=None):
+        """Create a session, reading the configuration from files"""
+        if crs_version is not None and not crs_version.startswith("OWASP_CRS/"):
+            crs_version = "OWASP_CRS/" + crs_version
+        return cls(
+            tags=read_lines(tags_list) if tags_list is not None else None,
+            test_cases=load_test_cases(tests) if tests is not None else None,
+            test_exclusions=read_lines(tests_exclusions) if tests_exclusions is not None else None,
+            crs_version=crs_version,
+            filename_tag_exclusions=read_lines(filename_tags_exclusions) if filename_tags_exclusions is not None else None,
+            rules=rules,
+            config=config,
+            cache_dir=cache_dir,
+        )
+
+    @property
+    def files(self):
+        """The names of the files of the session, in load order"""
+        return list(self._filenames)
+
+    def parsed(self, filename):
+        """Return the parsed data of a file"""
+        return self._files[filename][0]
+
+    def content(self, filename):
+        """Return the content of a file, as it was parsed"""
+        return self._files[filename][1]
+
+    def add_file(self, filename):
+        """Read, parse and add a rules file
+
+        Raises OSError if the file can't be read and ParseError if it can't
+        be parsed.
+        """
+        data, content = read_and_parse(filename)
+        self._register(filename, data, content)
+
+    def add_buffer(self, filename, content):
+        """Parse and add the content of a rules file, `filename` names it in the problems"""
+        data, content = parse_content(filename, content)
+        self._register(filename, data, content)
+
+    async def add_files(self, filenames, executor=None, limit=DEFAULT_CONCURRENCY):
+        """Read and parse files in the executor, at most `limit` at a time
+
+        The files are read and parsed concurrently, then added in load order.
+        The executor defaults to the default executor of the event loop.
+        """
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(limit)
+
+        async def parse(filename):
+            async with semaphore:
+                return await loop.run_in_executor(executor, read_and_parse, filename)
+
+        tasks = [asyncio.ensure_future(parse(f)) for f in filenames]
+        try:
+            results = await asyncio.gather(*tasks)
+        finally:
+            # nothing left to do on success, cancels the pending parses on error
+            for task in tasks:
+                task.cancel()
+        for filename, (data, content) in sorted(zip(filenames, results), key=lambda r: r[0]):
+            self._register(filename, data, content)
+
+    async def stream(self, filenames=None, executor=None, limit=DEFAULT_CONCURRENCY):
+        """Yield the problems of files, checked in the executor at most `limit` at a time
+
+        The given files are added to the session first, without files the
+        problems of all files are yielded. The problems are yielded in load
+        order; closing the generator cancels the pending checks. The session
+        must not be modified while a stream is running.
+        """
+        if filenames is not None:
+            await self.add_files(filenames, executor, limit)
+            targets = set(filenames)
+            filenames = [f for f in self._filenames if f in targets]
+        else:
+            filenames = self.files
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(limit)
+
+        async def check(filename):
+            async with semaphore:
+                return await loop.run_in_executor(executor, lambda: ProblemStore(self.problems(filename)))
+
+        tasks = [asyncio.ensure_future(check(f)) for f in filenames]
+        try:
+            for task in tasks:
+                for problem in await task:
+                    yield problem
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def _register(self, filename, data, content):
+        if filename in self._files:
+            self._forget(filename)
+        else:
+            insort(self._filenames, filename)
+        self._files[filename] = (data, content)
+        self.txvars.add_file(filename, data)
+        self.ids.add_file(filename, data)
+        if self._filenames[-1] != filename:
+            # the file was not added at the end of the load order
+            self.txvars.reorder(self._filenames)
+            self.ids.reorder(self._filenames)
+
+    def update_file(self, filename, content=None):
+        """Replace the content of a file, read again from disk if no content is given"""
+        if content is None:
+            self.add_file(filename)
+        else:
+            self.add_buffer(filename, content)
+
+    def remove_file(self, filename):
+        """Remove a file from the session"""
+        if filename not in self._files:
+            raise KeyError(filename)
+        self._forget(filename)
+        self._filenames.remove(filename)
+        del self._files[filename]
+        self.txvars.remove_file(filename)
+        self.ids.remove_file(filename)
+
+    def problems(self, filename=None):
+        """Yield the problems of a file, or of all files in load order"""
+        if filename is None:
+            for f in self._filenames:
+                yield from self.problems(f)
+            return
+
+        if filename not in self._files:
+            raise KeyError(filename)
+        linter = self._linter(filename)
+        with self._lock:
+            results = self._results.setdefault(filename, {})
+        enabled = self.config.rules_for(filename, self._default_names)
+        for rule in self.plan.rules():
+            if rule.name not in enabled:
+                continue
+            cross_file = is_cross_file_rule(rule)
+            if not cross_file and rule.name in results:
+                yield from results[rule.name]
+                continue
+            problems = []
+            for problem in linter.run_checks(plan=self.plan, rule_filter=lambda r: r is rule):
+                problems.append(problem)
+                yield problem
+            # only complete results are kept, the generator can be closed early
+            if not cross_file:
+                results[rule.name] = problems
+
+    @property
+    def plan(self):
+        """The run plan of the rules, compiled on first use"""
+        with self._lock:
+            if self._plan is None:
+                self._plan = self.rules.compile(
+                    tagslist=self.tags,
+                    test_cases=self.test_cases,
+                    exclusion_list=self.test_exclusions,
+                    crs_version=self.crs_version,
+                    filename_tag_exclusions=self.filename_tag_exclusions,
+                    cache_dir=self.cache_dir,
+                )
+            return self._plan
+
+    def prefetch_regexes(self, workers=1):
+        """Parse and compile the @rx regexes of the files, if a rule uses them"""
+        plan = self.plan
+        if not plan.uses("regexes"):
+            return
+        patterns = [
+            d["operator_argument"]
+            for filename in self.files
+            for d in self.parsed(filename)
+            if d.get("operator") == "@rx"
+        ]
+        plan.regexes.prefetch(patterns, workers)
+
+    def unused_tx_variables(self):
+        """Return the definitions of the TX variables that are never used"""
+        return self.txvars.unused()
+
+    def _linter(self, filename):
+        with self._lock:
+            linter = self._linters.get(filename)
+            if linter is None:
+                data, content = self._files[filename]
+                linter = Linter(data, filename, self.txvars, self.ids, rules=self.rules, file_content=content)
+                self._linters[filename] = linter
+            return linter
+
+    def _forget(self, filename):
+        self._linters.pop(filename, None)
+        self._results.pop(filename, None)
+
+
+async def lint_files(filenames, executor=None, limit=DEFAULT_CONCURRENCY, **config):
+    """Lint files in a new session and return their problems, in load order, as a ProblemStore
+
+    The keyword arguments are passed to LintSession.
+    """
+    session = LintSession(**config)
+    store = ProblemStore()
+    async for problem in session.stream(filenames, executor, limit):
+        store.append(problem)
+    return store
@@ -0,0 +1,229 @@
+"""
+Python stand-ins of the ModSecurity transformations (`t:` actions).
+
+The values are strings of bytes decoded as latin-1, like the ones the engine
+transforms. The stand-ins follow the ModSecurity reference manual closely
+enough to feed realistic input to the regexes; they are not exact in every
+corner case. The transformations without a stand-in are listed by
+`unsupported()` and skipped.
+
+`rule_links()` and `effective_transformations()` model the transformations a
+rule link actually runs, including the ones inherited from SecDefaultAction.
+"""
+
+import base64
+import binascii
+import hashlib
+import html
+import posixpath
+import re
+from urllib.parse import unquote_plus
+
+# the characters ModSecurity considers whitespace
+WHITESPACE = " \t\n\r\f\v\xa0"
+
+_WHITESPACE_RUN = re.compile(f"[{WHITESPACE}]+")
+_WHITESPACE_CHAR = re.compile(f"[{WHITESPACE}]")
+_UNICODE_ESCAPE = re.compile(r"%u([0-9a-fA-F]{4})")
+_JS_ESCAPE = re.compile(r"\\(u[0-9a-fA-F]{4}|x[0-9a-fA-F]{2}|[0-7]{1,3}|.)", re.DOTALL)
+_CSS_ESCAPE = re.compile(r"\\([0-9a-fA-F]{1,6}[ \t\n\r\f]?|.)", re.DOTALL)
+_C_COMMENT = re.compile(r"/\*.*?(?:\*/|$)", re.DOTALL)
+_COMMENTS = re.compile(r"/\*.*?(?:\*/|$)|<!--.*?(?:-->|$)|--[^\n]*|#[^\n]*", re.DOTALL)
+_SQL_HEX = re.compile(r"0x((?:[0-9a-fA-F]{2})+)")
+PHASE_ALIASES = {"request": "2", "response": "4", "logging": "5"}
+_C_ESCAPES = {"a": "\a", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t", "v": "\v"}
+
+
+def _js_unescape(match):
+    escape = match.group(1)
+    if escape[0] == "u":
+        # ModSecurity keeps the low byte of the full width characters
+        return chr(int(escape[1:], 16) & 0xFF)
+    if escape[0] == "x":
+        return chr(int(escape[1:], 16))
+    if escape.isdigit():
+        return chr(int(escape, 8) & 0xFF)
+    return _C_ESCAPES.get(escape, escape)
+
+
+def _css_unescape(match):
+    escape = match.group(1).rstrip(" \t\n\r\f")
+    if escape and all(c in "0123456789abcdefABCDEF" for c in escape):
+        return chr(int(escape, 16) & 0xFF)
+    return match.group(1)
+
+
+def _escape_seq_decode(value):
+    return _JS_ESCAPE.sub(lambda m: _js_unescape(m) if m.group(1)[0] != "u" else m.group(0), value)
+
+
+def _cmd_line(value):
+    value = re.sub(r"[\\\"'^]", "", value)
+    value = re.sub(r"[,;]", " ", value)
+    value = _WHITESPACE_RUN.sub(" ", value)
+    value = re.sub(r" (?=[/(])", "", value)
+    return value.lower()
+
+
+def _normalize_path(value):
+    if not value:
+        return value
+    normalized = posixpath.normpath(value)
+    if value.endswith("/") and not normalized.endswith("/"):
+        normalized += "/"
+    return normalized
+
+
+def _base64_decode(value):
+    try:
+        return binascii.a2b_base64(value.encode("latin-1", "replace")).decode("latin-1")
+    except binascii.Error:
+        return ""
+
+
+def _hex_decode(value):
+    digits = re.sub(r"[^0-9a-fA-F]", "", value)
+    return bytes.fromhex(digits[:len(digits) // 2 * 2]).decode("latin-1")
+
+
+def _utf8_to_unicode(value):
+    try:
+        text = value.encode("latin-1").decode("utf-8")
+    except (UnicodeEncodeError, UnicodeDecodeError):
+        return value
+    return "".join(c if ord(c) < 0x80 else f"%u{ord(c):04x}" for c in text)
+
+
+def _digest(algorithm):
+    return lambda value: hashlib.new(algorithm, value.encode("latin-1", "replace")).digest().decode("latin-1")
+
+
+# lowercase name -> function
+TRANSFORMATIONS = {
+    "lowercase": str.lower,
+    "uppercase": str.upper,
+    "urldecode": lambda value: unquote_plus(value, encoding="latin-1"),
+    "urldecodeuni": lambda value: unquote_plus(
+        _UNICODE_ESCAPE.sub(lambda m: chr(int(m.group(1), 16) & 0xFF), value), encoding="latin-1"
+    ),
+    "htmlentitydecode": html.unescape,
+    "jsdecode": lambda value: _JS_ESCAPE.sub(_js_unescape, value),
+    "cssdecode": lambda value: _CSS_ESCAPE.sub(_css_unescape, value),
+    "escapeseqdecode": _escape_seq_decode,
+    "cmdline": _cmd_line,
+    "compresswhitespace": lambda value: _WHITESPACE_RUN.sub(" ", value),
+    "removewhitespace": lambda value: _WHITESPACE_CHAR.sub("", value),
+    "removenulls": lambda value: value.replace("\x00", ""),
+    "replacenulls": lambda value: value.replace("\x00", " "),
+    "removecomments": lambda value: _COMMENTS.sub("", value),
+    "removecommentschar": lambda value: re.sub(r"/\*|\*/|--|#", "", value),
+    "replacecomments": lambda value: _C_COMMENT.sub(" ", value),
+    "trim": lambda value: value.strip(WHITESPACE),
+    "trimleft": lambda value: value.lstrip(WHITESPACE),
+    "trimright": lambda value: value.rstrip(WHITESPACE),
+    "normalisepath": _normalize_path,
+    "normalizepath": _normalize_path,
+    "normalisepathwin": lambda value: _normalize_path(value.replace("\\", "/")),
+    "normalizepathwin": lambda value: _normalize_path(value.replace("\\", "/")),
+    "base64decode": _base64_decode,
+    "base64decodeext": _base64_decode,
+    "base64encode": lambda value: base64.b64encode(value.encode("latin-1", "replace")).decode("ascii"),
+    "hexdecode": _hex_decode,
+    "hexencode": lambda value: value.encode("latin-1", "replace").hex(),
+    "sqlhexdecode": lambda value: _SQL_HEX.sub(lambda m: bytes.fromhex(m.group(1)).decode("latin-1"), value),
+    "utf8tounicode": _utf8_to_unicode,
+    "length": lambda value: str(len(value)),
+    "md5": _digest("md5"),
+    "sha1": _digest("sha1"),
+}
+
+
+def transformation_chain(actions):
+    """Return the names of the transformations of a directive, in order
+
+    `t:none` drops the transformations before it.
+    """
+    chain = []
+    for a in actions:
+        if a["act_name"] == "t":
+            name = a["act_arg"].lower()
+            if name == "none":
+                chain = []
+            else:
+                chain.append(name)
+    return chain
+
+
+def canonical(name):
+    """Return the lowercase name of a transformation, with the `normalize` spelling"""
+    return name.lower().replace("normalise", "normalize")
+
+
+def parse_default_action(d):
+    """Return the phase and the transformations of a SecDefaultAction"""
+    phase = "2"
+    transformations = []
+    argument = d["arguments"][0]["argument"] if d.get("arguments") else ""
+    for action in argument.split(","):
+        name, _, value = action.strip().partition(":")
+        if name == "phase":
+            phase = PHASE_ALIASES.get(value.strip().lower(), value.strip())
+        elif name == "t":
+            value = value.strip()
+            transformations = [] if value.lower() == "none" else transformations + [value]
+    return phase, transformations
+
+
+def rule_links(data):
+    """Yield every SecRule with the phase of its chain and its SecDefaultAction defaults
+
+    The defaults are the (canonical transformations, line) of the last
+    SecDefaultAction of the phase before the rule, ([], None) without one.
+    """
+    # phase -> (transformations, line of the SecDefaultAction)
+    defaults = {}
+    phase = None
+    for d in data:
+        kind = d["type"].lower()
+        if kind == "secdefaultaction":
+            default_phase, transformations = parse_default_action(d)
+            defaults[default_phase] = ([canonical(t) for t in transformations], d["lineno"])
+            continue
+        if kind != "secrule" or "actions" not in d:
+            continue
+        if phase is None:
+            phase = "2"
+        for a in d["actions"]:
+            if a["act_name"] == "phase":
+                phase = PHASE_ALIASES.get(a["act_arg"].lower(), a["act_arg"])
+        yield d, phase, defaults.get(phase, ([], None))
+        if not any(a["act_name"] == "chain" for a in d["actions"]):
+            phase = None
+
+
+def effective_transformations(actions, inherited=()):
+    """Return the (canonical transformation, line) pipeline of a rule link, in order
+
+    A link without t:none runs the `inherited` transformations of
+    SecDefaultAction first, their line is None; t:none drops the
+    transformations before it.
+    """
+    own = [(canonical(a["act_arg"]), a["lineno"]) for a in actions if a["act_name"] == "t"]
+    last_none = max((i for i, (name, _) in enumerate(own) if name == "none"), default=None)
+    if last_none is None:
+        return [(name, None) for name in inherited] + own
+    return own[last_none + 1:]
+
+
+def unsupported(names):
+    """Return the transformations without a stand-in"""
+    return [name for name in names if name.lower() not in TRANSFORMATIONS]
+
+
+def apply_transformations(value, names):
+    """Apply the transformations to a value, skipping the ones without a stand-in"""
+    for name in names:
+        transform = TRANSFORMATIONS.get(name.lower())
+        if transform is not None:
+            value = transform(value)
+    return value
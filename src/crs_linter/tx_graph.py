@@ -0,0 +1,326 @@
+"""
+Def-use graph of the TX variables.
+
+The graph is built once per run from the parsed files: every `setvar:tx.*`
+action (and every `&TX:foo` existence check) is a definition, every TX target,
+operator argument expansion and action argument expansion is a use. Rules and
+the unused variable report query the graph instead of rescanning the actions.
+"""
+
+import re
+import threading
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional
+
+# Precompiled scanners for the TX variable references
+EXPANSION_PATTERN = re.compile(r"%\{(tx.[^%]*)}", re.IGNORECASE)
+DYNAMIC_NAME_PATTERN = re.compile(r"%\{[^%]+}")
+NUMERIC_NAME_PATTERN = re.compile(r"^\d$")
+REGEX_NAME_PATTERN = re.compile(r"/.*/")
+TX_PREFIX_PATTERN = re.compile(r"tx\.", re.IGNORECASE)
+SCORE_PL_PATTERN = re.compile(r"anomaly_score_pl\d$")
+
+DISRUPTIVE_ACTIONS = {"block", "deny", "drop", "allow", "proxy", "redirect"}
+
+# Kinds of definitions
+SETVAR = "setvar"
+COUNTER = "counter"
+
+# Kinds of uses
+RVAR = "rvar"  # expansion in an action argument, e.g. msg:'%{tx.foo}'
+OPARG = "oparg"  # expansion in the operator argument, e.g. "@rx %{tx.foo}"
+VAR = "var"  # rule target, e.g. SecRule TX:foo
+SCORE = "score"  # anomaly score increment, e.g. setvar:tx.anomaly_score_pl1=+5
+
+
+@dataclass(frozen=True)
+class TxDefinition:
+    """A place where a TX variable is set."""
+    name: str
+    kind: str
+    phase: int
+    rule_id: int
+    filename: Optional[str]
+    line: int
+    # `&TX:foo` checks in rules with a disruptive action count as a use too
+    disruptive: bool = False
+
+
+@dataclass(frozen=True)
+class TxUse:
+    """A place where a TX variable is read."""
+    name: str
+    kind: str
+    phase: int
+    rule_id: int
+    filename: Optional[str]
+    line: int
+    # the spelling of the variable in the rule
+    label: str = ""
+    # the chain checks the existence of a variable before using it
+    guarded: bool = False
+
+
+class TxVariableGraph(dict):
+    """Def-use graph of the TX variables of a ruleset.
+
+    The mapping interface is the symbol table of the graph: it maps every
+    variable name (lowercase) to its earliest definition, using the same
+    ``{"phase", "used", "file", "ruleid", "line", "endLine"}`` dicts that
+    were shared between the rules as ``globtxvars``.
+
+    Files must be added in the order ModSecurity loads them: a use is only
+    resolved against the definitions of its own file and the files added
+    before it. The graph can be queried from several threads; changes are
+    serialized by a lock.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._lock = threading.Lock()
+        # filename -> (parsed data, setvar definitions, ordered events)
+        self._files = {}
+        self._defs: Dict[str, List[TxDefinition]] = {}
+        self._uses: Dict[str, List[TxUse]] = {}
+        self._symbol_defs: Dict[str, TxDefinition] = {}
+        self._unresolved: List[TxUse] = []
+
+    def add_file(self, filename, data):
+        """Add (or replace) the variables of a parsed file"""
+        entry = self._files.get(filename)
+        if entry is not None and entry[0] is data:
+            return
+        definitions, events = scan_tx_variables(filename, data)
+        with self._lock:
+            entry = self._files.get(filename)
+            if entry is not None and entry[0] is data:
+                return
+            self._files[filename] = (data, definitions, events)
+            if entry is None:
+                self._index(definitions, events)
+                self._resolve_file(definitions, events)
+            else:
+                self._rebuild()
+
+    def reorder(self, filenames):
+        """Change the load order of the files, without rescanning them"""
+        with self._lock:
+            filenames = [f for f in filenames if f in self._files]
+            if filenames != list(self._files):
+                self._files = {f: self._files[f] for f in filenames}
+                self._rebuild()
+
+    def remove_file(self, filename):
+        """Remove the variables of a file from the graph"""
+        with self._lock:
+            if self._files.pop(filename, None) is not None:
+                self._rebuild()
+
+    def defs_of(self, name) -> List[TxDefinition]:
+        """Return the definitions of a variable, in load order"""
+        return list(self._defs.get(name.lower(), ()))
+
+    def uses_of(self, name) -> List[TxUse]:
+        """Return the uses of a variable, in load order"""
+        return list(self._uses.get(name.lower(), ()))
+
+    def unused(self) -> List[TxDefinition]:
+        """Return the earliest definition of each variable that is never used"""
+        return [
+            self._symbol_defs[name]
+            for name, symbol in self.items()
+            if not symbol["used"] and name in self._symbol_defs
+        ]
+
+    def used_before_set(self, filename=None) -> List[TxUse]:
+        """Return the uses that are not set / set later, optionally for one file only"""
+        if filename is None:
+            return list(self._unresolved)
+        return [use for use in self._unresolved if use.filename == filename]
+
+    def to_dict(self) -> dict:
+        """Serialize the definitions and uses of the files"""
+        return {
+            "files": [
+                {
+                    "filename": filename,
+                    "definitions": [asdict(d) for d in definitions],
+                    "events": [
+                        dict(asdict(e), event="def" if isinstance(e, TxDefinition) else "use")
+                        for e in events
+                    ],
+                }
+                for filename, (_, definitions, events) in self._files.items()
+            ]
+        }
+
+    @classmethod
+    def from_dict(cls, serialized):
+        """Rebuild a graph serialized with to_dict()"""
+        graph = cls()
+        for f in serialized["files"]:
+            definitions = [TxDefinition(**d) for d in f["definitions"]]
+            events = []
+            for e in f["events"]:
+                e = dict(e)
+                event_type = e.pop("event")
+                events.append(TxDefinition(**e) if event_type == "def" else TxUse(**e))
+            graph._files[f["filename"]] = (None, definitions, events)
+            graph._index(definitions, events)
+            graph._resolve_file(definitions, events)
+        return graph
+
+    def _index(self, definitions, events):
+        for d in definitions:
+            self._defs.setdefault(d.name, []).append(d)
+        for e in events:
+            if isinstance(e, TxDefinition):
+                self._defs.setdefault(e.name, []).append(e)
+            else:
+                self._uses.setdefault(e.name, []).append(e)
+
+    def _rebuild(self):
+        self.clear()
+        self._defs = {}
+        self._uses = {}
+        self._symbol_defs = {}
+        self._unresolved = []
+        for _, definitions, events in self._files.values():
+            self._index(definitions, events)
+            self._resolve_file(definitions, events)
+
+    def _define(self, definition):
+        # set TX variable if there is no such key
+        # OR
+        # key exists but the existing struct's phase is higher
+        symbol = self.get(definition.name)
+        if symbol is None or symbol["phase"] > definition.phase:
+            self[definition.name] = {
+                "phase": definition.phase,
+                "used": False,
+                "file": definition.filename,
+                "ruleid": definition.rule_id,
+                "message": "",
+                "line": definition.line,
+                "endLine": definition.line,
+            }
+            self._symbol_defs[definition.name] = definition
+
+    def _resolve_file(self, definitions, events):
+        # all setvar actions of a file are visible to the whole file
+        for d in definitions:
+            self._define(d)
+
+        for e in events:
+            if isinstance(e, TxDefinition):
+                self._define(e)
+                if e.disruptive:
+                    self[e.name]["used"] = True
+                continue
+
+            symbol = self.get(e.name)
+            if e.kind == SCORE or NUMERIC_NAME_PATTERN.match(e.name):
+                if symbol is not None:
+                    symbol["used"] = True
+            elif e.kind == VAR:
+                if symbol is None or (
+                    e.rule_id != symbol["ruleid"] and e.phase < symbol["phase"]
+                ):
+                    self._unresolved.append(e)
+                elif e.phase >= symbol["phase"]:
+                    symbol["used"] = True
+            elif symbol is None or e.phase < symbol["phase"]:
+                if not e.guarded:
+                    self._unresolved.append(e)
+            else:
+                symbol["used"] = True
+
+
+def scan_tx_variables(filename, data):
+    """Collect the TX variable definitions and uses of a parsed file
+
+    Returns the `setvar` definitions (visible to the whole file) and the
+    ordered list of existence checks and uses.
+    """
+    definitions = []
+    events = []
+    chained = False
+    # set if rule checks the existence of var, e.g., `&TX:foo "@eq 1"`
+    check_exists = False
+    has_disruptive = False
+    ruleid = 0
+    phase = 2
+
+    for d in data:
+        if "actions" not in d:
+            continue
+        if not chained:
+            ruleid = 0
+            phase = 2  # works only in Apache, libmodsecurity uses default phase 1
+        else:
+            chained = False
+
+        for a in d["actions"]:
+            if a["act_name"] == "id":
+                ruleid = int(a["act_arg"])
+            if a["act_name"] == "phase":
+                phase = int(a["act_arg"])
+            if a["act_name"] == "chain":
+                chained = True
+            if a["act_name"] in DISRUPTIVE_ACTIONS:
+                has_disruptive = True
+            if a["act_name"] == "setvar" and a["act_arg"][0:2].lower() == "tx":
+                name = a["act_arg"][3:].split("=")[0].lower()
+                if not DYNAMIC_NAME_PATTERN.search(name):
+                    definitions.append(
+                        TxDefinition(name, SETVAR, phase, ruleid, filename, a["lineno"])
+                    )
+                    if SCORE_PL_PATTERN.search(name):
+                        events.append(
+                            TxUse(name, SCORE, phase, ruleid, filename, a["lineno"], name)
+                        )
+
+            # Check act_arg and act_arg_val for TX variable references
+            # example:
+            #    setvar:'tx.inbound_anomaly_score_threshold=5'
+            #
+            #  act_arg     <- tx.inbound_anomaly_score_threshold
+            #  act_atg_val <- 5
+            for field in ("act_arg", "act_arg_val"):
+                value = a.get(field)
+                if not value:
+                    continue
+                for ref in EXPANSION_PATTERN.findall(value):
+                    name = ref.lower().replace("tx.", "")
+                    events.append(
+                        TxUse(name, RVAR, phase, ruleid, filename, a["lineno"], name)
+                    )
+
+        for ref in EXPANSION_PATTERN.findall(d.get("operator_argument", "")):
+            name = TX_PREFIX_PATTERN.sub("", ref.lower())
+            if NUMERIC_NAME_PATTERN.match(name) or REGEX_NAME_PATTERN.match(name):
+                continue
+            events.append(
+                TxUse(name, OPARG, phase, ruleid, filename, d["lineno"], name, check_exists)
+            )
+
+        for v in d.get("variables", ()):
+            if v["variable"].lower() != "tx":
+                continue
+            name = v["variable_part"].lower()
+            if v["counter"]:
+                # Counter checks are used to test variable existence, not usage
+                check_exists = True
+                events.append(
+                    TxDefinition(name, COUNTER, phase, ruleid, filename, d["lineno"], has_disruptive)
+                )
+            elif not NUMERIC_NAME_PATTERN.match(name) and not REGEX_NAME_PATTERN.match(name):
+                events.append(
+                    TxUse(name, VAR, phase, ruleid, filename, d["lineno"], v["variable_part"])
+                )
+
+        if not chained:
+            check_exists = False
+            has_disruptive = False
+
+    return definitions, events
@@ -1,6 +1,8 @@
 """Utility functions for the CRS linter"""
 
+import os
 import re
+import tempfile
 from semver import Version
 from dulwich.repo import Repo
 from dulwich.objects import Commit, Tag
@@ -57,6 +59,26 @@ def get_id(actions):
             return int(a["act_arg"])
     return 0
 
+def write_file_atomic(filename, data):
+    """
+    Write data to filename atomically.
+
+    The content is written to a temporary file in the same directory, which
+    then replaces the original file, so readers never see a half-written file.
+    The permissions of an existing file are preserved.
+    """
+    directory = os.path.dirname(os.path.abspath(filename))
+    fd, tmp_name = tempfile.mkstemp(dir=directory, prefix=".crs-linter-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="UTF-8") as f:
+            f.write(data)
+        if os.path.exists(filename):
+            os.chmod(tmp_name, os.stat(filename).st_mode & 0o7777)
+        os.replace(tmp_name, filename)
+    except BaseException:
+        os.unlink(tmp_name)
+        raise
+
 def remove_comments(data):
     """
     In some special cases, remove the comments from the beginning of the lines.
@@ -1,10 +1,11 @@
 import glob
 import tempfile
 import os
-from typing import Optional, List
+from typing import Optional, List, Set
 
 import pytest
 from crs_linter.linter import Linter, parse_config
+from crs_linter.rules_metadata import Rules
 
 
 @pytest.fixture(scope="session")
@@ -51,6 +52,7 @@ def run_linter():
         rule: str,
         rule_type: Optional[str] = None,
         tagslist: Optional[List[str]] = None,
+        select: Optional[Set[str]] = None,
         **kwargs
     ):
         """
@@ -60,6 +62,8 @@ def run_linter():
             rule: The rule content as a string
             rule_type: Optional filter to return only problems for this rule type
             tagslist: Optional list of approved tags
+            select: Optional names of the rules to run, e.g. the rules
+                disabled by default; all the default rules otherwise
             **kwargs: Additional arguments to pass to run_checks()
 
         Returns:
@@ -74,7 +78,8 @@ def run_linter():
             if parsed is None:
                 raise ValueError(f"Failed to parse rule: {rule}")
 
-            linter = Linter(parsed, filename=temp_file, file_content=rule)
+            rules = Rules.from_registry(select=select) if select is not None else None
+            linter = Linter(parsed, filename=temp_file, file_content=rule, rules=rules)
 
             # Build kwargs for run_checks
             run_kwargs = {}
@@ -0,0 +1,63 @@
+"""Tests for the baseline of known problems."""
+
+from crs_linter.baseline import Baseline, Fingerprinter, normalize_description
+from crs_linter.lint_problem import LintProblem
+from crs_linter.rule_index import RuleIdIndex
+
+
+RULE = """SecRule ARGS "@rx foo" \\
+    "id:900100,\\
+    phase:1,\\
+    pass,\\
+    nolog"
+"""
+
+
+def fingerprint(parse_rule, content, line, desc="problem", rule="crs_tag"):
+    ids = RuleIdIndex()
+    ids.add_file("rules.conf", parse_rule(content))
+    fingerprinter = Fingerprinter("rules.conf", content, ids)
+    return fingerprinter.fingerprint(LintProblem(line=line, end_line=line, desc=desc, rule=rule))
+
+
+def test_normalize_description():
+    """Test that numbers and whitespace don't change the description."""
+    assert normalize_description("Duplicated  id 1001, line 3") == "duplicated id #, line #"
+
+
+def test_fingerprint_survives_moved_rule(parse_rule):
+    """Test that the fingerprint doesn't depend on the line numbers."""
+    assert fingerprint(parse_rule, RULE, 2) == fingerprint(parse_rule, "\n\n\n" + RULE, 5)
+
+
+def test_fingerprint_changes_with_the_rule(parse_rule):
+    """Test that the rule name, description and directive text are part of the fingerprint."""
+    original = fingerprint(parse_rule, RULE, 2)
+
+    assert fingerprint(parse_rule, RULE.replace("foo", "bar"), 2) != original
+    assert fingerprint(parse_rule, RULE, 2, desc="other problem") != original
+    assert fingerprint(parse_rule, RULE, 2, rule="deprecated") != original
+
+
+def test_filter_and_update(parse_rule):
+    """Test that the known problems are filtered out and counted."""
+    ids = RuleIdIndex()
+    ids.add_file("rules.conf", parse_rule(RULE))
+    fingerprinter = Fingerprinter("rules.conf", RULE, ids)
+    known = LintProblem(line=2, end_line=2, desc="known", rule="crs_tag")
+    new = LintProblem(line=2, end_line=2, desc="new", rule="crs_tag")
+
+    baseline = Baseline()
+    baseline.update([known], fingerprinter)
+
+    assert list(baseline.filter([known, new], fingerprinter)) == [new]
+    assert baseline.suppressed == 1
+
+
+def test_save_and_load(tmp_path):
+    """Test that a saved baseline is loaded back."""
+    filename = tmp_path / "baseline.txt"
+    Baseline(["b" * 16, "a" * 16]).save(filename)
+
+    assert filename.read_text().splitlines()[1:] == ["a" * 16, "b" * 16]
+    assert Baseline.load(filename).fingerprints == {"a" * 16, "b" * 16}
@@ -0,0 +1,116 @@
+"""Tests for the regex benchmark."""
+
+import json
+import sys
+
+from crs_linter.bench import benchmark, collect_regexes, format_report, load_payloads, percentile
+from crs_linter.cli import main
+
+
+RULES = '''SecRule ARGS "@rx (?:union|select)" \\
+    "id:1,\\
+    phase:2,\\
+    deny,\\
+    t:none,\\
+    t:urlDecode,\\
+    t:lowercase"
+
+SecRule REQUEST_URI "@rx \\.\\./" \\
+    "id:2,\\
+    phase:1,\\
+    deny,\\
+    t:none,\\
+    t:utf8toUnicode,\\
+    t:parityOdd7bit,\\
+    chain"
+    SecRule ARGS "@rx foo(?i)bar" \\
+        "t:none"
+'''
+
+
+def test_bundled_payloads():
+    payloads = load_payloads()
+
+    assert len(payloads) > 20
+    assert "' OR '1'='1" in payloads
+    assert "hello world" in payloads
+
+
+def test_payloads_are_read_as_bytes(tmp_path):
+    """Test that every byte of a payload file is kept, whatever its encoding."""
+    (tmp_path / "raw.txt").write_bytes(b"caf\xe9\n\xc3\xa9t\xe9\n%00\xff\n")
+
+    assert load_payloads(str(tmp_path)) == ["caf\xe9", "\xc3\xa9t\xe9", "%00\xff"]
+
+
+def test_collect_and_benchmark(tmp_path):
+    """Test that every @rx regex is timed on the transformed payloads."""
+    rules = tmp_path / "rules.conf"
+    rules.write_text(RULES)
+
+    results = benchmark(collect_regexes([str(rules)]), ["%55NION all", "../etc", "x"], repeat=2)
+
+    assert [(r.rule_id, r.line) for r in results] == [(1, 1), (2, 9), (2, 17)]
+    assert results[0].transformations == ["urldecode", "lowercase"]
+    # the regex only matches the payload once it is decoded and lowercased
+    assert results[0].matches == 1
+    assert results[0].mean_us > 0 and results[0].p99_us >= results[0].mean_us
+    assert results[1].unsupported == ["parityodd7bit"]
+    assert results[2].error is not None
+
+    report = format_report(results, top=1)
+    assert report[0] == "Top 1 regexes by mean match time:"
+    assert any(line.startswith("Not timed, rule 2 (rules.conf:17)") for line in report)
+    assert report[-1] == "Transformations without a stand-in, not applied: parityodd7bit"
+
+
+def test_catastrophic_regex_times_out(tmp_path):
+    """Test that a regex passing the deadline is reported, and the next ones are still timed."""
+    rules = tmp_path / "rules.conf"
+    rules.write_text('''SecRule ARGS "@rx ^(a+)+$" \\
+    "id:1,\\
+    phase:2,\\
+    deny,\\
+    t:none"
+
+SecRule ARGS "@rx ^a" \\
+    "id:2,\\
+    phase:2,\\
+    deny,\\
+    t:none"
+''')
+
+    results = benchmark(collect_regexes([str(rules)]), ["a" * 40 + "!"], repeat=1, timeout=0.5)
+
+    assert results[0].timeout == 0.5
+    assert results[1].timeout is None and results[1].matches == 1
+    report = format_report(results, top=5)
+    assert "Timed out, rule 1 (rules.conf:1): matching the payloads took more than 0.5s" in report
+    # not ranked
+    assert not any(line.endswith("rule 1 (rules.conf:1)") for line in report)
+
+
+def test_percentile():
+    assert percentile(list(range(1, 101)), 99) == 99
+    assert percentile([5.0], 99) == 5.0
+    assert percentile([], 99) == 0.0
+
+
+def test_regex_bench_command(monkeypatch, tmp_path, capsys):
+    rules = tmp_path / "rules.conf"
+    rules.write_text(RULES)
+    payloads = tmp_path / "payloads"
+    payloads.mkdir()
+    (payloads / "sqli.txt").write_text("1 UNION SELECT 1\n\nbenign\n")
+    output = tmp_path / "bench.json"
+    monkeypatch.setattr(sys, "argv", [
+        "crs-linter", "regex-bench", "-r", str(rules), "--payloads", str(payloads), "--top", "2", "--json", str(output),
+    ])
+
+    assert main() == 0
+
+    assert "Timed 3 regex(es) of 1 file(s) on 2 payload(s)" in capsys.readouterr().out
+    document = json.loads(output.read_text())
+    assert document["payloads"] == 2
+    assert [r["rule_id"] for r in document["results"]] == [1, 2, 2]
+    assert document["results"][0]["matches"] == 1
@@ -0,0 +1,79 @@
+"""Tests for the cache directory and the file timings."""
+
+from crs_linter.cache import TIMINGS_FILENAME, FileTimings, ideal_makespan, result_cache
+
+
+def write(path, size):
+    path.write_text("#" * size)
+    return str(path)
+
+
+def test_schedule_longest_first(tmp_path):
+    """Test that the files with the longest recorded duration come first."""
+    small = write(tmp_path / "small.conf", 10)
+    big = write(tmp_path / "big.conf", 10)
+    timings = FileTimings()
+    timings.record(small, parse=0.1, check=0.1)
+    timings.record(big, parse=0.5, check=2.0)
+
+    assert timings.schedule([small, big]) == [big, small]
+    assert timings.duration(big) == 2.5
+
+
+def test_new_files_are_estimated_by_size(tmp_path):
+    """Test that files without timings are estimated from their size."""
+    known = write(tmp_path / "known.conf", 100)
+    new_big = write(tmp_path / "new-big.conf", 1000)
+    new_small = write(tmp_path / "new-small.conf", 10)
+    timings = FileTimings()
+    timings.record(known, check=1.0)
+
+    assert timings.estimate(new_big) == 10.0
+    assert timings.schedule([new_small, known, new_big]) == [new_big, known, new_small]
+
+
+def test_changed_file_forgets_its_timings(tmp_path):
+    """Test that the durations of a file are dropped when its size changes."""
+    f = write(tmp_path / "rules.conf", 10)
+    timings = FileTimings()
+    timings.record(f, parse=0.1, check=0.2)
+    write(tmp_path / "rules.conf", 20)
+    timings.record(f, parse=0.3)
+
+    assert timings.duration(f) is None
+
+
+def test_save_and_load(tmp_path):
+    """Test the round trip through the cache directory."""
+    f = write(tmp_path / "rules.conf", 10)
+    timings = FileTimings()
+    timings.record(f, parse=0.1, check=0.2)
+    timings.save(tmp_path / "cache")
+
+    assert FileTimings.load(tmp_path / "cache").duration(f) == timings.duration(f)
+
+    (tmp_path / "cache" / TIMINGS_FILENAME).write_text("not json")
+    assert len(FileTimings.load(tmp_path / "cache")) == 0
+    assert len(FileTimings.load(tmp_path / "missing")) == 0
+
+
+def test_ideal_makespan():
+    """Test the lower bound of the makespan."""
+    assert ideal_makespan([1.0, 1.0, 1.0, 1.0], 2) == 2.0
+    # a single long task can't be split
+    assert ideal_makespan([5.0, 1.0, 1.0], 4) == 5.0
+    assert ideal_makespan([], 4) == 0.0
+
+
+def test_result_cache_without_directory_keeps_nothing():
+    cache = result_cache("test")
+    cache.put("key", 1)
+
+    assert cache.get("key") is None
+    assert len(cache) == 0
+
+
+def test_result_cache_directory(tmp_path):
+    result_cache("test", str(tmp_path)).put("key", 1)
+
+    assert result_cache("test", str(tmp_path)).get("key") == 1
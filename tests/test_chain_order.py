@@ -0,0 +1,247 @@
+"""Tests for the chain_order checker."""
+
+import pytest
+
+
+def test_chain_order_detection(run_linter):
+    rule = '''SecRule ARGS "@rx (?:union|select).*from" \\
+    "id:100,\\
+    phase:2,\\
+    deny,\\
+    t:none,\\
+    t:urlDecodeUni,\\
+    t:lowercase,\\
+    chain"
+    SecRule TX:enabled "@eq 1" \\
+        "t:none"'''
+
+    problems = run_linter(rule, rule_type="chain_order", select={"chain_order"})
+
+    assert len(problems) == 1
+    assert problems[0].line == 9
+    # the cost of the first link depends on the compiled size of the regex
+    assert problems[0].desc.startswith("chain link 2 (estimated cost: 0.5) is cheaper than the first link (estimated cost: ")
+    assert problems[0].desc.endswith(") and doesn't depend on it, it could run first; rule id: 100")
+
+
+def test_chain_order_independent_actions_reported(run_linter):
+    rule = '''SecRule ARGS "@rx (?:union|select).*from" \\
+    "id:100,\\
+    phase:2,\\
+    deny,\\
+    t:none,\\
+    t:urlDecodeUni,\\
+    t:lowercase,\\
+    setvar:tx.found=1,\\
+    chain"
+    SecRule TX:enabled "@eq 1" \\
+        "t:none,setvar:tx.other=%{tx.enabled}"'''
+
+    assert len(run_linter(rule, rule_type="chain_order", select={"chain_order"})) == 1
+
+
+def test_chain_order_matched_var_of_next_link_not_reported(run_linter):
+    rule = '''SecRule ARGS "@rx (?:union|select).*from" \\
+    "id:100,\\
+    phase:2,\\
+    deny,\\
+    t:none,\\
+    t:urlDecodeUni,\\
+    t:lowercase,\\
+    chain"
+    SecRule TX:enabled "@eq 1" "t:none,chain"
+    SecRule MATCHED_VAR "@streq 1" \\
+        "t:none"'''
+
+    assert run_linter(rule, rule_type="chain_order", select={"chain_order"}) == []
+
+
+def test_chain_order_cheapest_link_reported(run_linter):
+    rule = '''SecRule ARGS "@rx (?:union|select).*from" \\
+    "id:100,\\
+    phase:2,\\
+    deny,\\
+    t:none,\\
+    t:urlDecodeUni,\\
+    t:lowercase,\\
+    chain"
+    SecRule REQUEST_METHOD "@streq POST" "t:none,chain"
+    SecRule TX:enabled "@eq 1" \\
+        "t:none"'''
+
+    problems = run_linter(rule, rule_type="chain_order", select={"chain_order"})
+
+    assert len(problems) == 1
+    assert problems[0].desc.startswith("chain link 3 (estimated cost: 0.5)")
+
+
+@pytest.mark.parametrize("rule", [
+    # as expensive as the first link
+    '''SecRule ARGS "@rx (?:union|select).*from" \\
+    "id:100,\\
+    phase:2,\\
+    deny,\\
+    t:none,\\
+    t:urlDecodeUni,\\
+    t:lowercase,\\
+    chain"
+    SecRule ARGS "@rx (?:insert|delete).*into" \\
+        "t:none"''',
+    # reads the captures of the first link
+    '''SecRule ARGS "@rx (?:union|select).*from" \\
+    "id:100,\\
+    phase:2,\\
+    deny,\\
+    t:none,\\
+    t:urlDecodeUni,\\
+    t:lowercase,\\
+    capture,\\
+    chain"
+    SecRule TX:1 "@streq union" \\
+        "t:none"''',
+    '''SecRule ARGS "@rx (?:union|select).*from" \\
+    "id:100,\\
+    phase:2,\\
+    deny,\\
+    t:none,\\
+    t:urlDecodeUni,\\
+    t:lowercase,\\
+    capture,\\
+    chain"
+    SecRule REQUEST_URI "@streq %{TX.1}" \\
+        "t:none"''',
+    # reads the matched variable of the first link
+    '''SecRule ARGS "@rx (?:union|select).*from" \\
+    "id:100,\\
+    phase:2,\\
+    deny,\\
+    t:none,\\
+    t:urlDecodeUni,\\
+    t:lowercase,\\
+    chain"
+    SecRule MATCHED_VAR "@eq 1" \\
+        "t:none"''',
+    '''SecRule ARGS "@rx (?:union|select).*from" \\
+    "id:100,\\
+    phase:2,\\
+    deny,\\
+    t:none,\\
+    t:urlDecodeUni,\\
+    t:lowercase,\\
+    chain"
+    SecRule REQUEST_URI "@streq %{MATCHED_VAR}" \\
+        "t:none"''',
+    # reads a TX variable set by the first link
+    '''SecRule ARGS "@rx (?:union|select).*from" \\
+    "id:100,\\
+    phase:2,\\
+    deny,\\
+    t:none,\\
+    t:urlDecodeUni,\\
+    t:lowercase,\\
+    setvar:tx.found=1,\\
+    chain"
+    SecRule TX:found "@eq 1" \\
+        "t:none"''',
+    # the logged value would change
+    '''SecRule ARGS "@rx (?:union|select).*from" \\
+    "id:100,\\
+    phase:2,\\
+    deny,\\
+    t:none,\\
+    t:urlDecodeUni,\\
+    t:lowercase,\\
+    logdata:'%{MATCHED_VAR}',\\
+    chain"
+    SecRule TX:enabled "@eq 1" \\
+        "t:none"''',
+])
+def test_chain_order_not_reported(run_linter, rule):
+    assert run_linter(rule, rule_type="chain_order", select={"chain_order"}) == []
+
+
+@pytest.mark.parametrize("rule", [
+    # the actions read the captures of the first link
+    '''SecRule ARGS "@rx (?:union|select).*from" \\
+    "id:100,\\
+    phase:2,\\
+    deny,\\
+    t:none,\\
+    t:urlDecodeUni,\\
+    t:lowercase,\\
+    capture,\\
+    chain"
+    SecRule TX:enabled "@eq 1" \\
+        "t:none,setvar:tx.word=%{tx.1}"''',
+    '''SecRule ARGS "@rx (?:union|select).*from" \\
+    "id:100,\\
+    phase:2,\\
+    deny,\\
+    t:none,\\
+    t:urlDecodeUni,\\
+    t:lowercase,\\
+    capture,\\
+    chain"
+    SecRule TX:enabled "@eq 1" \\
+        "t:none,logdata:'%{TX.0}'"''',
+    # the actions read a TX variable set by the first link
+    '''SecRule ARGS "@rx (?:union|select).*from" \\
+    "id:100,\\
+    phase:2,\\
+    deny,\\
+    t:none,\\
+    t:urlDecodeUni,\\
+    t:lowercase,\\
+    setvar:tx.found=1,\\
+    chain"
+    SecRule TX:enabled "@eq 1" \\
+        "t:none,logdata:'%{tx.found}'"''',
+    # the actions set a TX variable the first link sets
+    '''SecRule ARGS "@rx (?:union|select).*from" \\
+    "id:100,\\
+    phase:2,\\
+    deny,\\
+    t:none,\\
+    t:urlDecodeUni,\\
+    t:lowercase,\\
+    setvar:tx.score=+5,\\
+    chain"
+    SecRule TX:enabled "@eq 1" \\
+        "t:none,setvar:tx.score=0"''',
+    # the actions set a TX variable the first link reads
+    '''SecRule ARGS "@rx (?:union|select).*from" \\
+    "id:100,\\
+    phase:2,\\
+    deny,\\
+    t:none,\\
+    t:urlDecodeUni,\\
+    t:lowercase,\\
+    setvar:tx.a=%{tx.b},\\
+    chain"
+    SecRule TX:enabled "@eq 1" \\
+        "t:none,setvar:tx.b=1"''',
+])
+def test_chain_order_action_dependencies_not_reported(run_linter, rule):
+    assert run_linter(rule, rule_type="chain_order", select={"chain_order"}) == []
+
+
+@pytest.mark.parametrize("rule", [
+    # the first link is the cheapest
+    '''SecRule TX:enabled "@eq 1" \\
+    "id:100,\\
+    phase:2,\\
+    deny,\\
+    t:none,\\
+    t:urlDecodeUni,\\
+    t:lowercase,\\
+    chain"
+    SecRule ARGS "@rx (?:union|select).*from" \\
+        "t:none"''',
+    '''SecRule ARGS "@rx foo" \\
+    "id:100,\\
+    phase:2,\\
+    deny,\\
+    t:none"''',
+])
+def test_chain_order_nothing_to_reorder(run_linter, rule):
+    assert run_linter(rule, rule_type="chain_order", select={"chain_order"}) == []
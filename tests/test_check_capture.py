@@ -1,5 +1,6 @@
 import tempfile
 import os
+import pytest
 from crs_linter.linter import Linter, parse_config
 
 
@@ -462,3 +463,111 @@ def test_capture_check_multiple_captures_in_chain_passes():
             f"Should not error when TX.N has capture at same level, even with later captures: {capture_problems}"
     finally:
         os.unlink(temp_file)
+
+
+def test_capture_check_unused_capture_fails(run_linter):
+    """Test that a capture action whose groups are never read is caught."""
+    rule = (
+        'SecRule ARGS "@rx (attack)" \\\n'
+        '    "id:5001,\\\n'
+        '    phase:2,\\\n'
+        '    deny,\\\n'
+        '    capture,\\\n'
+        "    msg:'Attack detected'\""
+    )
+
+    problems = run_linter(rule, rule_type="capture")
+
+    assert [(p.line, p.desc) for p in problems] == [
+        (5, "rule uses capture but never reads TX.N; rule id: 5001"),
+    ]
+
+
+@pytest.mark.parametrize("action", [
+    "setenv:'request_id=%{tx.1}'",
+    "setuid:%{TX.1}",
+    "initcol:ip=%{tx.1}",
+    "expirevar:'ip.%{tx.1}=60'",
+])
+def test_capture_check_capture_read_by_expanding_action_passes(run_linter, action):
+    """Test that every macro expanding action reads the captures."""
+    rule = (
+        'SecRule ARGS "@rx (attack)" \\\n'
+        '    "id:5001,\\\n'
+        '    phase:2,\\\n'
+        '    pass,\\\n'
+        '    capture,\\\n'
+        f'    {action}"'
+    )
+
+    assert run_linter(rule, rule_type="capture") == []
+
+
+def test_capture_check_capture_read_by_earlier_link_fails(run_linter):
+    """Test that a capture only read before it in the chain is unused."""
+    rule = (
+        'SecRule ARGS "@rx (a)(b)" \\\n'
+        '    "id:5002,\\\n'
+        '    phase:2,\\\n'
+        '    deny,\\\n'
+        '    capture,\\\n'
+        '    chain"\n'
+        '    SecRule TX:1 "@rx (c)" \\\n'
+        '        "capture"'
+    )
+
+    problems = run_linter(rule, rule_type="capture")
+
+    assert [(p.line, p.desc) for p in problems] == [
+        (8, "rule uses capture but never reads TX.N; rule id: 5002"),
+    ]
+
+
+def test_capture_check_undefined_group_fails(run_linter):
+    """Test that a TX.N beyond the groups of the capturing regex is caught."""
+    rule = (
+        'SecRule ARGS "@rx (foo)(bar)" \\\n'
+        '    "id:5003,\\\n'
+        '    phase:2,\\\n'
+        '    deny,\\\n'
+        '    capture,\\\n'
+        "    logdata:'Matched: %{TX.2} %{TX.3}'\""
+    )
+
+    problems = run_linter(rule, rule_type="capture")
+
+    assert [(p.line, p.desc) for p in problems] == [
+        (6, "rule reads TX.3 but the captured operator only sets TX.0 to TX.2; rule id: 5003"),
+    ]
+
+
+def test_capture_check_pm_capture_sets_tx0_only(run_linter):
+    """Test that the phrase operators only define TX.0."""
+    rule = (
+        'SecRule ARGS "@pm foo bar" \\\n'
+        '    "id:5004,\\\n'
+        '    phase:2,\\\n'
+        '    deny,\\\n'
+        '    capture,\\\n'
+        "    logdata:'Matched: %{TX.0} %{TX.1}'\""
+    )
+
+    problems = run_linter(rule, rule_type="capture")
+
+    assert [p.desc for p in problems] == [
+        "rule reads TX.1 but the captured operator only sets TX.0; rule id: 5004",
+    ]
+
+
+def test_capture_check_unknown_groups_not_reported(run_linter):
+    """Test that the groups of a regex with a macro expansion aren't checked."""
+    rule = (
+        'SecRule ARGS "@rx %{tx.pattern}" \\\n'
+        '    "id:5005,\\\n'
+        '    phase:2,\\\n'
+        '    deny,\\\n'
+        '    capture,\\\n'
+        "    logdata:'Matched: %{TX.5}'\""
+    )
+
+    assert run_linter(rule, rule_type="capture") == []
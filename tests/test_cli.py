@@ -2,6 +2,7 @@ import sys
 import pytest
 
 from crs_linter.cli import *
+from crs_linter.cache import FileTimings
 from pathlib import Path
 from dulwich.errors import NotGitRepository
 
@@ -185,3 +186,205 @@ def test_parsing_failure_continues_without_fail_fast(monkeypatch, tmp_path):
 
     # Should return 0 because the valid file has no linting issues
     assert ret == 0
+
+
+def test_fix_rewrites_misformatted_file(monkeypatch, tmp_path):
+    """Test that --fix writes the formatted output back to the file"""
+    rule_file = tmp_path / "REQUEST-900-FIX.conf"
+    rule_file.write_text(
+        'SecRule ARGS "@rx foo" \\\n'
+        '  "id:900100,\\\n'
+        '  phase:1,\\\n'
+        '  pass,\\\n'
+        '  nolog"\n'
+    )
+    approved_tags = tmp_path / "APPROVED_TAGS"
+    approved_tags.write_text("")
+
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        [
+            "crs-linter",
+            "-v",
+            "4.10.0",
+            "-r",
+            str(rule_file),
+            "-t",
+            str(approved_tags),
+            "--fix",
+        ],
+    )
+
+    main()
+
+    assert rule_file.read_text() == (
+        'SecRule ARGS "@rx foo" \\\n'
+        '    "id:900100,\\\n'
+        '    phase:1,\\\n'
+        '    pass,\\\n'
+        '    nolog"\n'
+    )
+
+
+def test_baseline_hides_known_problems(monkeypatch, tmp_path):
+    """Test that problems written to the baseline are not reported again"""
+    rule_file = tmp_path / "REQUEST-900-BASELINE.conf"
+    rule_file.write_text(
+        'SecRule ARGS "@rx foo" \\\n'
+        '  "id:900100,\\\n'
+        '  phase:1,\\\n'
+        '  pass,\\\n'
+        '  nolog"\n'
+    )
+    approved_tags = tmp_path / "APPROVED_TAGS"
+    approved_tags.write_text("")
+    baseline = tmp_path / "baseline.txt"
+
+    argv = [
+        "crs-linter",
+        "-v",
+        "4.10.0",
+        "-r",
+        str(rule_file),
+        "-t",
+        str(approved_tags),
+        "--baseline",
+        str(baseline),
+    ]
+    monkeypatch.setattr(sys, "argv", argv + ["--write-baseline"])
+    assert main() == 0
+    assert baseline.exists()
+
+    # the known problems don't count, even if the rule moved
+    rule_file.write_text("\n\n" + rule_file.read_text())
+    monkeypatch.setattr(sys, "argv", argv)
+    assert main() == 0
+
+    # a new rule with problems is reported
+    rule_file.write_text(rule_file.read_text() + 'SecRule ARGS "@rx bar" "id:900110,phase:1,pass,nolog"\n')
+    assert main() == 1
+
+
+def test_select_and_ignore_rules(monkeypatch, tmp_path):
+    """Test that the deselected rules are not run"""
+    rule_file = tmp_path / "REQUEST-900-SELECT.conf"
+    rule_file.write_text('SecRule ARGS "@rx foo" "id:900100,phase:1,pass,nolog"\n')
+    approved_tags = tmp_path / "APPROVED_TAGS"
+    approved_tags.write_text("")
+    monkeypatch.chdir(tmp_path)
+
+    argv = [
+        "crs-linter",
+        "-v",
+        "4.10.0",
+        "-r",
+        str(rule_file),
+        "-t",
+        str(approved_tags),
+    ]
+    monkeypatch.setattr(sys, "argv", argv)
+    assert main() == 1
+
+    (tmp_path / ".crs-linter.toml").write_text('ignore = ["indentation", "pass_nolog"]\n')
+    monkeypatch.setattr(sys, "argv", argv + ["--ignore", "crs_tag,version"])
+    assert main() == 0
+
+    monkeypatch.setattr(sys, "argv", argv + ["--select", "crs_tag"])
+    assert main() == 1
+
+    monkeypatch.setattr(sys, "argv", argv + ["--select", "no_such_rule"])
+    with pytest.raises(SystemExit) as exc_info:
+        main()
+    assert exc_info.value.code == 1
+
+
+def test_threads_report_the_same_problems(monkeypatch, tmp_path, capsys):
+    """Test that --threads doesn't change the output"""
+    for i in range(4):
+        (tmp_path / f"REQUEST-90{i}-THREADS.conf").write_text(
+            f'SecRule ARGS "@rx foo" "id:90{i}100,phase:1,pass,nolog,setvar:tx.var_{i}=1"\n'
+        )
+    approved_tags = tmp_path / "APPROVED_TAGS"
+    approved_tags.write_text("")
+    argv = [
+        "crs-linter",
+        "-v",
+        "4.10.0",
+        "-r",
+        str(tmp_path / "*.conf"),
+        "-t",
+        str(approved_tags),
+        "-o",
+        "github",
+    ]
+
+    outputs = []
+    for threads in ("1", "4"):
+        monkeypatch.setattr(sys, "argv", argv + ["--threads", threads])
+        assert main() == 1
+        out = capsys.readouterr().out
+        # the scheduling report only comes with several threads
+        outputs.append([l for l in out.splitlines() if "threads in" not in l])
+    assert outputs[0] == outputs[1]
+
+
+def test_cache_dir_records_timings(monkeypatch, tmp_path):
+    """Test that the file timings are written to the cache directory"""
+    rule_file = tmp_path / "REQUEST-900-CACHE.conf"
+    rule_file.write_text('SecRule ARGS "@rx foo" "id:900100,phase:1,pass,nolog"\n')
+    approved_tags = tmp_path / "APPROVED_TAGS"
+    approved_tags.write_text("")
+    cache_dir = tmp_path / "cache"
+
+    monkeypatch.setattr(sys, "argv", [
+        "crs-linter",
+        "-v",
+        "4.10.0",
+        "-r",
+        str(rule_file),
+        "-t",
+        str(approved_tags),
+        "--threads",
+        "2",
+        "--cache-dir",
+        str(cache_dir),
+    ])
+    main()
+
+    timings = FileTimings.load(cache_dir)
+    assert timings.duration(str(rule_file)) is not None
+
+
+@pytest.mark.parametrize("threads", ["1", "3"])
+def test_max_problems_stops_early(monkeypatch, tmp_path, capsys, threads):
+    """Test that --max-problems stops after N problems with the same exit status"""
+    for i in range(3):
+        (tmp_path / f"REQUEST-90{i}-MAX.conf").write_text(
+            f'SecRule ARGS "@rx foo" "id:90{i}100,phase:1,pass,nolog"\n'
+            f'SecRule ARGS "@rx bar" "id:90{i}110,phase:1,pass,nolog"\n'
+        )
+    approved_tags = tmp_path / "APPROVED_TAGS"
+    approved_tags.write_text("")
+    argv = [
+        "crs-linter",
+        "-v",
+        "4.10.0",
+        "-r",
+        str(tmp_path / "*.conf"),
+        "-t",
+        str(approved_tags),
+        "-o",
+        "jsonl",
+        "--threads",
+        threads,
+    ]
+
+    monkeypatch.setattr(sys, "argv", argv)
+    assert main() == 1
+    all_problems = capsys.readouterr().out.splitlines()
+    assert len(all_problems) > 2
+
+    monkeypatch.setattr(sys, "argv", argv + ["--max-problems", "2"])
+    assert main() == 1
+    assert capsys.readouterr().out.splitlines() == all_problems[:2]
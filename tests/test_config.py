@@ -0,0 +1,93 @@
+"""Tests for the linter configuration file."""
+
+import pytest
+
+from crs_linter.config import LintConfig, find_config, load_config, parse_config
+from crs_linter.errors import ConfigError
+from crs_linter.session import LintSession
+
+
+ALL = {"indentation", "crs_tag", "ignore_case"}
+
+
+def test_rules_for_file():
+    """Test the selection of the rules of a file."""
+    config = LintConfig(
+        select=["crs_tag", "ignore_case"],
+        ignore=["ignore_case"],
+        per_file_select={"rules/REQUEST-942-*.conf": ["indentation"]},
+        per_file_ignores={"plugins/*.conf": ["crs_tag"]},
+    )
+
+    assert config.rules_for("rules/REQUEST-920-X.conf", ALL) == {"crs_tag"}
+    assert config.rules_for("rules/REQUEST-942-X.conf", ALL) == {"crs_tag", "indentation"}
+    assert config.rules_for("/tmp/plugins/p.conf", ALL) == set()
+    assert config.enabled_rules(ALL) == {"crs_tag", "indentation"}
+
+
+def test_all_rules_by_default():
+    """Test that an empty configuration runs every rule."""
+    assert LintConfig().rules_for("any.conf", ALL) == ALL
+
+
+def test_override():
+    """Test that --select replaces and --ignore extends the configuration."""
+    config = LintConfig(select=["crs_tag"], ignore=["indentation"])
+
+    assert config.override(select=["ignore_case"]).select == ["ignore_case"]
+    assert config.override(ignore=["crs_tag"]).ignore == ["indentation", "crs_tag"]
+    assert config.override().select == ["crs_tag"]
+
+
+def test_extend_select():
+    """Test that extend-select adds rules to the default or selected ones."""
+    config = parse_config({"extend-select": ["regex_backtracking"], "ignore": ["crs_tag"]})
+
+    assert config.rules_for("any.conf", ALL) == {"indentation", "ignore_case", "regex_backtracking"}
+    assert config.override(select=["crs_tag"], extend_select=["ignore_case"]).rules_for("any.conf", ALL) == {
+        "regex_backtracking", "ignore_case"
+    }
+    assert "regex_backtracking" in LintSession(config=config).rules.get_selected_names()
+
+
+def test_unknown_keys_and_rules():
+    """Test that mistakes in the configuration are reported."""
+    with pytest.raises(ConfigError):
+        parse_config({"selct": ["crs_tag"]})
+    with pytest.raises(ConfigError):
+        parse_config({"ignore": "crs_tag"})
+    with pytest.raises(ConfigError):
+        LintConfig(ignore=["no_such_rule"]).validate(ALL)
+
+
+def test_find_config(tmp_path):
+    """Test the lookup of the configuration in the parent directories."""
+    nested = tmp_path / "rules" / "nested"
+    nested.mkdir(parents=True)
+    (tmp_path / "pyproject.toml").write_text('[tool.crs-linter]\nignore = ["indentation"]\n')
+
+    config = find_config(nested)
+    assert config.ignore == ["indentation"]
+    assert config.path == tmp_path / "pyproject.toml"
+
+    (tmp_path / "rules" / ".crs-linter.toml").write_text('select = ["crs_tag"]\n')
+    assert find_config(nested).select == ["crs_tag"]
+
+
+def test_load_config_errors(tmp_path):
+    """Test that unreadable configuration files raise ConfigError."""
+    with pytest.raises(ConfigError):
+        load_config(tmp_path / "missing.toml")
+    broken = tmp_path / ".crs-linter.toml"
+    broken.write_text("select = [")
+    with pytest.raises(ConfigError):
+        load_config(broken)
+
+
+def test_session_skips_deselected_rules():
+    """Test that the session doesn't run the deselected rules."""
+    content = 'SecRule ARGS "@rx foo" "id:900100,phase:1,pass,nolog"\n'
+    session = LintSession(config=LintConfig(select=["crs_tag"]))
+    session.add_buffer("a.conf", content)
+
+    assert {p.rule for p in session.problems()} == {"crs_tag"}
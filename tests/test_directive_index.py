@@ -0,0 +1,69 @@
+"""Tests for the inverted index of the directives."""
+
+import glob
+import os
+
+import pytest
+
+from crs_linter.directive_index import Applicability, DirectiveIndex
+from crs_linter.rules_metadata import Rules
+from crs_linter.session import ParseError, read_and_parse
+
+
+RULES = """
+SecRule ARGS "@rx (?i)foo" "id:1,phase:1,pass,nolog,t:lowercase,chain"
+    SecRule REQUEST_COOKIES "@eq 1" "ctl:auditLogParts=+E"
+SecAction "id:2,phase:1,pass,nolog,tag:'OWASP_CRS'"
+SecRule !REQUEST_COOKIES:x "@rx bar" "id:3,phase:1,pass,nolog"
+"""
+
+
+def ids_of(directives):
+    return [d["lineno"] for d in directives]
+
+
+def test_select_by_criteria(parse_rule):
+    """Test the selection by each kind of criterion."""
+    data = parse_rule(RULES)
+    index = DirectiveIndex(data)
+
+    assert ids_of(index.select(Applicability(actions={"CTL"}))) == [3]
+    assert ids_of(index.select(Applicability(actions={"tag"}))) == [4]
+    assert ids_of(index.select(Applicability(operators={"@rx"}))) == [2, 5]
+    assert ids_of(index.select(Applicability(directives={"secaction"}))) == [4]
+    assert ids_of(index.select(Applicability(variables={"request_cookies"}))) == [3, 5]
+
+
+def test_criteria_must_all_match(parse_rule):
+    """Test that a directive must match every given criterion."""
+    index = DirectiveIndex(parse_rule(RULES))
+
+    selected = index.select(Applicability(operators={"@rx"}, variables={"request_cookies"}))
+    assert ids_of(selected) == [5]
+    assert index.select(Applicability()) is index.data
+
+
+def test_select_whole_chains(parse_rule):
+    """Test that the chains of the matching directives are selected."""
+    index = DirectiveIndex(parse_rule(RULES))
+
+    selected = index.select(Applicability(actions={"ctl"}, chains=True))
+    assert ids_of(selected) == [2, 3]
+
+
+@pytest.mark.parametrize("filename", sorted(glob.glob(os.path.join(os.path.dirname(__file__), "..", "examples", "*.conf"))))
+def test_prefilter_doesnt_change_the_problems(filename):
+    """Test that the rules find the same problems in the selected directives."""
+    try:
+        data, _ = read_and_parse(filename)
+    except ParseError:
+        pytest.skip("the example can't be parsed")
+    index = DirectiveIndex(data)
+    rules = Rules.from_registry()
+
+    for rule in rules.get_registered_rules():
+        applicability = rule.get_applicability()
+        if applicability is None:
+            continue
+        extra = [["OWASP_CRS"]] if rule.args == ("data", "tags") else []
+        assert list(rule.check(index.select(applicability), *extra)) == list(rule.check(data, *extra))
@@ -77,6 +77,8 @@ SecRule ARGS_NAMES "@rx malicious" \\
             "Duplicate ID should be detected"
         assert "1001" in duplicated_problems[0].desc, \
             "Error message should mention the duplicate ID"
+        assert duplicated_problems[0].line == 8, \
+            "Problem should point to the id action of the duplicate"
     finally:
         os.unlink(temp_file)
 
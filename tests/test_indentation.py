@@ -132,3 +132,54 @@ def test_indentation_parametrized(run_linter, rule, should_pass, description):
     else:
         assert len(problems) > 0, \
             f"Expected {description} to fail, but found no problems"
+
+
+def test_indentation_reports_only_mismatching_blocks(run_linter):
+    """Test that only the misformatted directive is reported, with its lines."""
+    rule = "\n\n".join([
+        TRAILING_NEWLINE_RULE.rstrip("\n"),
+        BROKEN_INDENTATION_RULE,
+        TRAILING_NEWLINE_RULE.rstrip("\n"),
+    ])
+    problems = run_linter(rule, rule_type="indentation")
+
+    assert len(problems) == 1
+    # the broken rule starts on line 8, its first action line is misindented
+    assert problems[0].line == 9
+    assert problems[0].end_line == 27
+
+
+@pytest.mark.parametrize("original,formatted", [
+    ([], []),
+    (["a"], ["a"]),
+    (["a", "b", "c"], ["a", "x", "c"]),
+    (["a", "b"], ["a", "b", "c"]),
+    (["a", "b", "c"], ["c", "b", "a"]),
+    (["x", "a", "x", "b", "x"], ["a", "x", "x", "b"]),
+    (["a"] * 50 + ["b"], ["b"] + ["a"] * 50),
+])
+def test_changed_regions_reconstructs_formatted(original, formatted):
+    """Applying the changed regions to the original yields the formatted lines."""
+    from crs_linter.rules.indentation import changed_regions
+
+    result = []
+    pos = 0
+    for a_lo, a_hi, b_lo, b_hi in changed_regions(original, formatted):
+        assert pos <= a_lo
+        result.extend(original[pos:a_lo])
+        result.extend(formatted[b_lo:b_hi])
+        pos = a_hi
+    result.extend(original[pos:])
+
+    assert result == formatted
+
+
+def test_format_content_fixes_indentation(parse_rule):
+    """Test that the formatted output passes the indentation check."""
+    from crs_linter.rules.indentation import Indentation, format_content
+
+    formatted = format_content(parse_rule(BROKEN_INDENTATION_RULE))
+
+    assert formatted == PROPERLY_FORMATTED_RULE
+    problems = list(Indentation().check("test.conf", parse_rule(formatted), formatted))
+    assert problems == []
@@ -306,3 +306,49 @@ class TestLintProblemEdgeCases:
         assert "你好" in problem.desc
         assert "мир" in problem.desc
         assert "🚀" in problem.desc
+
+
+class TestLintProblemRecord:
+    """Tests for the immutable record behavior."""
+
+    def test_is_immutable(self):
+        """Test that the fields can't be changed."""
+        problem = LintProblem(line=1, end_line=1)
+
+        with pytest.raises(AttributeError):
+            problem.line = 2
+        with pytest.raises(AttributeError):
+            problem.extra = "value"
+
+    def test_has_no_instance_dict(self):
+        """Test that the problem is a slotted record."""
+        assert not hasattr(LintProblem(line=1, end_line=1), "__dict__")
+
+    def test_replace(self):
+        """Test that replace returns a modified copy."""
+        problem = LintProblem(line=1, end_line=2, desc="Error", rule="test")
+        copy = problem.replace(filename="rules.conf", rule_id=942100)
+
+        assert copy.filename == "rules.conf"
+        assert copy.rule_id == 942100
+        assert (copy.line, copy.end_line, copy.desc, copy.rule) == (1, 2, "Error", "test")
+        assert problem.filename is None
+
+    def test_sorting_with_none_columns(self):
+        """Test that problems with and without column can be sorted."""
+        problems = [
+            LintProblem(line=5, end_line=5, column=3, desc="3rd"),
+            LintProblem(line=5, end_line=5, desc="2nd"),
+            LintProblem(line=1, end_line=1, desc="1st"),
+        ]
+
+        assert [p.desc for p in sorted(problems)] == ["1st", "2nd", "3rd"]
+
+    def test_sort_key_orders_by_file_first(self):
+        """Test that the deterministic order starts with the file name."""
+        problems = [
+            LintProblem(line=1, end_line=1, filename="b.conf"),
+            LintProblem(line=9, end_line=9, filename="a.conf"),
+        ]
+
+        assert [p.filename for p in sorted(problems, key=LintProblem.sort_key)] == ["a.conf", "b.conf"]
@@ -236,7 +236,7 @@ def test_check_ver_action(run_linter, crsversion, rule, expected_count):
 
 
 @pytest.mark.parametrize("rule,expected_count", [
-    ('''SecRule ARGS "@rx attack" \\
+    ('''SecRule ARGS "@rx (attack)" \\
     "id:2,\\
     phase:2,\\
     deny,\\
@@ -258,6 +258,19 @@ def test_check_ver_action(run_linter, crsversion, rule, expected_count):
     ver:'OWASP_CRS/4.7.0-dev',\\
     chain"
     SecRule TX:0 "@eq attack"''', 1),
+
+    # the regex has no group 1
+    ('''SecRule ARGS "@rx attack" \\
+    "id:4,\\
+    phase:2,\\
+    deny,\\
+    capture,\\
+    t:none,\\
+    nolog,\\
+    tag:OWASP_CRS,\\
+    ver:'OWASP_CRS/4.7.0-dev',\\
+    chain"
+    SecRule TX:1 "@eq attack"''', 1),
 ])
 def test_check_capture_action(run_linter, rule, expected_count):
     """Test capture action checking."""
@@ -0,0 +1,143 @@
+"""Tests for the load profile."""
+
+import json
+import sys
+
+import pytest
+
+from crs_linter.cli import main
+from crs_linter.cost_model import CostModel, load_cost_model
+from crs_linter.errors import ConfigError
+from crs_linter.linter import parse_config
+from crs_linter.load_profile import format_report, level_totals, paranoia_levels, profile_file
+
+
+RULES = '''SecRule REQUEST_HEADERS:Host "@streq localhost" \\
+    "id:1,\\
+    phase:1,\\
+    pass,\\
+    t:none,\\
+    nolog"
+
+SecRule TX:DETECTION_PARANOIA_LEVEL "@lt 1" "id:2,phase:1,pass,nolog,skipAfter:END-PL1"
+
+SecRule ARGS|REQUEST_COOKIES|!REQUEST_COOKIES:/__utm/ "@rx (?:union|select)" \\
+    "id:3,\\
+    phase:2,\\
+    block,\\
+    t:none,\\
+    t:urlDecodeUni,\\
+    t:lowercase,\\
+    tag:'paranoia-level/1'"
+
+SecRule TX:DETECTION_PARANOIA_LEVEL "@lt 2" "id:4,phase:1,pass,nolog,skipAfter:END-PL2"
+
+SecRule XML:/* "@detectSQLi" \\
+    "id:5,\\
+    phase:2,\\
+    block,\\
+    t:none,\\
+    tag:'paranoia-level/2'"
+'''
+
+
+def test_paranoia_levels():
+    levels = paranoia_levels(parse_config(RULES))
+
+    assert levels == {1: 0, 2: 0, 3: 1, 4: 1, 5: 2}
+
+
+def test_profile_file():
+    loads = profile_file("rules.conf", parse_config(RULES))
+
+    assert [(load.rule_id, load.paranoia_level) for load in loads] == [(1, 0), (2, 0), (3, 1), (4, 1), (5, 2)]
+    assert loads[0].cost == 1.0
+    assert loads[0].collections == []
+    load = loads[2]
+    # 10 values * (2.0 + 1.0 + an @rx operator)
+    assert load.cost > 10 * 8.0
+    assert load.collections == ["ARGS", "REQUEST_COOKIES"]
+    assert load.exclusions == ["!REQUEST_COOKIES:/__utm/"]
+    assert load.transformations == 2
+    assert load.operators == ["@rx"]
+    assert loads[4].collections == ["XML:/*"]
+    # 5 values * @detectSQLi
+    assert loads[4].cost == 100.0
+
+
+def test_level_totals_are_cumulative():
+    loads = profile_file("rules.conf", parse_config(RULES))
+    totals = level_totals(loads)
+
+    assert [(level, count) for level, _, count in totals] == [(1, 4), (2, 5)]
+    assert totals[1][1] == pytest.approx(totals[0][1] + 100.0)
+
+
+def test_format_report():
+    report = format_report(profile_file("rules.conf", parse_config(RULES)), top=1)
+
+    assert report[0] == "Load by paranoia level (the rules of the level and below):"
+    assert report[2].startswith("  PL2 ")
+    assert "Top 1 rules at all paranoia levels:" in report
+    assert any(line.startswith("   1.      100.0  rule 5 (rules.conf:21): phase 2; collections XML:/*") for line in report)
+
+
+def test_custom_cost_model():
+    model = CostModel(operators={"detectsqli": 1.0}, collection_size=2.0)
+    loads = profile_file("rules.conf", parse_config(RULES), model)
+
+    assert loads[4].cost == 2.0
+
+
+def test_load_cost_model(tmp_path):
+    path = tmp_path / "costs.toml"
+    path.write_text('collection-size = 3\n[operators]\ndetectSQLi = 1.5\n[variables]\nrequest_headers = 4\n')
+
+    model = load_cost_model(path)
+
+    assert model.collection_size == 3.0
+    assert model.operators["detectsqli"] == 1.5
+    # the other costs keep their default
+    assert model.operators["rx"] == 5.0
+    assert model.variables["request_headers"] == 4.0
+
+
+@pytest.mark.parametrize("content,message", [
+    ("collection-sizes = 3\n", "Unknown cost model key(s)"),
+    ("regex-size = -1\n", "'regex-size' must be a non-negative number"),
+    ("operators = 1\n", "'operators' must be a table of costs"),
+    ("[operators]\nrx = 'fast'\n", "'operators.rx' must be a non-negative number"),
+])
+def test_load_cost_model_errors(tmp_path, content, message):
+    path = tmp_path / "costs.toml"
+    path.write_text(content)
+
+    with pytest.raises(ConfigError, match=message.replace("(", r"\(").replace(")", r"\)")):
+        load_cost_model(path)
+
+
+def test_load_profile_command(monkeypatch, tmp_path, capsys):
+    rules = tmp_path / "rules.conf"
+    rules.write_text(RULES)
+    output = tmp_path / "profile.json"
+    monkeypatch.setattr(sys, "argv", [
+        "crs-linter", "load-profile", "-r", str(rules), "--top", "2", "--json", str(output),
+    ])
+
+    assert main() == 0
+
+    assert "Estimated load of 5 rule(s) of 1 file(s)" in capsys.readouterr().out
+    document = json.loads(output.read_text())
+    assert [level["paranoia_level"] for level in document["levels"]] == [1, 2]
+    assert [r["rule_id"] for r in document["rules"]] == [1, 2, 3, 4, 5]
+
+
+def test_load_profile_command_bad_cost_model(monkeypatch, tmp_path, capsys):
+    rules = tmp_path / "rules.conf"
+    rules.write_text(RULES)
+    monkeypatch.setattr(sys, "argv", [
+        "crs-linter", "load-profile", "-r", str(rules), "--cost-model", str(tmp_path / "missing.toml"),
+    ])
+
+    assert main() == 1
+    assert "Can't open file" in capsys.readouterr().err
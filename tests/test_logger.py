@@ -212,9 +212,11 @@ class TestOutputEnum:
     def test_output_enum_members(self):
         """Test that Output enum has expected members."""
         members = list(Output)
-        assert len(members) == 2
+        assert len(members) == 4
         assert Output.NATIVE in members
         assert Output.GITHUB in members
+        assert Output.JSONL in members
+        assert Output.SARIF in members
 
 
 class TestLoggerEdgeCases:
@@ -2,6 +2,9 @@
 
 import pytest
 
+from crs_linter.linter import Linter, parse_config
+from crs_linter.rules_metadata import Rules
+
 
 @pytest.mark.parametrize("rule,expected_count,description", [
     # Valid rule with t:lowercase and case-sensitive regex
@@ -92,6 +95,14 @@ import pytest
     t:lowercase,\\
     nolog"''', 0, "@rx without (?i) flag is OK"),
 
+    # Invalid: (?i) combined with other global flags
+    ('''SecRule ARGS "@rx (?is)foo.bar" \\
+    "id:13,\\
+    phase:1,\\
+    pass,\\
+    t:lowercase,\\
+    nolog"''', 1, "(?is) flags with t:lowercase is redundant"),
+
     # Invalid: (?i) in middle of regex
     ('''SecRule ARGS "@rx foo(?i)bar" \\
     "id:12,\\
@@ -252,3 +263,145 @@ SecRule ARGS "@rx baz" \\
 
     assert len(problems) == 0, \
         "Valid patterns should not trigger any problems"
+
+
+def make_lowercase_rule(operator, transformations="t:none,\\\n    t:lowercase"):
+    return f'''SecRule ARGS "{operator}" \\
+    "id:7001,\\
+    phase:1,\\
+    pass,\\
+    {transformations},\\
+    nolog"'''
+
+
+@pytest.mark.parametrize("operator,expected", [
+    ("@rx foo(?i:bar)", "rule uses (?i:...) in combination with t:lowercase: '(?i:bar)'"),
+    ("@rx [aA]dmin", "character class has uppercase letters, which never match after t:lowercase: '[aA]'"),
+    ("@rx ^[A-Za-z0-9]+$", "character class has uppercase letters, which never match after t:lowercase: '[A-Za-z0-9]'"),
+    ("@rx ^(?:get|POST)$", "uppercase literal never matches after t:lowercase, dead branch: 'POST'"),
+    ("@rx select[A-Z]", "uppercase literal never matches after t:lowercase, dead branch: 'select[A-Z]'"),
+    ("@rx ^a(?:X)?b$", "uppercase literal never matches after t:lowercase, optional part always skipped: 'X?'"),
+])
+def test_lowercase_ignorecase_regex_case_findings(run_linter, operator, expected):
+    problems = run_linter(make_lowercase_rule(operator), rule_type="lowercase_ignorecase")
+
+    assert [p.desc for p in problems] == [f"{expected}; rule id: 7001"]
+    assert problems[0].line == 1
+
+
+@pytest.mark.parametrize("operator,transformations", [
+    ("@rx foo(?i:bar)", "t:none"),
+    ("@rx ^(?:get|POST)$", "t:none"),
+    # the input is uppercased last
+    ("@rx ^POST$", "t:lowercase,\\\n    t:uppercase"),
+    # t:none drops t:lowercase
+    ("@rx [aA]dmin", "t:lowercase,\\\n    t:none"),
+    # the decoding transformations can bring uppercase letters back
+    ("@rx ^(?:get|POST)$", "t:lowercase,\\\n    t:urlDecode"),
+    ("@rx [aA]dmin", "t:lowercase,\\\n    t:htmlEntityDecode"),
+    ("@rx ^Admin$", "t:lowercase,\\\n    t:base64Decode"),
+    # negated classes and negative lookarounds match lowercased input
+    ("@rx [^A-Z]+(?!X)", "t:lowercase"),
+    ("@rx ^[a-z0-9_]+$", "t:lowercase"),
+    # the categories match lowercase letters
+    ("@rx ^[\\w.-]+$", "t:lowercase"),
+    ("@rx <[\\s\\S]*>", "t:lowercase"),
+])
+def test_lowercase_ignorecase_regex_case_not_reported(run_linter, operator, transformations):
+    problems = run_linter(make_lowercase_rule(operator, transformations), rule_type="lowercase_ignorecase")
+
+    assert problems == []
+
+
+def test_lowercase_ignorecase_chained_rule_id(run_linter):
+    rule = '''SecRule ARGS "@rx foo" \\
+    "id:100,\\
+    phase:1,\\
+    pass,\\
+    nolog"
+
+SecRule REQUEST_METHOD "@streq POST" \\
+    "id:200,\\
+    phase:1,\\
+    pass,\\
+    nolog,\\
+    chain"
+    SecRule ARGS "@rx [aA]dmin" \\
+        "t:none,\\
+        t:lowercase"'''
+
+    problems = run_linter(rule, rule_type="lowercase_ignorecase")
+
+    assert [p.desc for p in problems] == [
+        "character class has uppercase letters, which never match after t:lowercase: '[aA]'; rule id: 200"
+    ]
+
+
+def test_lowercase_ignorecase_inherited_lowercase(run_linter):
+    rule = '''SecDefaultAction "phase:2,log,auditlog,pass,t:lowercase"
+
+SecRule ARGS "@rx [aA]dmin" \\
+    "id:100,\\
+    phase:2,\\
+    deny"
+
+SecRule ARGS "@rx (?i)foo" \\
+    "id:101,\\
+    phase:2,\\
+    deny"'''
+
+    problems = run_linter(rule, rule_type="lowercase_ignorecase")
+
+    assert [(p.line, p.desc) for p in problems] == [
+        (3, "character class has uppercase letters, which never match after t:lowercase: '[aA]'; rule id: 100"),
+        (8, "rule uses (?i) in combination with t:lowercase inherited from SecDefaultAction (line 1); rule id: 101"),
+    ]
+
+
+@pytest.mark.parametrize("rule", [
+    # t:none drops the inherited transformations
+    '''SecDefaultAction "phase:2,log,auditlog,pass,t:lowercase"
+
+SecRule ARGS "@rx [aA]dmin" \\
+    "id:100,\\
+    phase:2,\\
+    deny,\\
+    t:none"''',
+    # the SecDefaultAction of another phase
+    '''SecDefaultAction "phase:1,log,auditlog,pass,t:lowercase"
+
+SecRule ARGS "@rx (?i)foo" \\
+    "id:100,\\
+    phase:2,\\
+    deny"''',
+])
+def test_lowercase_ignorecase_inherited_lowercase_not_reported(run_linter, rule):
+    assert run_linter(rule, rule_type="lowercase_ignorecase") == []
+
+
+def test_lowercase_ignorecase_pm_case_variants(run_linter):
+    problems = run_linter(make_lowercase_rule("@pm Select union UNION select from"), rule_type="lowercase_ignorecase")
+
+    assert [p.desc for p in problems] == [
+        "@pm is case-insensitive, words only differing in case: 'Select', 'select'; rule id: 7001",
+        "@pm is case-insensitive, words only differing in case: 'union', 'UNION'; rule id: 7001",
+    ]
+
+
+def test_lowercase_ignorecase_pm_without_case_variants(run_linter):
+    problems = run_linter(make_lowercase_rule("@pm select union from"), rule_type="lowercase_ignorecase")
+
+    assert problems == []
+
+
+def test_lowercase_ignorecase_pmfromfile_case_variants(tmp_path):
+    (tmp_path / "words.data").write_text("# comment\nwget\nWGET\ncurl\n\n")
+    rule = make_lowercase_rule("@pmFromFile words.data missing.data")
+    rules = Rules.from_registry(select={"lowercase_ignorecase"})
+    linter = Linter(parse_config(rule), filename=str(tmp_path / "rules.conf"), rules=rules)
+
+    problems = list(linter.run_checks())
+
+    assert [p.desc for p in problems] == [
+        "@pmFromFile is case-insensitive, words only differing in case in words.data: 'wget', 'WGET'; rule id: 7001",
+    ]
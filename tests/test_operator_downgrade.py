@@ -0,0 +1,154 @@
+"""Tests for the operator_downgrade checker."""
+
+import pytest
+
+
+@pytest.mark.parametrize("rule,suggestion", [
+    ('''SecRule REQUEST_METHOD "@rx ^POST$" \\
+    "id:100,\\
+    phase:2,\\
+    deny,\\
+    t:none"''', '"@streq POST"'),
+    ('''SecRule REQUEST_URI "@rx \\Aadmin" \\
+    "id:100,\\
+    phase:2,\\
+    deny,\\
+    t:none"''', '"@beginsWith admin"'),
+    ('''SecRule REQUEST_FILENAME "@rx \\.php$" \\
+    "id:100,\\
+    phase:2,\\
+    deny,\\
+    t:none"''', '"@endsWith .php"'),
+    ('''SecRule ARGS "@rx /etc/passwd" \\
+    "id:100,\\
+    phase:2,\\
+    deny,\\
+    t:none"''', '"@contains /etc/passwd"'),
+    ('''SecRule REQUEST_METHOD "!@rx ^(?:GET)$" \\
+    "id:100,\\
+    phase:2,\\
+    deny,\\
+    t:none"''', '"!@streq GET"'),
+    ('''SecRule REQUEST_METHOD "@rx (?i)^post$" \\
+    "id:100,\\
+    phase:2,\\
+    deny,\\
+    t:none"''', '"@streq post" with t:lowercase'),
+    ('''SecRule REQUEST_METHOD "@rx (?i)^POST$" \\
+    "id:100,\\
+    phase:2,\\
+    deny,\\
+    t:lowercase"''', '"@streq post"'),
+    ('''SecRule ARGS "@rx (?:union|select|insert)" \\
+    "id:100,\\
+    phase:2,\\
+    deny,\\
+    t:lowercase"''', '"@pm union select insert"'),
+    ('''SecRule ARGS "@rx (?i)(?:Union|UNION|select)" \\
+    "id:100,\\
+    phase:2,\\
+    deny,\\
+    t:none"''', '"@pm union select"'),
+    ('''SecRule REQUEST_URI "@rx \\.\\./|\\.\\.;" \\
+    "id:100,\\
+    phase:2,\\
+    deny,\\
+    t:none"''', '"@pm ../ ..;"'),
+    ('''SecRule ARGS "@rx cmd[.]exe|powershell" \\
+    "id:100,\\
+    phase:2,\\
+    deny,\\
+    t:lowercase"''', '"@pm cmd.exe powershell"'),
+])
+def test_operator_downgrade_detection(run_linter, rule, suggestion):
+    problems = run_linter(rule, rule_type="operator_downgrade", select={"operator_downgrade"})
+
+    assert len(problems) == 1
+    assert problems[0].desc == f"@rx matches literal text, use {suggestion}; rule id: 100"
+
+
+@pytest.mark.parametrize("rule", [
+    # not literal text
+    '''SecRule ARGS "@rx ^\\d+$" \\
+    "id:100,\\
+    phase:2,\\
+    deny,\\
+    t:none"''',
+    '''SecRule ARGS "@rx a+b" \\
+    "id:100,\\
+    phase:2,\\
+    deny,\\
+    t:none"''',
+    '''SecRule ARGS "@rx (?i:x)y" \\
+    "id:100,\\
+    phase:2,\\
+    deny,\\
+    t:none"''',
+    # @pm is case-insensitive
+    '''SecRule ARGS "@rx (?:Union|Select)" \\
+    "id:100,\\
+    phase:2,\\
+    deny,\\
+    t:none"''',
+    # anchored alternatives
+    '''SecRule REQUEST_METHOD "@rx ^(?:GET|HEAD)$" \\
+    "id:100,\\
+    phase:2,\\
+    deny,\\
+    t:none"''',
+    # words with spaces can't be in a @pm list
+    '''SecRule ARGS "@rx (?:order by|group by)" \\
+    "id:100,\\
+    phase:2,\\
+    deny,\\
+    t:lowercase"''',
+    # never matches the lowercased input
+    '''SecRule REQUEST_METHOD "@rx ^POST$" \\
+    "id:100,\\
+    phase:2,\\
+    deny,\\
+    t:lowercase"''',
+    # macro expansion
+    '''SecRule ARGS "@rx %{tx.x}" \\
+    "id:100,\\
+    phase:2,\\
+    deny,\\
+    t:none"''',
+    # the captures need the regex
+    '''SecRule REQUEST_METHOD "@rx ^POST$" \\
+    "id:100,\\
+    phase:2,\\
+    deny,\\
+    t:none,\\
+    capture"''',
+])
+def test_operator_downgrade_not_reported(run_linter, rule):
+    assert run_linter(rule, rule_type="operator_downgrade", select={"operator_downgrade"}) == []
+
+
+def test_inherited_lowercase(run_linter):
+    rule = '''SecDefaultAction "phase:2,log,auditlog,pass,t:lowercase"
+
+SecRule REQUEST_METHOD "@rx (?i)^POST$" \\
+    "id:100,\\
+    phase:2,\\
+    deny"'''
+
+    problems = run_linter(rule, rule_type="operator_downgrade", select={"operator_downgrade"})
+
+    assert [p.desc for p in problems] == ['@rx matches literal text, use "@streq post"; rule id: 100']
+
+
+def test_chained_rule_reports_the_chain_id(run_linter):
+    rule = '''SecRule ARGS "@rx \\d" \\
+    "id:200,\\
+    phase:2,\\
+    deny,\\
+    chain"
+    SecRule REQUEST_METHOD "@rx ^PUT$" \\
+        "t:none"'''
+
+    problems = run_linter(rule, rule_type="operator_downgrade", select={"operator_downgrade"})
+
+    assert [p.line for p in problems] == [6]
+    assert problems[0].desc.endswith('"@streq PUT"; rule id: 200')
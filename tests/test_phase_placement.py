@@ -0,0 +1,170 @@
+"""Tests for the phase_placement checker."""
+
+import pytest
+
+
+@pytest.mark.parametrize("rule,phase,earliest", [
+    ('''SecRule REQUEST_HEADERS:User-Agent "@pm sqlmap" \\
+    "id:100,\\
+    phase:2,\\
+    deny,\\
+    t:none"''', 2, 1),
+    ('''SecRule REQUEST_URI|ARGS_GET "@rx foo" \\
+    "id:100,\\
+    phase:2,\\
+    deny,\\
+    t:none"''', 2, 1),
+    ('''SecRule RESPONSE_HEADERS:Content-Type "@rx html" \\
+    "id:100,\\
+    phase:4,\\
+    deny,\\
+    t:none"''', 4, 3),
+    # a response rule stays in a response phase
+    ('''SecRule REQUEST_METHOD "@streq POST" \\
+    "id:100,\\
+    phase:4,\\
+    deny,\\
+    t:none"''', 4, 3),
+    ('''SecRule ARGS "@rx foo" \\
+    "id:100,\\
+    phase:4,\\
+    deny,\\
+    t:none"''', 4, 3),
+    ('''SecRule REQUEST_HEADERS:Host "@streq %{REQUEST_HEADERS.host}" \\
+    "id:100,\\
+    phase:2,\\
+    deny,\\
+    t:none"''', 2, 1),
+])
+def test_phase_placement_detection(run_linter, rule, phase, earliest):
+    problems = run_linter(rule, rule_type="phase_placement", select={"phase_placement"})
+
+    assert [p.desc for p in problems] == [
+        f"rule in phase {phase} only reads variables available in phase {earliest}, "
+        f"it could run in phase {earliest}; rule id: 100"
+    ]
+    assert problems[0].line == 3
+
+
+@pytest.mark.parametrize("rule", [
+    '''SecRule ARGS "@rx foo" \\
+    "id:100,\\
+    phase:2,\\
+    deny,\\
+    t:none"''',
+    '''SecRule REQUEST_BODY "@rx foo" \\
+    "id:100,\\
+    phase:2,\\
+    deny,\\
+    t:none"''',
+    '''SecRule RESPONSE_BODY "@rx foo" \\
+    "id:100,\\
+    phase:4,\\
+    deny,\\
+    t:none"''',
+    '''SecRule REQUEST_HEADERS:Host "@rx foo" \\
+    "id:100,\\
+    phase:1,\\
+    deny,\\
+    t:none"''',
+    # the expansion needs the request body
+    '''SecRule REQUEST_HEADERS:Host "@streq %{ARGS.host}" \\
+    "id:100,\\
+    phase:2,\\
+    deny,\\
+    t:none"''',
+    # logging rules aren't checked
+    '''SecRule REQUEST_URI "@rx foo" \\
+    "id:100,\\
+    phase:5,\\
+    deny,\\
+    t:none"''',
+    # the placement is part of the control flow
+    '''SecRule REQUEST_URI "@rx foo" \\
+    "id:100,\\
+    phase:2,\\
+    deny,\\
+    t:none,\\
+    skipAfter:END"''',
+    '''SecRule REQUEST_URI "@rx foo" \\
+    "id:100,\\
+    phase:2,\\
+    deny,\\
+    t:none,\\
+    ctl:ruleRemoveTargetById=942100;ARGS:password"''',
+    '''SecRule REQUEST_HEADERS:Content-Type "@rx ^application/json" \\
+    "id:100,\\
+    phase:2,\\
+    deny,\\
+    t:none,\\
+    ctl:requestBodyProcessor=JSON"''',
+    # a response rule isn't moved to a request phase
+    '''SecRule REQUEST_METHOD "@streq POST" \\
+    "id:100,\\
+    phase:3,\\
+    deny,\\
+    t:none"''',
+])
+def test_phase_placement_not_reported(run_linter, rule):
+    assert run_linter(rule, rule_type="phase_placement", select={"phase_placement"}) == []
+
+
+def test_phase_placement_chain(run_linter):
+    rule = '''SecRule REQUEST_METHOD "@streq POST" \\
+    "id:100,\\
+    phase:2,\\
+    deny,\\
+    t:none,\\
+    chain"
+    SecRule ARGS "@rx foo" "t:none"'''
+
+    assert run_linter(rule, rule_type="phase_placement", select={"phase_placement"}) == []
+
+
+def test_phase_placement_chain_of_early_variables(run_linter):
+    rule = '''SecRule REQUEST_METHOD "@streq POST" \\
+    "id:100,\\
+    phase:2,\\
+    deny,\\
+    t:none,\\
+    chain"
+    SecRule REQUEST_URI "@rx foo" "t:none"'''
+
+    problems = run_linter(rule, rule_type="phase_placement", select={"phase_placement"})
+
+    assert len(problems) == 1
+    assert problems[0].desc.endswith("it could run in phase 1; rule id: 100")
+
+
+def test_phase_placement_tx_defined_earlier(run_linter):
+    rule = '''SecAction "id:1,phase:1,pass,nolog,setvar:tx.flag=1"
+
+SecRule TX:flag "@eq 1" \\
+    "id:100,\\
+    phase:2,\\
+    deny"'''
+
+    problems = run_linter(rule, rule_type="phase_placement", select={"phase_placement"})
+
+    assert [p.desc for p in problems] == [
+        "rule in phase 2 only reads variables available in phase 1, it could run in phase 1; rule id: 100"
+    ]
+
+
+@pytest.mark.parametrize("rule", [
+    '''SecAction "id:1,phase:2,pass,nolog,setvar:tx.flag=1"
+
+SecRule TX:flag "@eq 1" \\
+    "id:100,\\
+    phase:2,\\
+    deny"''',
+    # the TX variable is only defined by a later rule
+    '''SecRule TX:flag "@eq 1" \\
+    "id:100,\\
+    phase:2,\\
+    deny"
+
+SecAction "id:1,phase:4,pass,nolog,setvar:tx.flag=1"''',
+])
+def test_phase_placement_tx_defined_in_the_same_phase(run_linter, rule):
+    assert run_linter(rule, rule_type="phase_placement", select={"phase_placement"}) == []
@@ -0,0 +1,75 @@
+"""Tests for the problem store."""
+
+from crs_linter.lint_problem import LintProblem
+from crs_linter.problem_store import ProblemStore
+
+
+def problem(filename, line, rule="test", desc="problem", column=None):
+    return LintProblem(line=line, end_line=line, column=column, desc=desc, rule=rule, filename=filename)
+
+
+PROBLEMS = [
+    problem("b.conf", 3, rule="deprecated"),
+    problem("a.conf", 7, rule="ignore_case"),
+    problem("a.conf", 2, rule="deprecated", column=4),
+    problem("b.conf", 1, rule="ignore_case"),
+    problem("a.conf", 5, rule="ignore_case"),
+]
+
+
+def test_round_trip():
+    """Test that the stored problems are returned unchanged."""
+    stored = LintProblem(line=1, end_line=2, column=None, desc="d", rule=None, rule_id=942100, filename="a.conf")
+    store = ProblemStore([stored])
+
+    restored = store[0]
+    assert len(store) == 1
+    assert (restored.line, restored.end_line, restored.column, restored.desc, restored.rule, restored.rule_id, restored.filename) == \
+        (1, 2, None, "d", None, 942100, "a.conf")
+
+
+def test_sorted():
+    """Test the deterministic order of the problems."""
+    store = ProblemStore(PROBLEMS)
+
+    assert [(p.filename, p.line) for p in store.sorted()] == [
+        ("a.conf", 2), ("a.conf", 5), ("a.conf", 7), ("b.conf", 1), ("b.conf", 3)
+    ]
+
+
+def test_count():
+    """Test counting the problems of a file."""
+    store = ProblemStore(PROBLEMS)
+
+    assert store.count() == 5
+    assert store.count("a.conf") == 3
+    assert store.count("c.conf") == 0
+
+
+def test_group_by_file():
+    """Test grouping the problems by file."""
+    store = ProblemStore(PROBLEMS)
+
+    assert [(f, len(list(problems))) for f, problems in store.group_by_file()] == [("a.conf", 3), ("b.conf", 2)]
+
+
+def test_group_by_rule():
+    """Test grouping the problems of each file by rule."""
+    store = ProblemStore(PROBLEMS)
+
+    groups = [(f, rule, [p.line for p in problems]) for f, rule, problems in store.group_by_rule()]
+    assert groups == [
+        ("a.conf", "deprecated", [2]),
+        ("a.conf", "ignore_case", [5, 7]),
+        ("b.conf", "deprecated", [3]),
+        ("b.conf", "ignore_case", [1]),
+    ]
+
+
+def test_merge_sorted_streams():
+    """Test the k-way merge of sorted streams."""
+    worker1 = sorted(PROBLEMS[:2], key=LintProblem.sort_key)
+    worker2 = sorted(PROBLEMS[2:], key=LintProblem.sort_key)
+
+    merged = list(ProblemStore.merge(worker1, worker2))
+    assert merged == list(ProblemStore(PROBLEMS).sorted())
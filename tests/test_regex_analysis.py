@@ -0,0 +1,106 @@
+"""Tests for the shared regex cache."""
+
+import re
+
+import pytest
+
+from crs_linter.cache import ResultCache, hash_key
+from crs_linter.regex_analysis import (
+    IGNORECASE_GROUP,
+    UPPERCASE_IN_CLASS,
+    UPPERCASE_LITERAL,
+    UPPERCASE_OPTIONAL,
+    RegexCache,
+    RegexInfo,
+    case_findings,
+    parse_regex,
+    regex_cache,
+)
+from crs_linter.rules_metadata import Rules
+from crs_linter.session import LintSession
+
+
+@pytest.mark.parametrize("regex,facts", [
+    ("(?i)^foo(?:bar|baz)$", dict(flags=re.IGNORECASE, anchored_start=True, anchored_end=True, literal_prefixes=("fooba",), min_length=6, max_length=6)),
+    ("^abc|^xyz", dict(anchored_start=True, literal_prefixes=("abc", "xyz"), min_length=3, max_length=3)),
+    ("a{2,5}x", dict(literal_prefixes=("",), min_length=3, max_length=6)),
+    (r"\Aid=\d+", dict(anchored_start=True, literal_prefixes=("id=",), min_length=4, max_length=None)),
+])
+def test_regex_facts(regex, facts):
+    """Test the facts derived from the parsed regex."""
+    info = RegexInfo.from_pattern(regex)
+
+    assert info == RegexInfo(regex, **facts, compiled_size=info.compiled_size)
+    assert info.compiled_size > 0
+    assert info.compiled.pattern == regex
+
+
+def test_literal_prefix_and_literal():
+    assert RegexInfo.from_pattern("^abc|^abd").literal_prefix == "ab"
+    assert RegexInfo.from_pattern("foo").literal
+    assert RegexInfo.from_pattern("(?i)foo").literal
+    assert not RegexInfo.from_pattern("fo+").literal
+
+
+def test_compile_error():
+    """Test that regexes Python can't compile keep their error."""
+    info = RegexInfo.from_pattern("foo(?i)bar")
+
+    assert not info.valid
+    assert "global flags" in info.error
+    assert info.parsed is None and info.compiled is None
+    assert not info.ignorecase
+
+
+def test_cache_parses_once_and_persists(tmp_path):
+    """Test that the facts are kept in the cache directory."""
+    cache = RegexCache(str(tmp_path))
+    first = cache.get("^(?:select|union)\\b")
+
+    assert cache.get("^(?:select|union)\\b") is first
+    stored = ResultCache(str(tmp_path / "regex_info.jsonl")).get(hash_key("^(?:select|union)\\b"))
+    assert RegexInfo.from_json(stored) == first
+
+    # another run reads the facts, the regex is only parsed when asked for
+    again = RegexCache(str(tmp_path)).get("^(?:select|union)\\b")
+    assert again == first
+    assert "parsed" not in again.__dict__
+    assert again.parsed is not None
+
+
+def test_prefetch_on_threads():
+    cache = RegexCache()
+    patterns = [f"foo{i}+bar" for i in range(20)]
+
+    cache.prefetch(patterns + patterns, workers=4)
+
+    assert len(cache) == 20
+    assert all(cache.get(p).min_length == len(p) - 1 for p in patterns)
+
+
+def test_session_prefetches_the_regexes_of_its_files():
+    session = LintSession(rules=Rules.from_registry(select={"lowercase_ignorecase"}))
+    session.add_buffer("a.conf", 'SecRule ARGS "@rx (?i)prefetched-regex" "id:1,phase:1,pass,t:lowercase"\n')
+
+    session.prefetch_regexes(workers=2)
+
+    assert "(?i)prefetched-regex" in session.plan.regexes._infos
+    assert [p.rule for p in session.problems("a.conf")] == ["lowercase_ignorecase"]
+
+
+@pytest.mark.parametrize("pattern,expected", [
+    ("(?i:foo)bar", [(IGNORECASE_GROUP, "(?i:foo)")]),
+    ("[A-Za-z]+", [(UPPERCASE_IN_CLASS, "[A-Za-z]")]),
+    ("foo|Bar|baz", [(UPPERCASE_LITERAL, "Bar")]),
+    ("\\x41b", [(UPPERCASE_LITERAL, "Ab")]),
+    ("^a(?:X)?b$", [(UPPERCASE_OPTIONAL, "X?")]),
+    ("a(?:Xa|yb)*", [(UPPERCASE_LITERAL, "Xa")]),
+    ("aX{1,2}", [(UPPERCASE_LITERAL, "aX{1,2}")]),
+    ("[^A-Z](?!A)", []),
+    ("[\\w.-]+", []),
+    ("[\\s\\S]*", []),
+    ("[\\wA]", [(UPPERCASE_IN_CLASS, "[\\wA]")]),
+    ("foo|bar", []),
+])
+def test_case_findings(pattern, expected):
+    assert case_findings(parse_regex(pattern)) == expected
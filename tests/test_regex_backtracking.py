@@ -0,0 +1,143 @@
+"""Tests for the regex_backtracking checker."""
+
+import pytest
+
+from crs_linter.cache import ResultCache, hash_key
+from crs_linter.regex_analysis import (
+    ADJACENT_QUANTIFIERS,
+    NESTED_QUANTIFIERS,
+    OVERLAPPING_ALTERNATION,
+    Finding,
+    RegexAnalyzer,
+    analyze_regex,
+    confirm_finding,
+    parse_regex,
+    render,
+)
+from crs_linter.rules_metadata import Rules
+
+
+@pytest.mark.parametrize("regex,kind,subpattern", [
+    (r"^(a+)+$", NESTED_QUANTIFIERS, "(a+)+"),
+    (r"(\w+\s?)*$", NESTED_QUANTIFIERS, r"(\w+\s?)*"),
+    (r"(?:\s|/\*.*?\*/)*;", NESTED_QUANTIFIERS, r"(?:\s|/\*.*?\*/)*"),
+    (r"(.|\s)*x", OVERLAPPING_ALTERNATION, r"(.|\s)*"),
+    (r"(ab|ab)*c", OVERLAPPING_ALTERNATION, "(ab(?:|))*"),
+    (r"\s*\s*x", ADJACENT_QUANTIFIERS, r"\s*\s*"),
+    (r"=.*\s*;", ADJACENT_QUANTIFIERS, r".*\s*"),
+])
+def test_backtracking_detection(regex, kind, subpattern):
+    """Test detection of the backtracking constructs."""
+    findings = analyze_regex(regex)
+
+    assert [(f.kind, f.subpattern) for f in findings] == [(kind, subpattern)]
+
+
+@pytest.mark.parametrize("regex", [
+    r"select\s+from",
+    r"[a-z]+\d+",
+    r"(?:a|b)*c",
+    r"(?i)(?:select\s+)+",
+    r"\w+\s*\w+",
+    r"(?>a+)+b",
+    r"(a++)+b",
+    r"(?:\d{1,3}\.){3}\d{1,3}",
+])
+def test_safe_regexes(regex):
+    """Test that regexes without ambiguity are not reported."""
+    assert analyze_regex(regex) == []
+
+
+def test_unparsable_regex_is_skipped():
+    assert analyze_regex(r"(?<name") is None
+
+
+def test_render_round_trip():
+    for regex in [r"^(?:a|b[^c-e])+?\d{2,}$", r"(?i:x)(?=y)(?<!z)\bq"]:
+        assert render(parse_regex(regex)) == regex
+
+
+def test_confirm_finding():
+    """Test that the attack string makes the vulnerable regex time out."""
+    finding = analyze_regex(r"^(\d+)*$")[0]
+
+    assert finding.attack_string(3) == "000a"
+    assert confirm_finding(r"^(\d+)*$", finding, timeout=0.5, slow=0.2)
+    assert not confirm_finding(r"^\d+$", finding, timeout=0.5, slow=0.2)
+
+
+def test_rule_reports_rule_id_and_subpattern(run_linter, monkeypatch):
+    monkeypatch.setattr("crs_linter.rules.regex_backtracking.confirm_finding", lambda regex, finding: True)
+    rule = '''SecRule ARGS "@rx foo" \\
+    "id:1,\\
+    phase:2,\\
+    pass,\\
+    chain"
+    SecRule ARGS "@rx ^(\\d+)*$" \\
+    "t:none"'''
+
+    problems = run_linter(rule, rule_type="regex_backtracking", select={"regex_backtracking"})
+
+    assert len(problems) == 1
+    assert problems[0].rule == "regex_backtracking"
+    assert problems[0].line == 6
+    assert "nested quantifiers: '(\\d+)*' (confirmed by a timed match); rule id: 1" in problems[0].desc
+
+
+def test_rule_is_disabled_by_default(run_linter):
+    rule = '''SecRule ARGS "@rx ^(a+)+$" \\
+    "id:2,\\
+    phase:2,\\
+    pass"'''
+
+    assert run_linter(rule, rule_type="regex_backtracking") == []
+
+
+def test_results_are_cached(run_linter, tmp_path, monkeypatch):
+    """Test that the static analysis is kept in the cache directory, not the timed matches."""
+    calls = []
+
+    def confirm(regex, finding):
+        calls.append(regex)
+        return len(calls) > 1
+
+    analyzed = []
+    analyze = RegexAnalyzer.analyze
+
+    def counting_analyze(self):
+        analyzed.append(self)
+        return analyze(self)
+
+    monkeypatch.setattr("crs_linter.rules.regex_backtracking.confirm_finding", confirm)
+    monkeypatch.setattr(RegexAnalyzer, "analyze", counting_analyze)
+    rule = '''SecRule ARGS "@rx x(a|a)*y" \\
+    "id:3,\\
+    phase:2,\\
+    pass"'''
+
+    first, second = (
+        run_linter(
+            rule,
+            rule_type="regex_backtracking",
+            plan=Rules.from_registry(select={"regex_backtracking"}).compile(cache_dir=str(tmp_path)),
+        )
+        for _ in range(2)
+    )
+
+    assert len(analyzed) == 1
+    # every run times the match again, the verdict isn't kept
+    assert len(calls) == 2
+    assert first == [] and len(second) == 1
+    assert (tmp_path / "regex_backtracking.jsonl").is_file()
+    # a new process reads the findings from the file
+    cached = ResultCache(str(tmp_path / "regex_backtracking.jsonl"))
+    assert cached.get(hash_key("findings", "x(a|a)*y")) == [
+        {"kind": OVERLAPPING_ALTERNATION, "subpattern": "(a(?:|))*", "prefix": "x", "pump": "a", "suffix": "b"}
+    ]
+
+
+def test_finding_attack_string():
+    finding = Finding(NESTED_QUANTIFIERS, "(a+)+", prefix="x", pump="ab", suffix="!")
+
+    assert finding.exponential
+    assert finding.attack_string(2) == "xabab!"
@@ -0,0 +1,159 @@
+"""Tests for the problem reporters."""
+
+import io
+import json
+from unittest.mock import Mock, call
+
+import pytest
+from crs_linter.lint_problem import LintProblem
+from crs_linter.logger import Logger, Output
+from crs_linter.reporters import (
+    GithubReporter,
+    JsonLinesReporter,
+    NativeReporter,
+    SarifReporter,
+    get_reporter,
+)
+from crs_linter.rules_metadata import get_rules
+
+
+PROBLEMS = [
+    LintProblem(line=3, end_line=3, desc="first", rule="ignore_case"),
+    LintProblem(line=5, end_line=6, desc="second", rule="ignore_case"),
+    LintProblem(line=7, end_line=7, desc="third", rule="deprecated"),
+]
+
+
+def report_all(reporter, filename="rules.conf"):
+    reporter.start_file(filename)
+    for problem in PROBLEMS:
+        reporter.report(problem, filename)
+    reporter.end_file(filename)
+    reporter.report(
+        LintProblem(line=1, end_line=1, desc="unused variable: foo"),
+        "setup.conf",
+        title="unused TX variable",
+    )
+    reporter.close()
+
+
+def test_native_reporter_groups_by_rule():
+    """Test that a rule header is logged before the problems of each rule."""
+    logger = Mock()
+    rules = get_rules()
+    report_all(NativeReporter(rules, logger))
+
+    _, ignore_case_error, ignore_case_title = rules.get_rule_messages("ignore_case")
+    _, deprecated_error, deprecated_title = rules.get_rule_messages("deprecated")
+    assert logger.error.call_args_list == [
+        call(ignore_case_error, file="rules.conf", title=ignore_case_title),
+        call("first", file="rules.conf", line=3, end_line=3),
+        call("second", file="rules.conf", line=5, end_line=6),
+        call(deprecated_error, file="rules.conf", title=deprecated_title),
+        call("third", file="rules.conf", line=7, end_line=7),
+        call("unused variable: foo", file="setup.conf", line=1, end_line=1, title="unused TX variable"),
+    ]
+
+
+def test_github_reporter_batches_annotations():
+    """Test that annotations are written per file, in workflow command format."""
+    stream = io.StringIO()
+    reporter = GithubReporter(get_rules(), Mock(), stream)
+
+    reporter.start_file("rules.conf")
+    reporter.report(PROBLEMS[0], "rules.conf")
+    assert stream.getvalue() == ""
+    reporter.end_file("rules.conf")
+
+    lines = stream.getvalue().splitlines()
+    _, error, title = get_rules().get_rule_messages("ignore_case")
+    assert lines == [
+        f"::error title={title},file=rules.conf::{error}",
+        "::error file=rules.conf,line=3,endLine=3::first",
+    ]
+
+
+def test_github_reporter_escapes_annotations():
+    """Test that the message and the properties of an annotation are escaped."""
+    stream = io.StringIO()
+    reporter = GithubReporter(get_rules(), Mock(), stream)
+    problem = LintProblem(line=2, end_line=2, desc="regex %0A%25 differs:\nexpected, got")
+
+    reporter.report(problem, "rules,1.conf", title="regex: check")
+    reporter.close()
+
+    assert stream.getvalue() == (
+        "::error title=regex%3A check,file=rules%2C1.conf,line=2,endLine=2::"
+        "regex %250A%2525 differs:%0Aexpected, got\n"
+    )
+
+
+def test_jsonl_reporter():
+    """Test that every problem is a JSON object on its own line."""
+    stream = io.StringIO()
+    report_all(JsonLinesReporter(get_rules(), stream))
+
+    records = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [r["message"] for r in records] == ["first", "second", "third", "unused variable: foo"]
+    assert records[1] == {
+        "file": "rules.conf",
+        "line": 5,
+        "end_line": 6,
+        "column": None,
+        "rule": "ignore_case",
+        "title": get_rules().get_rule_messages("ignore_case")[2],
+        "message": "second",
+    }
+    assert records[3]["title"] == "unused TX variable"
+
+
+def test_sarif_reporter():
+    """Test that the streamed SARIF log is a valid JSON document."""
+    stream = io.StringIO()
+    report_all(SarifReporter(get_rules(), stream))
+
+    log = json.loads(stream.getvalue())
+    run = log["runs"][0]
+    assert log["version"] == "2.1.0"
+    assert [r["ruleId"] for r in run["results"]] == [
+        "ignore_case", "ignore_case", "deprecated", "unused_tx_variable"
+    ]
+    assert run["results"][1]["locations"][0]["physicalLocation"]["region"] == {
+        "startLine": 5, "endLine": 6
+    }
+    assert [r["id"] for r in run["tool"]["driver"]["rules"]] == [
+        "ignore_case", "deprecated", "unused_tx_variable"
+    ]
+
+
+def test_sarif_reporter_without_problems():
+    """Test that an empty run is still a valid SARIF log."""
+    stream = io.StringIO()
+    reporter = SarifReporter(get_rules(), stream)
+    reporter.close()
+
+    assert json.loads(stream.getvalue())["runs"][0]["results"] == []
+
+
+@pytest.mark.parametrize("output,reporter_class", [
+    (Output.NATIVE, NativeReporter),
+    (Output.GITHUB, GithubReporter),
+    (Output.JSONL, JsonLinesReporter),
+    (Output.SARIF, SarifReporter),
+])
+def test_get_reporter(output, reporter_class):
+    """Test that each output format has its reporter."""
+    assert type(get_reporter(output, get_rules(), Logger(output))) is reporter_class
+
+
+def test_debug_is_formatted_lazily():
+    """Test that debug arguments are only formatted when debugging."""
+    logger = Logger(output=Output.GITHUB, debug=True)
+    logger.logger = Mock()
+    logger.debug("value: %s", 5)
+    logger.logger.debug.assert_called_once_with("value: 5")
+
+    logger.debugging = False
+    logger.logger = Mock()
+    logger.debug("value: %s", object())
+    logger.logger.debug.assert_not_called()
@@ -0,0 +1,84 @@
+"""Tests for the rule ID index."""
+
+import pytest
+from crs_linter.rule_index import RuleIdIndex
+
+
+RULES = """SecRule ARGS "@rx foo" \\
+    "id:942100,\\
+    phase:2,\\
+    block,\\
+    chain"
+    SecRule ARGS_NAMES "@rx bar" \\
+        "t:none"
+
+SecAction "id:900000,phase:1,pass,nolog"
+
+SecRule ARGS "@rx baz" \\
+    "id:942999,\\
+    phase:2,\\
+    block"
+
+SecRule ARGS "@rx qux" \\
+    "id:943000,\\
+    phase:2,\\
+    block"
+"""
+
+
+@pytest.fixture
+def index(parse_rule):
+    index = RuleIdIndex()
+    index.add_file("rules.conf", parse_rule(RULES))
+    return index
+
+
+def test_entries(index):
+    """Test that the location, chain length and phase of the rules are indexed."""
+    assert index[942100] == {
+        "fname": "rules.conf",
+        "lineno": 2,
+        "start_line": 1,
+        "end_line": 7,
+        "chain_length": 2,
+        "phase": 2,
+    }
+    assert index[900000]["phase"] == 1
+    assert index[900000]["chain_length"] == 1
+
+
+def test_ids_in_range(index):
+    """Test range queries over the sorted IDs."""
+    assert index.ids_in_range(942000, 942999) == [942100, 942999]
+    assert index.ids_in_range(900000, 999999) == [900000, 942100, 942999, 943000]
+    assert index.ids_in_range(1, 100) == []
+
+
+def test_rule_at(index):
+    """Test that the rule spanning a line is found."""
+    assert index.rule_at("rules.conf", 6).rule_id == 942100
+    assert index.rule_at("rules.conf", 9).rule_id == 900000
+    assert index.rule_at("rules.conf", 8) is None
+    assert index.rule_at("other.conf", 1) is None
+
+
+def test_duplicates_across_files(index, parse_rule):
+    """Test that later occurrences of an ID are duplicates of their file."""
+    index.add_file("other.conf", parse_rule('SecAction "id:942999,phase:1,pass,nolog"'))
+
+    assert index.duplicates("rules.conf") == []
+    assert [(e.rule_id, e.lineno) for e in index.duplicates("other.conf")] == [(942999, 1)]
+    assert index[942999]["fname"] == "rules.conf"
+
+
+def test_replace_and_remove_file(index, parse_rule):
+    """Test that replacing or removing a file updates the index."""
+    index.add_file("other.conf", parse_rule('SecAction "id:942999,phase:1,pass,nolog"'))
+    index.remove_file("rules.conf")
+
+    assert index.duplicates() == []
+    assert index.ids_in_range(0, 999999) == [942999]
+    assert index[942999]["fname"] == "other.conf"
+
+    index.add_file("other.conf", parse_rule('SecAction "id:1,phase:1,pass,nolog"'))
+    assert list(index) == [1]
@@ -5,6 +5,7 @@ Test the Rules metadata system and individual rule testing.
 import pytest
 from crs_linter.linter import Linter
 from crs_linter.rules_metadata import Rules, get_rules, get_rule_names, get_registered_rules
+from crs_linter.regex_analysis import RegexCache
 from crs_linter.rule import Rule
 from crs_linter.lint_problem import LintProblem
 from crs_linter.rules.ignore_case import IgnoreCase
@@ -162,3 +163,129 @@ def test_get_registered_rules():
         assert isinstance(rule, Rule)
         assert hasattr(rule, 'name')
         assert hasattr(rule, 'check')
+
+
+def test_registry_lists_every_rule_module():
+    """Test that every rule module is declared in the registry."""
+    from pathlib import Path
+    import crs_linter.rules
+    from crs_linter.rules_metadata import BUILTIN_RULES
+
+    modules = {p.stem for p in Path(list(crs_linter.rules.__path__)[0]).glob("*.py") if not p.stem.startswith("__")}
+    assert {spec.module.rsplit(".", 1)[-1] for spec in BUILTIN_RULES} == modules
+    for spec in BUILTIN_RULES:
+        assert spec.load().name == spec.name
+
+
+def test_selected_rules_are_loaded_lazily():
+    """Test that only the selected rule modules are imported."""
+    import os
+    import subprocess
+    import sys
+    import crs_linter
+
+    env = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.dirname(crs_linter.__file__)))
+    code = (
+        "import sys\n"
+        "from crs_linter.session import LintSession\n"
+        "from crs_linter.config import LintConfig\n"
+        "session = LintSession(config=LintConfig(select=['crs_tag']))\n"
+        "session.add_buffer('a.conf', 'SecAction \"id:1,phase:1,pass,nolog\"\\n')\n"
+        "list(session.problems())\n"
+        "print(sorted(m for m in sys.modules if m.startswith('crs_linter.rules.')))\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, env=env)
+    assert result.stdout.strip() == "['crs_linter.rules.crs_tag']"
+
+
+def test_rules_from_registry_selection():
+    """Test that deselected rules are known but not instantiated."""
+    rules = Rules.from_registry(select={"ignore_case"})
+
+    assert rules.get_selected_names() == {"ignore_case"}
+    assert "crs_tag" in rules.get_rule_names()
+    assert [r.name for r in rules.get_registered_rules()] == ["ignore_case"]
+    assert rules.get_rule("crs_tag") is None
+
+
+def test_third_party_rules_from_entry_points(monkeypatch):
+    """Test that rules are discovered through the entry point group."""
+    from importlib.metadata import EntryPoint
+    import crs_linter.rules_metadata as rules_metadata
+
+    entry_points = [
+        EntryPoint("ignore_case", "other.module:Other", rules_metadata.ENTRY_POINT_GROUP),
+        EntryPoint("my_rule", "my_package.rules:MyRule", rules_metadata.ENTRY_POINT_GROUP),
+    ]
+    monkeypatch.setattr(rules_metadata, "entry_points", lambda group: entry_points)
+    monkeypatch.setattr(rules_metadata, "_rule_specs", None)
+
+    specs = rules_metadata.get_rule_specs()
+    assert specs[-1] == rules_metadata.RuleSpec("my_rule", "my_package.rules", "MyRule")
+    # built-in rules can't be replaced
+    assert [s.module for s in specs if s.name == "ignore_case"] == ["crs_linter.rules.ignore_case"]
+
+
+def test_rule_spec_name_mismatch():
+    """Test that a rule registered under another name is rejected."""
+    from crs_linter.errors import LintError
+    from crs_linter.rules_metadata import RuleSpec
+
+    with pytest.raises(LintError):
+        RuleSpec("other_name", "crs_linter.rules.crs_tag", "CrsTag").load()
+
+
+def test_run_plan_binds_run_values_once(parse_rule):
+    """Test that the run plan only fills in the file values per file."""
+    rules = Rules.from_registry(select={"approved_tags", "crs_tag", "version", "rule_tests"})
+    plan = rules.compile(tagslist=["OWASP_CRS"], crs_version="OWASP_CRS/4.0.0")
+
+    # rule_tests can't run without tests
+    assert [r.name for r in plan.rules()] == ["approved_tags", "crs_tag", "version"]
+
+    data = parse_rule('SecRule ARGS "@rx ^test" "id:1,phase:1,log"')
+    linter = Linter(data, filename="REQUEST-900-TEST.conf", rules=rules)
+    bound = {rule.name: args for rule, args, kwargs in plan.bind(linter)}
+    # approved_tags only gets the directives with tags
+    assert bound["approved_tags"] == [[], ["OWASP_CRS"]]
+    assert bound["crs_tag"] == [data, "REQUEST-900-TEST.conf", None]
+    assert bound["version"] == [data, "OWASP_CRS/4.0.0"]
+
+
+def test_run_plan_matches_rule_configs(parse_rule):
+    """Test that get_rule_configs and the run plan bind the same arguments."""
+    rules = get_rules()
+    linter = Linter(parse_rule('SecRule ARGS "@rx ^test" "id:1,phase:1,log"'))
+    configs = rules.get_rule_configs(linter, tagslist=["OWASP_CRS"])
+    bound = list(rules.compile(tagslist=["OWASP_CRS"]).bind(linter))
+
+    def plain(args):
+        # every plan has its own regex cache
+        return [RegexCache if isinstance(arg, RegexCache) else arg for arg in args]
+
+    expected = [(rule, plain(args), kwargs) for rule, args, kwargs, condition in configs if condition is None or condition]
+    assert [(rule, plain(args), kwargs) for rule, args, kwargs in bound] == expected
+
+
+def test_run_plan_owns_its_regex_cache():
+    """Test that every plan has its own regex cache, created once."""
+    rules = Rules.from_registry(select={"lowercase_ignorecase"})
+    plan = rules.compile()
+
+    assert plan.regexes is plan.regexes
+    assert plan.regexes is not rules.compile().regexes
+
+
+def test_registered_rules_are_frozen():
+    """Test that the rules shared by the threads can't be modified."""
+    rules = Rules()
+    rule = IgnoreCase()
+    rules.register_rule(rule)
+
+    with pytest.raises(AttributeError):
+        rule.args = ("data", "tags")
+    with pytest.raises(TypeError):
+        rule.kwargs["extra"] = 1
+    for registered in get_registered_rules():
+        with pytest.raises(AttributeError):
+            registered.name = "other"
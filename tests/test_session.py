@@ -0,0 +1,216 @@
+"""Tests for the embeddable lint session."""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import crs_linter.session as session_module
+from crs_linter.problem_store import ProblemStore
+from crs_linter.session import ConfigError, LintSession, ParseError, lint_files, read_and_parse, read_lines
+
+
+SETUP = 'SecAction "id:900000,phase:1,pass,nolog,setvar:tx.foo=1"\n'
+RULES = 'SecRule TX:foo "@eq 1" "id:920100,phase:2,pass,nolog"\n'
+
+
+def rules_of(problems):
+    return sorted(p.rule for p in problems)
+
+
+def test_add_buffer_and_problems():
+    """Test linting in-memory buffers."""
+    session = LintSession()
+    session.add_buffer("a.conf", SETUP)
+    session.add_buffer("b.conf", RULES)
+
+    assert session.files == ["a.conf", "b.conf"]
+    assert "variables_usage" not in rules_of(session.problems("b.conf"))
+    assert all(p.filename == "b.conf" for p in session.problems("b.conf"))
+
+
+def test_files_are_checked_in_load_order():
+    """Test that a file added later but sorted first defines the variables."""
+    session = LintSession()
+    session.add_buffer("b.conf", RULES)
+    assert "variables_usage" in rules_of(session.problems("b.conf"))
+
+    session.add_buffer("a.conf", SETUP)
+    assert session.files == ["a.conf", "b.conf"]
+    assert "variables_usage" not in rules_of(session.problems("b.conf"))
+
+
+def test_update_and_remove_file():
+    """Test that the cross-file rules are checked again after changes."""
+    session = LintSession()
+    session.add_buffer("a.conf", SETUP)
+    session.add_buffer("b.conf", RULES)
+    assert session.unused_tx_variables() == []
+
+    session.update_file("a.conf", SETUP.replace("tx.foo", "tx.bar"))
+    assert "variables_usage" in rules_of(session.problems("b.conf"))
+    assert [d.name for d in session.unused_tx_variables()] == ["bar"]
+
+    session.remove_file("a.conf")
+    assert session.files == ["b.conf"]
+    assert session.unused_tx_variables() == []
+    with pytest.raises(KeyError):
+        list(session.problems("a.conf"))
+
+
+def test_per_file_results_are_cached(monkeypatch):
+    """Test that the per-file rules only run again when their file changes."""
+    session = LintSession()
+    session.add_buffer("a.conf", SETUP)
+    first = list(session.problems("a.conf"))
+
+    linter = session._linters["a.conf"]
+    calls = []
+    run_checks = linter.run_checks
+    monkeypatch.setattr(linter, "run_checks", lambda **kwargs: calls.append(kwargs) or run_checks(**kwargs))
+    assert list(session.problems("a.conf")) == first
+    # only the rules depending on the other files run again
+    assert 0 < len(calls) < len(session.rules.get_registered_rules())
+
+
+def test_duplicated_ids_across_buffers():
+    """Test that the rule ID index is shared by the files of the session."""
+    session = LintSession()
+    session.add_buffer("a.conf", SETUP)
+    session.add_buffer("b.conf", SETUP)
+
+    duplicated = [p for p in session.problems() if p.rule == "duplicated"]
+    assert [(p.filename, p.line, p.rule_id) for p in duplicated] == [("b.conf", 1, 900000)]
+
+
+def test_parse_error_is_raised():
+    """Test that parse errors are raised, not logged."""
+    session = LintSession()
+
+    with pytest.raises(ParseError) as exc_info:
+        session.add_buffer("broken.conf", "SecRule INVALID SYNTAX @@@@ THIS WILL NOT PARSE")
+
+    assert exc_info.value.filename == "broken.conf"
+    assert exc_info.value.cause in ("Lexer", "Parser")
+    assert session.files == []
+
+
+def test_missing_configuration_is_raised(tmp_path):
+    """Test that missing configuration files raise instead of exiting."""
+    with pytest.raises(ConfigError):
+        read_lines(tmp_path / "missing")
+    with pytest.raises(ConfigError):
+        LintSession.from_files(tests=tmp_path)
+
+
+def test_from_files(tmp_path):
+    """Test loading the configuration from files."""
+    tags = tmp_path / "APPROVED_TAGS"
+    tags.write_text("# comment\nOWASP_CRS\n")
+    rule_file = tmp_path / "rules.conf"
+    rule_file.write_text('SecAction "id:1,phase:1,pass,nolog,tag:\'unknown\'"\n')
+
+    session = LintSession.from_files(tags_list=tags, crs_version="4.10.0")
+    session.add_file(str(rule_file))
+
+    assert session.tags == ["OWASP_CRS"]
+    assert session.crs_version == "OWASP_CRS/4.10.0"
+    assert "approved_tags" in rules_of(session.problems())
+
+
+def write_files(tmp_path, count):
+    filenames = []
+    for i in range(count):
+        rule_file = tmp_path / f"rules-{i}.conf"
+        rule_file.write_text(f'SecAction "id:{900000 + i},phase:1,pass,nolog,setvar:tx.foo_{i}=1"\n')
+        filenames.append(str(rule_file))
+    return filenames
+
+
+def test_lint_files_async(tmp_path):
+    """Test that the async API finds the same problems as the sync one."""
+    filenames = write_files(tmp_path, 5)
+    session = LintSession()
+    for f in filenames:
+        session.add_file(f)
+
+    problems = asyncio.run(lint_files(list(reversed(filenames)), limit=2))
+
+    assert isinstance(problems, ProblemStore)
+    assert problems.count(filenames[0]) == len(list(session.problems(filenames[0])))
+    assert [(p.filename, p.line, p.rule) for p in problems] == \
+        [(p.filename, p.line, p.rule) for p in session.problems()]
+
+
+def test_stream_respects_the_concurrency_limit(tmp_path, monkeypatch):
+    """Test that at most `limit` files are parsed at the same time."""
+    filenames = write_files(tmp_path, 8)
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def slow_read_and_parse(filename):
+        with lock:
+            active.append(filename)
+            peak.append(len(active))
+        time.sleep(0.01)
+        with lock:
+            active.remove(filename)
+        return read_and_parse(filename)
+
+    monkeypatch.setattr(session_module, "read_and_parse", slow_read_and_parse)
+
+    async def run():
+        session = LintSession()
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            return [p async for p in session.stream(filenames, executor=executor, limit=3)]
+
+    asyncio.run(run())
+    assert max(peak) <= 3
+
+
+def test_stream_can_be_cancelled(tmp_path):
+    """Test that closing a stream early cancels the pending checks."""
+    filenames = write_files(tmp_path, 6)
+
+    async def run():
+        session = LintSession()
+        stream = session.stream(filenames, limit=1)
+        first = await stream.__anext__()
+        await stream.aclose()
+        return first
+
+    assert asyncio.run(run()).filename == filenames[0]
+
+
+def test_problems_from_several_threads(tmp_path):
+    """Test that checking the files from threads finds the same problems."""
+    filenames = write_files(tmp_path, 16)
+    session = LintSession()
+    for f in filenames:
+        session.add_file(f)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        threaded = list(executor.map(lambda f: list(session.problems(f)), reversed(filenames)))
+
+    serial = LintSession()
+    for f in filenames:
+        serial.add_file(f)
+    assert [p for problems in reversed(threaded) for p in problems] == list(serial.problems())
+
+
+def test_closed_problems_are_not_cached():
+    """Test that stopping early doesn't keep partial results."""
+    session = LintSession()
+    content = 'SecRule ARGS "@rx foo" "id:900100,phase:1,pass,nolog"\n'
+    session.add_buffer("REQUEST-900-A.conf", content)
+    expected = list(session.problems("REQUEST-900-A.conf"))
+    assert len(expected) > 1
+
+    session.update_file("REQUEST-900-A.conf", content)
+    problems = session.problems("REQUEST-900-A.conf")
+    assert next(problems) == expected[0]
+    problems.close()
+
+    assert list(session.problems("REQUEST-900-A.conf")) == expected
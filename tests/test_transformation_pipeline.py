@@ -0,0 +1,255 @@
+"""Tests for the transformation_pipeline checker."""
+
+import pytest
+
+from crs_linter.cost_model import CostModel
+from crs_linter.linter import parse_config
+from crs_linter.rules.transformation_pipeline import TransformationPipeline
+
+
+def descs(problems):
+    return [p.desc.split("; estimated cost")[0] for p in problems]
+
+
+@pytest.mark.parametrize("rule,expected", [
+    ('''SecRule ARGS:x "@streq foo" \\
+    "id:100,\\
+    phase:2,\\
+    deny,\\
+    t:none,\\
+    t:lowercase,\\
+    t:lowercase"''', "t:lowercase is repeated, the second run has no effect"),
+    ('''SecRule ARGS:x "@streq foo" \\
+    "id:100,\\
+    phase:2,\\
+    deny,\\
+    t:none,\\
+    t:trim,\\
+    t:removeNulls,\\
+    t:trim"''', "t:trim is repeated, the second run has no effect"),
+    ('''SecRule ARGS:x "@streq foo" \\
+    "id:100,\\
+    phase:2,\\
+    deny,\\
+    t:none,\\
+    t:urlDecode,\\
+    t:urlDecodeUni"''',
+     "t:urlDecode is redundant: t:urlDecodeUni decodes everything t:urlDecode does, the pair decodes twice"),
+    ('''SecRule ARGS:x "@streq foo" \\
+    "id:100,\\
+    phase:2,\\
+    deny,\\
+    t:none,\\
+    t:compressWhitespace,\\
+    t:removeWhitespace"''', "t:compressWhitespace is redundant: t:removeWhitespace removes all the whitespace"),
+    ('''SecRule ARGS:x "@streq foo" \\
+    "id:100,\\
+    phase:2,\\
+    deny,\\
+    t:none,\\
+    t:cmdLine,\\
+    t:lowercase"''', "t:lowercase is redundant: t:cmdLine already lowercased the value"),
+    ('''SecRule ARGS:x "@streq foo" \\
+    "id:100,\\
+    phase:2,\\
+    deny,\\
+    t:none,\\
+    t:lowercase,\\
+    t:uppercase"''', "t:lowercase is redundant: t:uppercase changes the case again"),
+    ('''SecRule ARGS:x "@streq foo" \\
+    "id:100,\\
+    phase:2,\\
+    deny,\\
+    t:urlDecode,\\
+    t:none,\\
+    t:lowercase"''', "t:none discards the transformations before it: t:urlDecode"),
+])
+def test_transformation_pipeline_detection(run_linter, rule, expected):
+    problems = run_linter(rule, rule_type="transformation_pipeline", select={"transformation_pipeline"})
+
+    assert descs(problems) == [expected]
+
+
+@pytest.mark.parametrize("rule", [
+    '''SecRule ARGS:x "@streq foo" \\
+    "id:100,\\
+    phase:2,\\
+    deny,\\
+    t:none"''',
+    '''SecRule ARGS:x "@streq foo" \\
+    "id:100,\\
+    phase:2,\\
+    deny,\\
+    t:none,\\
+    t:urlDecodeUni,\\
+    t:lowercase"''',
+    # t:replaceNulls can add whitespace to trim in between
+    '''SecRule ARGS:x "@streq foo" \\
+    "id:100,\\
+    phase:2,\\
+    deny,\\
+    t:none,\\
+    t:trim,\\
+    t:replaceNulls,\\
+    t:trim"''',
+    '''SecRule ARGS:x "@streq foo" \\
+    "id:100,\\
+    phase:2,\\
+    deny,\\
+    t:none,\\
+    t:trim,\\
+    t:replaceNulls,\\
+    t:trimLeft"''',
+    '''SecRule ARGS:x "@streq foo" \\
+    "id:100,\\
+    phase:2,\\
+    deny,\\
+    t:none,\\
+    t:removeWhitespace,\\
+    t:replaceNulls,\\
+    t:compressWhitespace"''',
+    # t:removeComments sees the newlines t:compressWhitespace replaces
+    '''SecRule ARGS:x "@streq foo" \\
+    "id:100,\\
+    phase:2,\\
+    deny,\\
+    t:none,\\
+    t:compressWhitespace,\\
+    t:removeComments,\\
+    t:removeWhitespace"''',
+    # decoding again can produce new input
+    '''SecRule ARGS:x "@streq foo" \\
+    "id:100,\\
+    phase:2,\\
+    deny,\\
+    t:none,\\
+    t:urlDecodeUni,\\
+    t:urlDecodeUni"''',
+    '''SecRule ARGS:x "@streq foo" \\
+    "id:100,\\
+    phase:2,\\
+    deny,\\
+    t:none,\\
+    t:urlDecode,\\
+    t:htmlEntityDecode,\\
+    t:urlDecodeUni"''',
+])
+def test_transformation_pipeline_not_reported(run_linter, rule):
+    assert run_linter(rule, rule_type="transformation_pipeline", select={"transformation_pipeline"}) == []
+
+
+def test_transformation_pipeline_reports_line_and_rule_id(run_linter):
+    rule = '''SecRule ARGS:x "@streq foo" \\
+    "id:100,\\
+    phase:2,\\
+    deny,\\
+    t:none,\\
+    t:lowercase,\\
+    t:lowercase"'''
+
+    problems = run_linter(rule, rule_type="transformation_pipeline", select={"transformation_pipeline"})
+
+    assert problems[0].line == 7
+    assert problems[0].rule == "transformation_pipeline"
+    assert problems[0].desc.endswith("; rule id: 100")
+
+
+def test_transformation_pipeline_inherited_defaults(run_linter):
+    rule = '''SecDefaultAction "phase:2,log,auditlog,pass,t:lowercase"
+SecRule ARGS:x "@streq foo" \\
+    "id:100,\\
+    phase:2,\\
+    deny,\\
+    t:lowercase"'''
+
+    problems = run_linter(rule, rule_type="transformation_pipeline", select={"transformation_pipeline"})
+
+    assert descs(problems) == [
+        "no t:none, the rule inherits t:lowercase from SecDefaultAction (line 1)",
+        "t:lowercase is repeated, the second run has no effect",
+    ]
+
+
+def test_transformation_pipeline_other_phase_defaults_not_inherited(run_linter):
+    rule = '''SecDefaultAction "phase:1,log,auditlog,pass,t:lowercase"
+SecRule ARGS:x "@streq foo" \\
+    "id:100,\\
+    phase:2,\\
+    deny,\\
+    t:trim"'''
+
+    assert run_linter(rule, rule_type="transformation_pipeline", select={"transformation_pipeline"}) == []
+
+
+def test_transformation_pipeline_multimatch(run_linter):
+    rule = '''SecRule ARGS:x "@streq foo" \\
+    "id:100,\\
+    phase:2,\\
+    deny,\\
+    t:none,\\
+    multiMatch,\\
+    t:urlDecodeUni,\\
+    t:htmlEntityDecode,\\
+    t:lowercase"'''
+
+    problems = run_linter(rule, rule_type="transformation_pipeline", select={"transformation_pipeline"})
+
+    assert descs(problems) == [
+        "multiMatch runs the operator 4 times per value, after each of the 3 transformations",
+    ]
+
+
+def test_transformation_pipeline_chained_rule(run_linter):
+    rule = '''SecRule ARGS:x "@streq foo" \\
+    "id:100,\\
+    phase:2,\\
+    deny,\\
+    t:none,\\
+    chain"
+    SecRule ARGS "@streq bar" "t:none,t:trim,t:trim"'''
+
+    problems = run_linter(rule, rule_type="transformation_pipeline", select={"transformation_pipeline"})
+
+    assert descs(problems) == ["t:trim is repeated, the second run has no effect"]
+    assert problems[0].line == 7
+    assert problems[0].desc.endswith("; rule id: 100")
+
+
+def test_transformation_pipeline_estimated_cost():
+    data = parse_config('''SecRule ARGS "@pm foo" \\
+    "id:100,\\
+    phase:2,\\
+    deny,\\
+    t:none,\\
+    t:urlDecodeUni,\\
+    t:lowercase"''')
+    chains = list(TransformationPipeline().chains(data))
+
+    # 5 values of ARGS * (2.0 + 1.0 + 2.0)
+    assert [c["cost"] for c in chains] == [25.0]
+
+
+def test_transformation_pipeline_custom_cost_model():
+    data = parse_config('''SecRule ARGS:x "@detectSQLi" \\
+    "id:100,\\
+    phase:2,\\
+    deny,\\
+    t:none,\\
+    multiMatch,\\
+    t:lowercase"''')
+    model = CostModel(transformations={"lowercase": 2.0}, operators={"detectsqli": 10.0})
+    chains = list(TransformationPipeline().chains(data, model=model))
+
+    # 1 value * (2.0 + 2 runs * 10.0)
+    assert [c["cost"] for c in chains] == [22.0]
+
+
+def test_cost_model_regex_size():
+    model = CostModel(regex_size=1.0)
+
+    class Regex:
+        compiled_size = 10
+
+    assert model.operator_cost("@rx", Regex()) == 15.0
+    assert model.operator_cost("!@rx", None) == 5.0
+    assert model.target_count([{"variable": "ARGS"}, {"variable": "ARGS", "variable_part": "x"}]) == 6.0
@@ -0,0 +1,48 @@
+"""Tests for the stand-ins of the ModSecurity transformations."""
+
+import pytest
+
+from crs_linter.transformations import apply_transformations, transformation_chain, unsupported
+
+
+@pytest.mark.parametrize("names,value,expected", [
+    (["lowercase"], "SeLeCt", "select"),
+    (["urlDecode"], "%3Cscript%3E+x", "<script> x"),
+    (["urlDecodeUni"], "%u003Cb%3E", "<b>"),
+    (["htmlEntityDecode"], "&lt;a&#x3e;", "<a>"),
+    (["jsDecode"], r"\x3cA\n", "<A\n"),
+    (["cssDecode"], r"\6a avascript", "javascript"),
+    (["cmdLine"], "C^at  \"/etc/passwd\";ID", "cat/etc/passwd id"),
+    (["compressWhitespace"], "a \t\n b", "a b"),
+    (["removeWhitespace"], "s e l\tect", "select"),
+    (["removeNulls"], "a\x00b", "ab"),
+    (["replaceComments"], "un/**/ion", "un ion"),
+    (["removeComments"], "1 -- x", "1 "),
+    (["normalizePath"], "/a/./b/../c//d/", "/a/c/d/"),
+    (["normalizePathWin"], "a\\..\\b", "b"),
+    (["base64Decode"], "c2VsZWN0", "select"),
+    (["hexDecode"], "73656c", "sel"),
+    (["sqlHexDecode"], "0x414243 x", "ABC x"),
+    (["length"], "abcd", "4"),
+    (["trim"], "  a  ", "a"),
+    (["urlDecode", "lowercase"], "%53ELECT", "select"),
+])
+def test_transformations(names, value, expected):
+    assert apply_transformations(value, names) == expected
+
+
+def test_transformation_chain():
+    """Test that t:none drops the transformations before it."""
+    actions = [
+        {"act_name": "t", "act_arg": "urlDecode"},
+        {"act_name": "t", "act_arg": "none"},
+        {"act_name": "id", "act_arg": "1"},
+        {"act_name": "t", "act_arg": "lowercase"},
+        {"act_name": "t", "act_arg": "parityEven7bit"},
+    ]
+
+    chain = transformation_chain(actions)
+
+    assert chain == ["lowercase", "parityeven7bit"]
+    assert unsupported(chain) == ["parityeven7bit"]
+    assert apply_transformations("ABC", chain) == "abc"
@@ -0,0 +1,95 @@
+"""Tests for the TX variable def-use graph."""
+
+import pytest
+from crs_linter.tx_graph import TxVariableGraph, OPARG, RVAR, SETVAR, VAR
+
+
+SETUP_RULES = """SecAction "id:900000,phase:1,pass,nolog,setvar:tx.blocking_paranoia_level=1,setvar:tx.unused=1"
+SecRule TX:blocking_paranoia_level "@eq 1" "id:900010,phase:1,pass,nolog"
+"""
+
+LATER_RULES = """SecRule ARGS "@rx %{tx.blocking_paranoia_level}" "id:920100,phase:2,pass,nolog,msg:'%{tx.missing}'"
+SecRule TX:foo "@eq 1" "id:920110,phase:1,pass,nolog"
+SecAction "id:920120,phase:2,pass,nolog,setvar:tx.foo=1"
+"""
+
+
+@pytest.fixture
+def graph(parse_rule):
+    graph = TxVariableGraph()
+    graph.add_file("setup.conf", parse_rule(SETUP_RULES))
+    graph.add_file("rules.conf", parse_rule(LATER_RULES))
+    return graph
+
+
+def test_defs_of(graph):
+    """Test that setvar definitions are indexed with their location."""
+    definitions = graph.defs_of("BLOCKING_PARANOIA_LEVEL")
+
+    assert len(definitions) == 1
+    assert definitions[0].kind == SETVAR
+    assert definitions[0].phase == 1
+    assert definitions[0].rule_id == 900000
+    assert definitions[0].filename == "setup.conf"
+
+
+def test_uses_of(graph):
+    """Test that targets and operator argument expansions are uses."""
+    uses = graph.uses_of("blocking_paranoia_level")
+
+    assert [(u.kind, u.rule_id, u.filename) for u in uses] == [
+        (VAR, 900010, "setup.conf"),
+        (OPARG, 920100, "rules.conf"),
+    ]
+
+
+def test_unused(graph):
+    """Test that variables which are set but never read (after being set) are reported."""
+    assert [d.name for d in graph.unused()] == ["unused", "foo"]
+
+
+def test_used_before_set(graph):
+    """Test that unset variables and variables set in a later phase are reported."""
+    problems = graph.used_before_set()
+
+    assert [(u.name, u.kind) for u in problems] == [("missing", RVAR), ("foo", VAR)]
+    assert graph.used_before_set("setup.conf") == []
+
+
+def test_symbol_table_view(graph):
+    """Test that the mapping interface keeps the earliest definitions."""
+    assert graph["blocking_paranoia_level"]["phase"] == 1
+    assert graph["blocking_paranoia_level"]["used"] is True
+    assert graph["foo"]["ruleid"] == 920120
+
+
+def test_uses_only_see_earlier_files(parse_rule):
+    """Test that definitions in files added later don't resolve earlier uses."""
+    graph = TxVariableGraph()
+    graph.add_file("rules.conf", parse_rule(LATER_RULES))
+    graph.add_file("setup.conf", parse_rule(SETUP_RULES))
+
+    assert ("blocking_paranoia_level", OPARG) in [
+        (u.name, u.kind) for u in graph.used_before_set("rules.conf")
+    ]
+
+
+def test_replace_and_remove_file(graph, parse_rule):
+    """Test that replacing or removing a file re-resolves the graph."""
+    graph.add_file("rules.conf", parse_rule('SecAction "id:920130,phase:1,pass,nolog,msg:\'%{tx.unused}\'"'))
+    assert graph.unused() == []
+    assert graph.used_before_set() == []
+
+    graph.remove_file("setup.conf")
+    assert "blocking_paranoia_level" not in graph
+    assert [u.name for u in graph.used_before_set()] == ["unused"]
+
+
+def test_serialization_round_trip(graph):
+    """Test that a serialized graph answers the same queries."""
+    restored = TxVariableGraph.from_dict(graph.to_dict())
+
+    assert restored == graph
+    assert restored.unused() == graph.unused()
+    assert restored.used_before_set() == graph.used_before_set()
+    assert restored.uses_of("blocking_paranoia_level") == graph.uses_of("blocking_paranoia_level")
@@ -10,6 +10,7 @@ from crs_linter.utils import (
     parse_version_from_branch_name,
     generate_version_string,
     parse_version_from_latest_tag,
+    write_file_atomic,
 )
 
 
@@ -59,6 +60,28 @@ class TestGetId:
         assert get_id(actions) == expected
 
 
+class TestWriteFileAtomic:
+    """Tests for the write_file_atomic function."""
+
+    def test_write_new_file(self, tmp_path):
+        """Test that a new file is created with the given content."""
+        target = tmp_path / "new.conf"
+        write_file_atomic(str(target), "SecAction\n")
+        assert target.read_text() == "SecAction\n"
+
+    def test_replace_existing_file_keeps_mode(self, tmp_path):
+        """Test that an existing file is replaced and keeps its permissions."""
+        target = tmp_path / "existing.conf"
+        target.write_text("old")
+        target.chmod(0o640)
+
+        write_file_atomic(str(target), "new")
+
+        assert target.read_text() == "new"
+        assert target.stat().st_mode & 0o777 == 0o640
+        assert [p.name for p in tmp_path.iterdir()] == ["existing.conf"]
+
+
 class TestRemoveComments:
     """Tests for the remove_comments function."""
 